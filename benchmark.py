@@ -0,0 +1,282 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple
+
+from xmlgenerator import __version__
+
+# End-to-end benchmarks: each scenario runs xmlgenerator in a separate process (generate -> serialize -> validate,
+# documents are written to stdout) and measures documents/s, MB/s, peak RSS and time to the first document.
+
+ROOT = Path(__file__).resolve().parent
+BENCHMARKS_DIR = ROOT / 'benchmarks'
+DEFAULT_BASELINE = BENCHMARKS_DIR / 'baselines' / 'reference.json'
+DEFAULT_THRESHOLD = 10.0
+
+
+class Scenario(NamedTuple):
+    name: str
+    schemas: tuple[str, ...]
+    config: str | None
+    count: int
+    workers: int
+
+
+EXAMPLES = ('examples/contract.xsd', 'examples/employee.xsd', 'examples/invoice.xsd', 'examples/order.xsd')
+COMPLEX = ('tests/data/complex_schema.xsd',)
+CONFIG = 'benchmarks/config_faker.yml'
+CONFIG_LARGE = 'benchmarks/config_faker_large.yml'
+
+SCENARIOS = (
+    Scenario('examples-single', EXAMPLES, None, 1, 1),
+    Scenario('examples-defaults', EXAMPLES, None, 500, 1),
+    Scenario('examples-faker', EXAMPLES, CONFIG, 500, 1),
+    Scenario('examples-faker-w4', EXAMPLES, CONFIG, 2000, 4),
+    Scenario('complex-faker', COMPLEX, CONFIG, 1000, 1),
+    Scenario('complex-faker-w4', COMPLEX, CONFIG, 2000, 4),
+    Scenario('complex-large', COMPLEX, CONFIG_LARGE, 5, 1),
+    Scenario('complex-large-w4', COMPLEX, CONFIG_LARGE, 20, 4),
+)
+
+_WORKERS = {scenario.name: scenario.workers for scenario in SCENARIOS}
+
+# metric: True if higher value is better
+METRICS = {
+    'documents_per_second': True,
+    'megabytes_per_second': True,
+    'peak_rss_mb': False,
+    'time_to_first_document': False,
+    'latency_p50': False,
+    'latency_p99': False,
+}
+
+
+def main():
+    args = _parse_args()
+    match args.command:
+        case 'list':
+            for scenario in SCENARIOS:
+                config = scenario.config or 'default configuration'
+                print(f'{scenario.name:<20} count {scenario.count:>5}, workers {scenario.workers}, {config}')
+        case 'run':
+            scenarios = select_scenarios(args.scenario)
+            result = run_benchmarks(scenarios, args.repeat, args.scale)
+            save_result(result, Path(args.output))
+            print(f'results saved to {args.output}')
+            if args.compare:
+                sys.exit(_compare_files(Path(args.compare), Path(args.output), args.threshold))
+        case 'compare':
+            sys.exit(_compare_files(Path(args.baseline), Path(args.result), args.threshold))
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description='End-to-end throughput benchmarks of xmlgenerator')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='list benchmark scenarios')
+
+    run_parser = subparsers.add_parser('run', help='run benchmark scenarios and save results as JSON')
+    run_parser.add_argument('-o', '--output', default='benchmark-results.json',
+                            help='results file (default: %(default)s); save it to benchmarks/baselines/ '
+                                 'to make it a baseline')
+    run_parser.add_argument('--scenario', action='append',
+                            help='run scenarios matching the name pattern, e.g. complex-* (repeatable)')
+    run_parser.add_argument('--repeat', type=int, default=3,
+                            help='number of runs of each scenario, median is taken (default: %(default)s)')
+    run_parser.add_argument('--scale', type=float, default=1.0,
+                            help='multiplier of document counts of scenarios (default: %(default)s)')
+    run_parser.add_argument('--compare', metavar='<baseline>', nargs='?', const=str(DEFAULT_BASELINE),
+                            help='compare results with the baseline (default: %(const)s)')
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='regression threshold, percent (default: %(default)s)')
+
+    compare_parser = subparsers.add_parser('compare', help='compare results with a baseline')
+    compare_parser.add_argument('baseline', help='baseline results file')
+    compare_parser.add_argument('result', help='results file to compare with the baseline')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='regression threshold, percent (default: %(default)s)')
+    return parser.parse_args()
+
+
+def select_scenarios(patterns: list[str] | None) -> list[Scenario]:
+    if not patterns:
+        return list(SCENARIOS)
+    selected = [s for s in SCENARIOS if any(fnmatch.fnmatchcase(s.name, pattern) for pattern in patterns)]
+    if not selected:
+        sys.exit(f'no scenarios match {", ".join(patterns)}')
+    return selected
+
+
+def run_benchmarks(scenarios: list[Scenario], repeat: int = 3, scale: float = 1.0) -> dict:
+    results = {}
+    skipped = {}
+    cpu_count = os.cpu_count() or 1
+    for scenario in scenarios:
+        # workers of the scenario would share CPUs, its time would not measure parallel processing
+        if scenario.workers > cpu_count:
+            skipped[scenario.name] = _skip_reason(scenario.workers, cpu_count)
+            print(f'{scenario.name:<20} skipped: {skipped[scenario.name]}', flush=True)
+            continue
+        count = max(1, round(scenario.count * scale))
+        runs = [run_scenario(scenario, count) for _ in range(repeat)]
+        # median of each metric over runs
+        result = {name: _median([run[name] for run in runs]) for name in runs[0] if name != 'documents'}
+        result['documents'] = runs[0]['documents']
+        results[scenario.name] = result
+        print(f'{scenario.name:<20} {result["documents_per_second"]:>10.1f} docs/s '
+              f'{result["megabytes_per_second"]:>8.2f} MB/s  first document {result["time_to_first_document"]:.3f} s'
+              f'  peak rss {_format_value(result["peak_rss_mb"])} MB', flush=True)
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'repeat': repeat,
+        'scale': scale,
+        'scenarios': results,
+        'skipped': skipped,
+    }
+
+
+def run_scenario(scenario: Scenario, count: int) -> dict:
+    # documents are written to stdout in text format, which is flushed after each document,
+    # so the first read from the pipe returns the first complete document
+    with tempfile.TemporaryDirectory(prefix='xmlgenerator-benchmark-') as tmp_dir:
+        stats_file = Path(tmp_dir) / 'stats.json'
+        command = [sys.executable, '-m', 'xmlgenerator.bootstrap', '--seed', '1', '--count', str(count),
+                   '-w', str(scenario.workers), '--stats', str(stats_file)]
+        if scenario.config:
+            command += ['-c', scenario.config]
+        command += scenario.schemas
+        env = dict(os.environ, PYTHONPATH=str(ROOT))
+
+        started = time.perf_counter()
+        process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        first_document = None
+        while process.stdout.read1(1 << 16):
+            if first_document is None:
+                first_document = time.perf_counter() - started
+        exit_code, peak_rss = _wait(process)
+        wall_time = time.perf_counter() - started
+        if exit_code != 0:
+            raise RuntimeError(f'scenario {scenario.name} failed with exit code {exit_code}: {" ".join(command)}')
+        run = json.loads(stats_file.read_text(encoding='utf-8'))['run']
+
+    return {
+        'documents': run['documents'],
+        'wall_time': wall_time,
+        'documents_per_second': run['documents'] / wall_time,
+        'megabytes_per_second': run['output_bytes'] / wall_time / 1e6,
+        'peak_rss_mb': peak_rss,
+        'time_to_first_document': first_document,
+        'latency_p50': run['latency']['total'].get('p50'),
+        'latency_p99': run['latency']['total'].get('p99'),
+    }
+
+
+def _wait(process: subprocess.Popen) -> tuple[int, float | None]:
+    # returns exit code and peak RSS (MB) of the process (of its largest descendant, if it is larger)
+    if not hasattr(os, 'wait4'):
+        return process.wait(), None
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # kilobytes on Linux, bytes on macOS
+    peak_rss = usage.ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+    return process.returncode, peak_rss
+
+
+def environment() -> dict:
+    return {
+        'xmlgenerator': __version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def save_result(result: dict, output_file: Path):
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_text(json.dumps(result, indent=2) + '\n', encoding='utf-8')
+
+
+def compare(baseline: dict, result: dict, threshold: float = DEFAULT_THRESHOLD) -> tuple[list[str], list[str]]:
+    # returns report lines and regressions (metrics worse than the baseline by more than threshold percent)
+    lines = []
+    regressions = []
+    for key in ('python', 'platform', 'cpu_count'):
+        if baseline['environment'].get(key) != result['environment'].get(key):
+            lines.append(f'warning: {key} differs from the baseline: '
+                         f'{baseline["environment"].get(key)} -> {result["environment"].get(key)}')
+    if baseline.get('scale') != result.get('scale'):
+        lines.append(f'warning: scale differs from the baseline: {baseline.get("scale")} -> {result.get("scale")}')
+
+    # scenarios with more workers than CPUs of either run are not compared
+    cpu_count = min(baseline['environment'].get('cpu_count') or 1, result['environment'].get('cpu_count') or 1)
+    skipped = {**baseline.get('skipped', {}), **result.get('skipped', {})}
+
+    lines.append(f'{"scenario":<20} {"metric":<24} {"baseline":>10} {"current":>10} {"change":>9}')
+    for name, metrics in result['scenarios'].items():
+        base_metrics = baseline['scenarios'].get(name)
+        if name in skipped or _WORKERS.get(name, 1) > cpu_count:
+            lines.append(f'{name:<20} skipped: {skipped.get(name) or _skip_reason(_WORKERS[name], cpu_count)}')
+            continue
+        if base_metrics is None:
+            lines.append(f'{name:<20} not in the baseline')
+            continue
+        for metric, higher_is_better in METRICS.items():
+            base_value, value = base_metrics.get(metric), metrics.get(metric)
+            if not base_value or value is None:
+                continue
+            change = (value - base_value) / base_value * 100
+            worse = -change if higher_is_better else change
+            mark = ''
+            if worse > threshold:
+                mark = '  REGRESSION'
+                regressions.append(f'{name}: {metric} {change:+.1f}%')
+            lines.append(f'{name:<20} {metric:<24} {_format_value(base_value):>10} {_format_value(value):>10} '
+                         f'{change:>+8.1f}%{mark}')
+    for name in sorted(baseline['scenarios'].keys() - result['scenarios'].keys() - skipped.keys()):
+        lines.append(f'{name:<20} not in the results')
+    for name in sorted(skipped.keys() - result['scenarios'].keys()):
+        lines.append(f'{name:<20} skipped: {skipped[name]}')
+    return lines, regressions
+
+
+def _skip_reason(workers: int, cpu_count: int) -> str:
+    return f'{workers} workers, but only {cpu_count} CPU(s)'
+
+
+def _compare_files(baseline_file: Path, result_file: Path, threshold: float) -> int:
+    baseline = json.loads(baseline_file.read_text(encoding='utf-8'))
+    result = json.loads(result_file.read_text(encoding='utf-8'))
+    lines, regressions = compare(baseline, result, threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print(f'{len(regressions)} regression(s) by more than {threshold}%: {"; ".join(regressions)}')
+        return 1
+    print(f'no regressions by more than {threshold}%')
+    return 0
+
+
+def _median(values: list):
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return 'n/a'
+    return f'{value:.4f}' if value < 1 else f'{value:.2f}'
+
+
+if __name__ == '__main__':
+    main()
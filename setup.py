@@ -15,10 +15,12 @@ setup(
         'lxml',
         'xmlschema',
         'Faker',
-        'rstr',
         'PyYAML',
         'shtab'
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     author='Alexey Akimov',
     author_email='lex.akimov23@gmail.com',
     description='Generates XML documents from XSD schemas',
@@ -1,11 +1,120 @@
 import os
+import subprocess
+import sys
+from pathlib import Path
 
+import pytest
+from xmlschema import XMLSchema
+
+import benchmark
 import tests
 
 os.chdir(os.path.dirname(os.path.abspath(tests.__file__)))
 
+_ROOT = Path(tests.__file__).parent.parent
+
+
+def _run_xmlgenerator(*args) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=str(_ROOT))
+    return subprocess.run([sys.executable, '-m', 'xmlgenerator.bootstrap', *args],
+                          cwd=_ROOT, env=env, capture_output=True, check=True)
+
 
+@pytest.mark.integration
 class TestIntegration:
 
-    def test_integration(self):
-        pass
+    @pytest.mark.parametrize('config', [benchmark.CONFIG, benchmark.CONFIG_LARGE])
+    def test_benchmark_configurations_generate_valid_documents(self, tmp_path, config):
+        _run_xmlgenerator('-c', config, '--count', '2', '-s', '1', '-o', str(tmp_path),
+                          *benchmark.EXAMPLES, *benchmark.COMPLEX)
+
+        documents = sorted(tmp_path.glob('*.xml'))
+        assert len(documents) == 10
+        for document in documents:
+            schema_name = document.name.split('_2')[0]
+            schema_file = next(_ROOT / schema for schema in benchmark.EXAMPLES + benchmark.COMPLEX
+                               if Path(schema).stem == schema_name)
+            XMLSchema(schema_file).validate(document)
+
+    def test_parallel_output_is_identical_to_serial(self):
+        args = ('-c', benchmark.CONFIG, '--count', '20', '-s', '1', '--stdout-format', 'nul', *benchmark.EXAMPLES)
+
+        serial = _run_xmlgenerator(*args).stdout
+        parallel = _run_xmlgenerator('-w', '2', *args).stdout
+
+        assert serial.count(b'\0') == 80
+        assert parallel == serial
+
+
+@pytest.mark.integration
+class TestBenchmark:
+
+    def test_run_scenario(self):
+        scenario = benchmark.select_scenarios(['examples-single'])[0]
+
+        result = benchmark.run_scenario(scenario, 2)
+
+        assert result['documents'] == 8
+        assert result['documents_per_second'] > 0
+        assert result['megabytes_per_second'] > 0
+        assert 0 < result['time_to_first_document'] <= result['wall_time']
+        if hasattr(os, 'wait4'):
+            assert result['peak_rss_mb'] > 0
+
+    def test_compare(self):
+        environment = benchmark.environment()
+        baseline = {'environment': environment, 'scale': 1.0, 'scenarios': {
+            'a': {'documents_per_second': 100.0, 'peak_rss_mb': 50.0, 'time_to_first_document': 0.5},
+            'b': {'documents_per_second': 10.0},
+        }}
+        result = {'environment': environment, 'scale': 1.0, 'scenarios': {
+            'a': {'documents_per_second': 80.0, 'peak_rss_mb': 52.0, 'time_to_first_document': 0.3},
+            'c': {'documents_per_second': 10.0},
+        }}
+
+        lines, regressions = benchmark.compare(baseline, result, threshold=10)
+
+        assert regressions == ['a: documents_per_second -20.0%']
+        assert 'c                    not in the baseline' in lines
+        assert 'b                    not in the results' in lines
+        assert not any(line.startswith('warning') for line in lines)
+
+    def test_worker_scenarios_are_skipped_on_fewer_cpus(self, monkeypatch):
+        monkeypatch.setattr(os, 'cpu_count', lambda: 1)
+        run = {'documents': 1, 'documents_per_second': 1.0, 'megabytes_per_second': 1.0, 'peak_rss_mb': 1.0,
+               'time_to_first_document': 1.0}
+        monkeypatch.setattr(benchmark, 'run_scenario', lambda scenario, count: run)
+
+        result = benchmark.run_benchmarks(benchmark.select_scenarios(['complex-large*']), repeat=1, scale=0.2)
+
+        assert list(result['scenarios']) == ['complex-large']
+        assert result['skipped'] == {'complex-large-w4': '4 workers, but only 1 CPU(s)'}
+
+    def test_compare_skips_worker_scenarios(self):
+        environment = dict(benchmark.environment(), cpu_count=8)
+        baseline = {'environment': dict(environment, cpu_count=1), 'scale': 1.0, 'scenarios': {
+            'complex-faker': {'documents_per_second': 100.0},
+            'complex-faker-w4': {'documents_per_second': 100.0},
+        }}
+        result = {'environment': environment, 'scale': 1.0, 'scenarios': {
+            'complex-faker': {'documents_per_second': 100.0},
+            'complex-faker-w4': {'documents_per_second': 50.0},
+        }}
+
+        lines, regressions = benchmark.compare(baseline, result, threshold=10)
+
+        # the baseline was recorded with one CPU, its worker scenarios are not compared
+        assert regressions == []
+        assert 'complex-faker-w4     skipped: 4 workers, but only 1 CPU(s)' in lines
+
+        baseline['environment']['cpu_count'] = 8
+        baseline['skipped'] = {'examples-faker-w4': '4 workers, but only 1 CPU(s)'}
+        lines, regressions = benchmark.compare(baseline, result, threshold=10)
+
+        assert regressions == ['complex-faker-w4: documents_per_second -50.0%']
+        assert 'examples-faker-w4    skipped: 4 workers, but only 1 CPU(s)' in lines
+
+    def test_select_scenarios(self):
+        assert [s.name for s in benchmark.select_scenarios(['complex-large*'])] == ['complex-large',
+                                                                                     'complex-large-w4']
+        assert len(benchmark.select_scenarios(None)) == len(benchmark.SCENARIOS)
@@ -8,7 +8,8 @@ import pytest
 
 import tests
 from xmlgenerator import __version__
-from xmlgenerator.arguments import parse_args
+from xmlgenerator.arguments import parse_args, check_output_counts
+from xmlgenerator.configuration import Config, GeneratorConfig, GlobalGeneratorConfig
 
 os.chdir(os.path.dirname(os.path.abspath(tests.__file__)))
 
@@ -194,6 +195,342 @@ class TestTwoSchemas:
         assert f'error: option -o/--output points to existing file {existing_file}. It must be a directory when multiple schemas are provided.' in captured.err
 
 
+class TestArchiveOutput:
+
+    @pytest.mark.parametrize('archive', ['output.zip', 'output.tar', 'output.tar.gz'])
+    def test_parse_args__archive(self, capsys, archive):
+        args, xsd_files, output_path = parse(f'program --count 10 -o {archive} data/simple_schemas/')
+
+        assert output_path == Path(archive)
+        assert not output_path.exists()
+
+    def test_parse_args__archive_in_new_folder(self, capsys, tmp_path):
+        archive = tmp_path / 'new' / 'output.zip'
+        args, xsd_files, output_path = parse(f'program -o {archive} data/simple_schemas/schema_1.xsd')
+
+        assert archive.parent.is_dir()
+
+    def test_parse_args__archive_points_to_existing_dir(self, capsys, tmp_path):
+        archive = tmp_path / 'output.zip'
+        archive.mkdir()
+        with pytest.raises(SystemExit) as excinfo:
+            parse(f'program -o {archive} data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert f'error: option -o/--output points to existing directory {archive}. It must be an archive file.' \
+               in captured.err
+
+    def test_parse_args__archive_with_streaming(self, capsys):
+        with pytest.raises(SystemExit) as excinfo:
+            parse('program --stream -o output.tar data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert "error: option --stream can't be used with archive output." in captured.err
+
+
+class TestStdoutFormat:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.stdout_format == 'text'
+
+    @pytest.mark.parametrize('stdout_format', ['text', 'length', 'nul', 'lines'])
+    def test_parse_args__stdout_format(self, capsys, stdout_format):
+        args, xsd_files, output_path = parse(f'program --stdout-format {stdout_format} data/simple_schemas/schema_1.xsd')
+
+        assert args.stdout_format == stdout_format
+
+    @pytest.mark.parametrize('cmd_line, message', [
+        ('--stdout-format nul -o output.xml', "option --stdout-format can't be used with option -o/--output."),
+        ('--stdout-format lines -p', "option -p/--pretty can't be used with --stdout-format lines."),
+    ])
+    def test_parse_args__stdout_format_errors(self, capsys, cmd_line, message):
+        with pytest.raises(SystemExit) as excinfo:
+            parse(f'program {cmd_line} data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert f'error: {message}' in captured.err
+
+
+class TestCompression:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.compress is None
+        assert args.compress_level is None
+
+    @pytest.mark.parametrize('compress, level', [('gzip', 1), ('bz2', 9), ('xz', 0)])
+    def test_parse_args__compress(self, capsys, compress, level):
+        args, xsd_files, output_path = parse(
+            f'program --compress {compress} --compress-level {level} -o output.xml data/simple_schemas/schema_1.xsd')
+
+        assert args.compress == compress
+        assert args.compress_level == level
+
+    @pytest.mark.parametrize('compress, level, message', [
+        ('gzip', 0, 'between 1 and 9 for gzip'),
+        ('bz2', 10, 'between 1 and 9 for bz2'),
+        ('xz', -1, 'between 0 and 9 for xz'),
+    ])
+    def test_parse_args__compress_level_out_of_range(self, capsys, compress, level, message):
+        with pytest.raises(SystemExit) as excinfo:
+            parse(f'program --compress {compress} --compress-level {level} -o output.xml '
+                  f'data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert f'error: option --compress-level must be {message}.' in captured.err
+
+    @pytest.mark.parametrize('cmd_line, message', [
+        ('--compress-level 5 -o output.xml', 'option --compress-level requires option --compress.'),
+        ('--compress gzip', 'option --compress requires option -o/--output.'),
+        ('--compress gzip -o output.zip', "option --compress can't be used with archive output."),
+    ])
+    def test_parse_args__compress_errors(self, capsys, cmd_line, message):
+        with pytest.raises(SystemExit) as excinfo:
+            parse(f'program {cmd_line} data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert f'error: {message}' in captured.err
+
+
+class TestDocumentsCount:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        # not specified: count of the configuration file is used (1 by default)
+        assert args.count is None
+
+    def test_parse_args__count(self, capsys):
+        args, xsd_files, output_path = parse('program --count 100 data/simple_schemas/schema_1.xsd')
+
+        assert args.count == 100
+
+    @pytest.mark.parametrize('count', ['0', '-1'])
+    def test_parse_args__count_not_positive(self, capsys, count):
+        with pytest.raises(SystemExit) as excinfo:
+            parse(f'program --count {count} data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert 'error: option --count must be a positive integer.' in captured.err
+
+    def test_parse_args__count__check_output_is_dir(self, capsys):
+        with pytest.raises(SystemExit) as excinfo:
+            parse('program --count 2 -o out.xml data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert 'error: option -o/--output must be a directory when option --count is greater than 1.' in captured.err
+
+    def test_parse_args__count__create_output_folder(self, capsys):
+        assert not Path("output_dir").exists()
+        parse('program --count 2 -o output_dir data/simple_schemas/schema_1.xsd')
+        assert Path("output_dir").exists()
+        Path("output_dir").rmdir()
+
+    @pytest.mark.parametrize('specific, count', [
+        pytest.param({'schema_1': GeneratorConfig(count=3)}, None, id='specific'),
+        pytest.param({'schema_1': GeneratorConfig(count=3)}, 1, id='specific over option'),
+        pytest.param({}, None, id='global'),
+    ])
+    def test_check_output_counts__output_is_file(self, capsys, specific, count):
+        config = Config(global_=GlobalGeneratorConfig(count=2), specific=specific)
+        xsd_files = [Path('data/simple_schemas/schema_1.xsd')]
+
+        with pytest.raises(SystemExit) as excinfo:
+            check_output_counts(xsd_files, Path('out.xml'), config, count)
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert ('error: option -o/--output must be a directory when count of documents for schema schema_1.xsd '
+                'is greater than 1.') in captured.err
+
+    def test_check_output_counts__option_over_global_count(self, tmp_path):
+        config = Config(global_=GlobalGeneratorConfig(count=2))
+        xsd_files = [Path('data/simple_schemas/schema_1.xsd')]
+
+        check_output_counts(xsd_files, Path('out.xml'), config, 1)
+        check_output_counts(xsd_files, tmp_path, config, None)
+        check_output_counts(xsd_files, Path('out.zip'), config, None)
+        check_output_counts(xsd_files, None, config, None)
+
+
+class TestWorkers:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.workers == 1
+
+    def test_parse_args__all_cores(self, capsys):
+        args, xsd_files, output_path = parse('program -w 0 data/simple_schemas/schema_1.xsd')
+
+        assert args.workers == (os.cpu_count() or 1)
+
+    def test_parse_args__negative(self, capsys):
+        with pytest.raises(SystemExit) as excinfo:
+            parse('program --workers -1 data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert 'error: option -w/--workers must not be negative.' in captured.err
+
+
+class TestFakerPool:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.faker_pool is None
+
+    def test_parse_args__size(self, capsys):
+        args, xsd_files, output_path = parse('program --faker-pool 1000 data/simple_schemas/schema_1.xsd')
+
+        assert args.faker_pool == 1000
+
+    @pytest.mark.parametrize('size', ['0', '-1'])
+    def test_parse_args__not_positive(self, capsys, size):
+        with pytest.raises(SystemExit) as excinfo:
+            parse(f'program --faker-pool {size} data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert 'error: option --faker-pool must be a positive integer.' in captured.err
+
+
+class TestProfile:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.profile is None
+
+    def test_parse_args__profile(self, capsys):
+        args, xsd_files, output_path = parse('program --profile run.prof data/simple_schemas/schema_1.xsd')
+
+        assert args.profile == 'run.prof'
+
+
+class TestStats:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.stats is None
+
+    def test_parse_args__stats(self, capsys):
+        args, xsd_files, output_path = parse('program --stats stats.json data/simple_schemas/schema_1.xsd')
+
+        assert args.stats == 'stats.json'
+
+
+class TestMemoryReport:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.memory_report is False
+
+    def test_parse_args__memory_report(self, capsys):
+        args, xsd_files, output_path = parse('program --memory-report data/simple_schemas/schema_1.xsd')
+
+        assert args.memory_report is True
+
+
+class TestHotSpots:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.hotspots is None
+
+    def test_parse_args__hotspots(self, capsys):
+        args, xsd_files, output_path = parse('program --hotspots 20 data/simple_schemas/schema_1.xsd')
+
+        assert args.hotspots == 20
+
+    def test_parse_args__invalid_hotspots(self, capsys):
+        with pytest.raises(SystemExit) as excinfo:
+            parse('program --hotspots 0 data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert 'error: option --hotspots must be a positive integer.' in captured.err
+
+
+class TestStreaming:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.stream is False
+
+    def test_parse_args__requires_output(self, capsys):
+        with pytest.raises(SystemExit) as excinfo:
+            parse('program --stream data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert 'error: option --stream requires option -o/--output.' in captured.err
+
+
+class TestValidationSampling:
+
+    def test_parse_args__default_value(self, capsys):
+        args, xsd_files, output_path = parse('program data/simple_schemas/schema_1.xsd')
+
+        assert args.validate_sample is None
+        assert args.validate_first == 0
+        assert args.validate_budget is None
+
+    @pytest.mark.parametrize('sample, expected', [('1/100', 0.01), ('0.25', 0.25), ('1', 1.0), ('0', 0.0)])
+    def test_parse_args__sample(self, capsys, sample, expected):
+        args, xsd_files, output_path = parse(f'program --validate-sample {sample} data/simple_schemas/schema_1.xsd')
+
+        assert args.validate_sample == expected
+
+    @pytest.mark.parametrize('sample', ['abc', '1/0', '1/x'])
+    def test_parse_args__sample_invalid(self, capsys, sample):
+        with pytest.raises(SystemExit) as excinfo:
+            parse(f'program --validate-sample {sample} data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert f"invalid fraction value: '{sample}'" in captured.err
+
+    @pytest.mark.parametrize('sample', ['2', '3/2'])
+    def test_parse_args__sample_out_of_range(self, capsys, sample):
+        with pytest.raises(SystemExit) as excinfo:
+            parse(f'program --validate-sample {sample} data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert 'error: option --validate-sample must be between 0 and 1.' in captured.err
+
+    def test_parse_args__first_and_budget(self, capsys):
+        args, xsd_files, output_path = parse(
+            'program --validate-sample 1/100 --validate-first 10 --validate-budget 2.5 data/simple_schemas/schema_1.xsd')
+
+        assert args.validate_first == 10
+        assert args.validate_budget == 2.5
+
+    def test_parse_args__first_negative(self, capsys):
+        with pytest.raises(SystemExit) as excinfo:
+            parse('program --validate-first -1 data/simple_schemas/schema_1.xsd')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 2
+        assert 'error: option --validate-first must not be negative.' in captured.err
+
+
 class TestInputFolder:
 
     def test_parse_args__folder_empty(self, capsys):
@@ -274,3 +611,22 @@ class TestNamespaceAliases:
         assert excinfo.value.code == 2
         assert 'usage: xmlgenerator [-h]' in captured.out
         assert 'multiple aliases passed for namespace "ns". Check the use of -n/--namespace flags.' in captured.err
+
+
+class TestCompletion:
+
+    @pytest.mark.parametrize('shell', ['bash', 'zsh', 'tcsh', 'fish', 'powershell'])
+    def test_parse_args__completion(self, capsys, shell):
+        with pytest.raises(SystemExit) as excinfo:
+            parse(f'program -C {shell}')
+
+        captured = capsys.readouterr()
+        assert excinfo.value.code == 0
+        assert 'xmlgenerator' in captured.out
+
+    def test_parse_args__completion_help_lists_shells(self, capsys):
+        with pytest.raises(SystemExit):
+            parse('program -h')
+
+        help_text = ' '.join(capsys.readouterr().out.split())
+        assert 'print a shell completion script (bash, zsh, tcsh, fish, powershell)' in help_text
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import tests
+
+_ROOT = Path(tests.__file__).parent.parent
+_HEAVY_PACKAGES = ('faker', 'lxml', 'xmlschema', 'elementpath', 'yaml', 'shtab')
+
+_SCRIPT = '''
+import json, sys
+sys.argv = ['xmlgenerator'] + json.loads(sys.argv[1])
+import xmlgenerator.bootstrap
+if len(sys.argv) > 1:
+    try:
+        xmlgenerator.bootstrap.main()
+    except SystemExit:
+        pass
+print(json.dumps(sorted(sys.modules)), file=sys.stderr)
+'''
+
+
+def _imported_packages(*args) -> set[str]:
+    env = dict(os.environ, PYTHONPATH=str(_ROOT))
+    result = subprocess.run([sys.executable, '-c', _SCRIPT, json.dumps(args)],
+                            cwd=_ROOT, env=env, capture_output=True, text=True, check=True)
+    modules = json.loads(result.stderr.splitlines()[-1])
+    return {module.split('.')[0] for module in modules} & set(_HEAVY_PACKAGES)
+
+
+@pytest.mark.parametrize('args', [
+    pytest.param((), id='import'),
+    pytest.param(('--version',), id='version'),
+    pytest.param(('--help',), id='help'),
+])
+def test_heavy_dependencies_not_imported(args):
+    assert _imported_packages(*args) == set()
+
+
+def test_completion_imports_shtab_only():
+    assert _imported_packages('-C', 'bash') == {'shtab'}
+
+
+def test_faker_not_imported_without_faker_values():
+    imported = _imported_packages('-v', 'none', 'tests/data/simple_schemas/schema_1.xsd')
+
+    assert 'faker' not in imported
+    assert {'lxml', 'xmlschema'} <= imported
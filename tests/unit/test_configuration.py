@@ -170,3 +170,15 @@ def test_load_config_name_patterns_overlapping():
     # Should use the config from the first matching pattern 'Schema_.*'
     config = configuration.get_for_file("Schema_B")
     assert config.output_filename == "pattern2"
+
+
+def test_load_config_count():
+    configuration = conf.load_config('data/config_count.yaml')
+
+    assert configuration.global_.count is None
+
+    config = configuration.get_for_file("Schema_01")
+    assert config.count == 25
+
+    config = configuration.get_for_file("Schema_02")
+    assert config.count is None
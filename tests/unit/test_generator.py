@@ -1,3 +1,4 @@
+import io
 import os
 import re
 from datetime import datetime
@@ -9,8 +10,10 @@ from xmlschema import XMLSchema
 from xmlschema.names import XSD_NAMESPACE
 
 import tests
-from xmlgenerator.configuration import GeneratorConfig
-from xmlgenerator.generator import XmlGenerator, merge_constraints, get_ns_map
+from xmlgenerator.configuration import GeneratorConfig, RandomizationConfig
+from xmlgenerator.generator import XmlGenerator, merge_constraints, get_ns_map, ElementPlan, GroupPlan, \
+    InstrumentedXmlGenerator, _StreamWriter
+from xmlgenerator.hotspots import HotSpots
 from xmlgenerator.randomization import Randomizer
 from xmlgenerator.substitution import Substitutor
 
@@ -886,6 +889,139 @@ class TestComplexTypesGeneration:
             assert counts_by_occurs_item_forb[0] == 100
 
 
+class TestStreamingGeneration:
+
+    @pytest.mark.parametrize('encoding', ['utf-8', 'windows-1251'])
+    @pytest.mark.parametrize('pretty_print', [False, True])
+    @pytest.mark.parametrize('xsd', ['data/complex_schema.xsd', 'data/namespaces/custom_ns_1.xsd',
+                                     'data/simple_schemas/schema_1.xsd', 'data/simple_schemas/schema_2.xsd'])
+    def test_write_xml_is_identical_to_tostring(self, config, xsd, encoding, pretty_print):
+        xsd_schema = XMLSchema(xsd)
+        ns_map = get_ns_map(xsd_schema)
+
+        randomizer = Randomizer(seed=42)
+        generator = XmlGenerator(randomizer, Substitutor(randomizer, None))
+        generated_xml = generator.generate_xml(xsd_schema.root_elements[0], config, ns_map)
+        expected = etree.tostring(generated_xml, encoding=encoding, pretty_print=pretty_print)
+
+        randomizer = Randomizer(seed=42)
+        generator = XmlGenerator(randomizer, Substitutor(randomizer, None))
+        output = io.BytesIO()
+        generator.write_xml(output, xsd_schema.root_elements[0], config, ns_map, encoding, pretty_print)
+
+        assert output.getvalue() == expected
+
+    @pytest.mark.parametrize('pretty_print', [False, True])
+    def test_empty_elements_are_written_as_empty_element_tags(self, pretty_print):
+        ns_map = {None: 'urn:d', 'a': 'urn:a'}
+        output = io.BytesIO()
+        with etree.xmlfile(output) as xml_file:
+            writer = _StreamWriter(xml_file, ns_map, pretty_print, output, 'utf-8')
+            writer.start('{urn:d}root', {})
+            writer.start('{urn:a}empty', {'k': 'v<'})
+            writer.end()
+            writer.start('{urn:d}text', {})
+            writer.text('')
+            writer.end()
+            writer.start('{urn:d}parent', {})
+            writer.start('{urn:d}empty', {})
+            writer.text(None)
+            writer.end()
+            writer.end()
+            writer.end()
+
+        if pretty_print:
+            expected = ('<root xmlns="urn:d" xmlns:a="urn:a">\n  <a:empty k="v&lt;"/>\n  <text></text>\n  <parent>\n'
+                        '    <empty/>\n  </parent>\n</root>')
+        else:
+            expected = ('<root xmlns="urn:d" xmlns:a="urn:a"><a:empty k="v&lt;"/><text></text><parent><empty/></parent>'
+                        '</root>')
+        assert output.getvalue().decode() == expected
+
+
+class TestInstrumentedGenerator:
+
+    def test_documents_are_identical(self):
+        xsd_schema = XMLSchema('data/complex_schema.xsd')
+        config = GeneratorConfig()
+        config.value_override["name"] = "{{ any('John', 'Jane') }}"
+
+        randomizer = Randomizer(seed=42)
+        expected = XmlGenerator(randomizer, Substitutor(randomizer, None)).generate_xml(
+            xsd_schema.root_elements[0], config)
+        randomizer = Randomizer(seed=42)
+        generator = InstrumentedXmlGenerator(randomizer, Substitutor(randomizer, None), HotSpots())
+        generated_xml = generator.generate_xml(xsd_schema.root_elements[0], config)
+
+        assert etree.tostring(generated_xml) == etree.tostring(expected)
+
+    def test_hotspots(self):
+        xsd_schema = XMLSchema('data/complex_schema.xsd')
+        config = GeneratorConfig()
+        config.value_override["name"] = "John"
+        hotspots = HotSpots()
+        randomizer = Randomizer(seed=42)
+        generator = InstrumentedXmlGenerator(randomizer, Substitutor(randomizer, None), hotspots)
+
+        generated_xml = generator.generate_xml(xsd_schema.root_elements[0], config)
+
+        elements = {key: (calls, total, own) for key, calls, total, own in hotspots.top('element', 100)}
+        persons = len(generated_xml.xpath('/root/person'))
+        assert elements['/root'][0] == 1
+        assert elements['/root/person'][0] == persons
+        assert elements['/root/person/address/city'][0] == persons
+        # own time of an element excludes its child elements
+        root_calls, root_total, root_own = elements['/root']
+        assert root_own < root_total
+        assert sum(own for calls, total, own in elements.values()) == pytest.approx(root_total)
+
+        overrides = {key: calls for key, calls, total, own in hotspots.top('override', 100)}
+        assert overrides == {'name -> John': persons}
+        types = {key: calls for key, calls, total, own in hotspots.top('type', 100)}
+        assert types['string'] >= 4 * persons
+
+
+class TestGenerationPlan:
+
+    def test_plan_structure(self, generator):
+        xsd_schema = XMLSchema('data/complex_schema.xsd')
+        config = GeneratorConfig(randomization=RandomizationConfig(max_occurs=3))
+        plan = generator.compile_plan(xsd_schema.root_elements[0], config)
+
+        root = plan.root
+        assert isinstance(root, ElementPlan)
+        assert root.name == xsd_schema.root_elements[0].name
+        assert isinstance(root.content, GroupPlan)
+        for particle in root.content.particles:
+            assert particle.max_occurs <= 3
+            assert not hasattr(particle, '__dict__')
+
+    def test_plan_is_cached(self, generator, config):
+        xsd_schema = XMLSchema('data/complex_schema.xsd')
+        xsd_root_element = xsd_schema.root_elements[0]
+        generator.generate_xml(xsd_root_element, config)
+        plan = generator._get_plan(xsd_root_element, config)
+        generator.generate_xml(xsd_root_element, config)
+        assert generator._get_plan(xsd_root_element, config) is plan
+        assert generator._get_plan(xsd_root_element, GeneratorConfig()) is not plan
+
+    def test_recursive_schema(self, generator):
+        xsd_schema = XMLSchema("""<?xml version="1.0" encoding="UTF-8"?>
+        <xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+            <xs:element name="node" type="NodeType"/>
+            <xs:complexType name="NodeType">
+                <xs:sequence>
+                    <xs:element name="value" type="xs:string"/>
+                    <xs:element name="node" type="NodeType" minOccurs="0" maxOccurs="2"/>
+                </xs:sequence>
+            </xs:complexType>
+        </xs:schema>""")
+        config = GeneratorConfig(randomization=RandomizationConfig(probability=0.1))
+        plan = generator.compile_plan(xsd_schema.root_elements[0], config)
+        nested = plan.root.content.particles[1]
+        assert nested.content is nested.content.particles[1].content
+
+
 class TestMergeConstraints:
 
     @pytest.mark.parametrize("left, right, expected_left, expected_right", [
@@ -0,0 +1,42 @@
+from xmlgenerator.hotspots import HotSpots
+
+
+def test_top():
+    hotspots = HotSpots()
+    hotspots.add('element', '/a', 3.0, 1.0)
+    hotspots.add('element', '/a/b', 2.0, 2.0)
+    hotspots.add('element', '/a/b', 2.0, 2.0)
+    hotspots.add('type', 'string', 0.5, 0.5)
+
+    assert hotspots.top('element', 10) == [('/a/b', 2, 4.0, 4.0), ('/a', 1, 3.0, 1.0)]
+    assert hotspots.top('element', 1) == [('/a/b', 2, 4.0, 4.0)]
+    assert hotspots.top('override', 10) == []
+
+
+def test_worker_hotspots_are_merged(tmp_path):
+    worker = HotSpots()
+    worker.add('element', '/a', 3.0, 1.0, 10)
+    worker.add('override', 'Name -> John', 1.0, 1.0, 5)
+    worker.save_worker_hotspots(tmp_path)
+
+    hotspots = HotSpots()
+    hotspots.add('element', '/a', 1.0, 1.0, 2)
+
+    assert hotspots.load_worker_hotspots(tmp_path) == 1
+    assert hotspots.top('element', 10) == [('/a', 12, 4.0, 2.0)]
+    assert hotspots.top('override', 10) == [('Name -> John', 5, 1.0, 1.0)]
+
+
+def test_format_report():
+    hotspots = HotSpots()
+    hotspots.add('element', '/a', 3.0, 1.0, 4)
+    hotspots.add('type', 'x' * 70, 2.0, 2.0, 1000)
+
+    assert hotspots.format_report(5).splitlines() == [
+        'hot spots, top 5 by own time:',
+        '                                                                    calls     total, s       own, s   own/call, us',
+        'elements (total time includes child elements):',
+        '  /a                                                                    4        3.000        1.000       250000.0',
+        'XSD types (values generated by type):',
+        '  ...xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx       1000        2.000        2.000         2000.0',
+    ]
@@ -0,0 +1,155 @@
+import os
+import random
+
+import pytest
+
+import xmlgenerator.lines as lines
+from xmlgenerator.lines import LineStore, LineStoreCache
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(lines, '_CHUNK_SIZE', 7)
+
+
+@pytest.mark.parametrize('content', [
+    pytest.param(b'', id='empty'),
+    pytest.param(b'\n \n', id='whitespaces'),
+    pytest.param(b'a', id='one line'),
+    pytest.param(b'a\nb\n\n', id='trailing line breaks'),
+    pytest.param(b'a\r\nbb\r\n', id='crlf'),
+    pytest.param(b'\n\na\n\nb \n', id='empty lines'),
+    pytest.param('Первая строка\nВторая строка\nТретья'.encode('utf-8'), id='utf-8'),
+    pytest.param(b'abcdefghijklmnop\nq\nrstuvwxyz0123456789', id='lines longer than chunk'),
+])
+@pytest.mark.parametrize('persist_index_min_size', [0, 1 << 30])
+def test_lines(tmp_path, small_chunks, content, persist_index_min_size):
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_bytes(content)
+    text = content.decode('utf-8').replace('\r\n', '\n').rstrip()
+    expected = text.split('\n') if text else []
+
+    store = LineStore(file_path, persist_index_min_size, tmp_path / 'cache')
+
+    assert len(store) == len(expected)
+    assert list(store) == expected
+    with pytest.raises(IndexError):
+        _ = store[len(expected)]
+    store.close()
+
+
+def test_random_choice(tmp_path):
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_text('a\nb\nc\n', encoding='utf-8')
+    store = LineStore(file_path)
+
+    assert random.Random(1).choice(store) == random.Random(1).choice(['a', 'b', 'c'])
+    store.close()
+
+
+def test_index_persisted(tmp_path, small_chunks):
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_text('a\nbb\nccc\n', encoding='utf-8')
+    index_dir = tmp_path / 'cache'
+
+    LineStore(file_path, persist_index_min_size=0, index_dir=index_dir).close()
+    # the index is saved to the index directory, not next to the text file
+    assert [p.suffix for p in index_dir.iterdir()] == ['.lineidx']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['cache', 'lines.txt']
+
+    store = LineStore(file_path, persist_index_min_size=0, index_dir=index_dir)
+    assert store._index_mmap is not None
+    assert list(store) == ['a', 'bb', 'ccc']
+    store.close()
+
+
+def test_index_not_persisted_for_small_file(tmp_path):
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_text('a\nbb\nccc\n', encoding='utf-8')
+
+    LineStore(file_path, index_dir=tmp_path / 'cache').close()
+
+    assert not (tmp_path / 'cache').exists()
+
+
+def test_index_kept_in_memory_if_it_can_not_be_saved(tmp_path):
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_text('a\nbb\nccc\n', encoding='utf-8')
+    # index directory can't be created
+    index_dir = file_path / 'cache'
+
+    store = LineStore(file_path, persist_index_min_size=0, index_dir=index_dir)
+
+    assert store._index_mmap is None
+    assert list(store) == ['a', 'bb', 'ccc']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['lines.txt']
+    store.close()
+
+
+def test_index_not_persisted_without_index_dir(tmp_path):
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_text('a\nbb\nccc\n', encoding='utf-8')
+
+    store = LineStore(file_path, persist_index_min_size=0)
+
+    assert list(store) == ['a', 'bb', 'ccc']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['lines.txt']
+    store.close()
+
+
+def test_default_index_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(lines.sys, 'platform', 'linux')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+
+    assert lines.default_index_dir() == tmp_path / 'xmlgenerator' / 'lines'
+
+
+def test_outdated_index_rebuilt(tmp_path):
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_text('a\nbb\nccc\n', encoding='utf-8')
+    index_dir = tmp_path / 'cache'
+    LineStore(file_path, persist_index_min_size=0, index_dir=index_dir).close()
+
+    file_path.write_text('dddd\ne\n', encoding='utf-8')
+    stat = file_path.stat()
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    store = LineStore(file_path, persist_index_min_size=0, index_dir=index_dir)
+
+    assert list(store) == ['dddd', 'e']
+    store.close()
+    store = LineStore(file_path, persist_index_min_size=0, index_dir=index_dir)
+    assert store._index_mmap is not None
+    assert list(store) == ['dddd', 'e']
+    store.close()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    files = []
+    for name in ('a', 'b', 'c'):
+        file_path = tmp_path / f'{name}.txt'
+        file_path.write_text(f'{name}1\n{name}2\n{name}3\n', encoding='utf-8')
+        files.append(file_path)
+    # index of each file: 4 offsets of 8 bytes
+    cache = LineStoreCache(memory_budget=64)
+
+    store_a = cache.get(files[0])
+    cache.get(files[1])
+    assert cache.get(files[0]) is store_a
+    cache.get(files[2])
+
+    assert list(cache._stores) == [files[0], files[2]]
+    assert cache._size == 64
+    cache.clear()
+    assert not cache._stores
+
+
+def test_cache_keeps_store_exceeding_budget(tmp_path):
+    file_path = tmp_path / 'lines.txt'
+    file_path.write_text('a\nb\n', encoding='utf-8')
+    cache = LineStoreCache(memory_budget=1)
+
+    store = cache.get(file_path)
+
+    assert cache.get(file_path) is store
+    assert list(store) == ['a', 'b']
+    cache.clear()
@@ -0,0 +1,128 @@
+import threading
+import tracemalloc
+
+import pytest
+
+from xmlgenerator.memory import MemoryTracker
+from xmlgenerator.profiling import Profiler
+
+_SIZE = 4 << 20
+
+
+@pytest.fixture
+def tracker():
+    tracker = MemoryTracker()
+    tracker.start()
+    yield tracker
+    tracker.stop()
+
+
+def test_peak_and_retained(tracker):
+    kept = []
+    with tracker.phase('generation', 'a.xsd'):
+        bytearray(_SIZE)
+    with tracker.phase('serialization', 'a.xsd'):
+        kept.append(bytearray(_SIZE))
+    tracker.stop()
+
+    count, peak, retained, rss_peak = tracker._phases[('a.xsd', 'generation')]
+    assert count == 1
+    assert peak >= _SIZE
+    assert abs(retained) < _SIZE // 4
+    count, peak, retained, rss_peak = tracker._phases[('a.xsd', 'serialization')]
+    assert peak >= _SIZE
+    assert retained >= _SIZE
+    assert tracker._peak_sites[0] == 'a.xsd'
+    assert any(size >= _SIZE and location.endswith('test_memory.py:' + str(_kept_line()))
+               for location, size, blocks in tracker._retained_sites)
+    assert not tracemalloc.is_tracing()
+
+
+def _kept_line():
+    with open(__file__, encoding='utf-8') as f:
+        return next(number for number, line in enumerate(f, 1) if 'kept.append(bytearray' in line)
+
+
+@pytest.mark.parametrize('documents', [2, 20])
+def test_snapshots_do_not_grow_with_documents(monkeypatch, documents):
+    snapshots = []
+    take_snapshot = tracemalloc.take_snapshot
+    monkeypatch.setattr(tracemalloc, 'take_snapshot', lambda: snapshots.append(1) or take_snapshot())
+    tracker = MemoryTracker()
+    tracker.start()
+    kept = []
+    for i in range(documents):
+        for phase in ('generation', 'serialization'):
+            with tracker.phase(phase, 'a.xsd'):
+                # the peak of each document is higher than the previous one
+                kept.append(bytearray(1024 * (i + 1)))
+    tracker.stop()
+
+    # the baseline, at most one snapshot for each phase of the schema and the final one
+    assert len(snapshots) <= 4
+    assert tracker._peak_sites[0] == 'a.xsd'
+
+
+def test_phases_of_other_threads_are_not_measured():
+    profiler = Profiler()
+    tracker = MemoryTracker(profiler)
+    tracker.start()
+    thread = threading.Thread(target=lambda: tracker.phase('write', 'a.xsd').__enter__().__exit__(None, None, None))
+    thread.start()
+    thread.join()
+    with tracker.phase('generation', 'a.xsd'):
+        pass
+    tracker.stop()
+
+    assert list(tracker._phases) == [('a.xsd', 'generation')]
+    assert set(profiler._phases) == {('a.xsd', 'write'), ('a.xsd', 'generation')}
+
+
+def test_worker_memory_is_merged(tmp_path):
+    worker = MemoryTracker()
+    worker.add('generation', 'a.xsd', 100, 10, 1000, 5)
+    worker._peak_sites = ['a.xsd', 'generation', 100, [['a.py:1', 100, 1]]]
+    worker._retained_sites = [['a.py:2', 10, 1]]
+    worker._process_rss_peaks = [2000]
+    worker.save_worker_memory(tmp_path)
+
+    tracker = MemoryTracker()
+    tracker.add('generation', 'a.xsd', 50, 20, 3000, 2)
+    tracker._retained_sites = [['a.py:2', 5, 1], ['b.py:1', 1, 1]]
+    tracker._process_rss_peaks = [4000]
+
+    assert tracker.load_worker_memory(tmp_path) == 1
+    assert tracker._phases[('a.xsd', 'generation')] == [7, 100, 30, 3000]
+    assert tracker._peak_sites == ['a.xsd', 'generation', 100, [['a.py:1', 100, 1]]]
+    assert tracker._retained_sites == [['a.py:2', 15, 2], ['b.py:1', 1, 1]]
+    assert tracker._process_rss_peaks == [4000, 2000]
+
+    data = tracker.to_dict()
+    assert data['schemas']['a.xsd']['generation'] == {'count': 7, 'peak': 100, 'retained': 30, 'rss_peak': 3000}
+    assert data['peak_sites']['sites'] == [{'location': 'a.py:1', 'size': 100, 'blocks': 1}]
+
+
+def test_format_report():
+    tracker = MemoryTracker()
+    tracker.add('import', None, 2 << 20, 1 << 20, None)
+    tracker.add('validation', 'a.xsd', 1 << 20, 0, 3 << 20, 10)
+    tracker.add('generation', 'a.xsd', 2 << 20, 1 << 19, 3 << 20, 10)
+    tracker._peak_sites = ['a.xsd', 'generation', 2 << 20, [['a.py:1', 1 << 20, 3]]]
+    tracker._process_rss_peaks = [4 << 20, 5 << 20]
+
+    assert tracker.format_report().splitlines() == [
+        'memory: peak and retained python allocations (tracemalloc), peak resident set size of the process',
+        'phase                              count     peak, MB   retained, MB   rss peak, MB',
+        'schema a.xsd:',
+        '  generation                          10        2.000          0.500          3.000',
+        '  validation                          10        1.000          0.000          3.000',
+        'all schemas:',
+        '  import                               1        2.000          1.000            n/a',
+        '  generation                          10        2.000          0.500          3.000',
+        '  validation                          10        1.000          0.000          3.000',
+        'peak rss of the process: 4.000 MB',
+        'peak rss of 1 worker process(es): 5.000 MB max',
+        'top allocation sites at the end of the phase with the highest peak '
+        '(generation, a.xsd, peak 2.000 MB; growth since the first schema phase):',
+        '       1.000 MB          3 blocks  a.py:1',
+    ]
@@ -0,0 +1,167 @@
+import bz2
+import gzip
+import lzma
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from xmlgenerator.output import open_sink, get_archive_format, FileSink, TarSink, ZipSink, StdoutSink, \
+    COMPRESSION_CODECS
+
+DOCUMENTS = [(f'document_{i}', f'<root>{i}</root>'.encode()) for i in range(5)]
+
+
+def write_all(sink):
+    for filename, data in DOCUMENTS:
+        sink.write(filename, data)
+    sink.close()
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('out.zip', '.zip'),
+    ('OUT.ZIP', '.zip'),
+    ('out.tar', '.tar'),
+    ('out.tar.gz', '.tar.gz'),
+    ('out.tgz', '.tgz'),
+    ('out.tar.bz2', '.tar.bz2'),
+    ('out.tar.xz', '.tar.xz'),
+    ('out.xml', None),
+    ('out', None),
+    ('out.gz', None),
+])
+def test_get_archive_format(name, expected):
+    assert get_archive_format(Path(name)) == expected
+
+
+def test_open_sink(tmp_path):
+    assert isinstance(open_sink(None, 'utf-8'), StdoutSink)
+    assert isinstance(open_sink(tmp_path, 'utf-8'), FileSink)
+    assert isinstance(open_sink(tmp_path / 'out.xml', 'utf-8'), FileSink)
+    assert isinstance(open_sink(tmp_path / 'out.zip', 'utf-8'), ZipSink)
+    assert isinstance(open_sink(tmp_path / 'out.tar.gz', 'utf-8'), TarSink)
+
+
+def test_file_sink(tmp_path):
+    write_all(FileSink(tmp_path))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f'{name}.xml' for name, _ in DOCUMENTS]
+    assert (tmp_path / 'document_3.xml').read_bytes() == b'<root>3</root>'
+
+
+@pytest.mark.parametrize('archive', ['out.tar', 'out.tar.gz', 'out.tgz', 'out.tar.bz2', 'out.tar.xz'])
+def test_tar_sink(tmp_path, archive):
+    archive_file = tmp_path / archive
+    write_all(open_sink(archive_file, 'utf-8'))
+
+    with tarfile.open(archive_file) as tar:
+        assert tar.getnames() == [f'{name}.xml' for name, _ in DOCUMENTS]
+        assert tar.extractfile('document_3.xml').read() == b'<root>3</root>'
+
+
+def test_zip_sink(tmp_path):
+    archive_file = tmp_path / 'out.zip'
+    write_all(open_sink(archive_file, 'utf-8'))
+
+    with zipfile.ZipFile(archive_file) as zip_file:
+        assert zip_file.namelist() == [f'{name}.xml' for name, _ in DOCUMENTS]
+        assert zip_file.read('document_3.xml') == b'<root>3</root>'
+
+
+def test_stdout_sink(capsysbinary):
+    sink = StdoutSink('windows-1251')
+    sink.write('document', '<root>значение</root>'.encode('cp1251'))
+
+    assert capsysbinary.readouterr().out == '<root>значение</root>\n'.encode('cp1251')
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'windows-1251'])
+@pytest.mark.parametrize('pretty_print', [False, True])
+@pytest.mark.parametrize('archive', ['output', 'output.zip', 'output.tar'])
+def test_document_tree_is_serialized_by_sink(tmp_path, encoding, pretty_print, archive):
+    document = etree.fromstring('<root><item>значение</item><empty/></root>')
+    expected = etree.tostring(document, encoding=encoding, pretty_print=pretty_print)
+    output_path = tmp_path / archive
+    if archive == 'output':
+        output_path.mkdir()
+
+    sink = open_sink(output_path, encoding, pretty_print)
+    sink.write('document', document)
+    sink.close()
+
+    if archive == 'output.zip':
+        with zipfile.ZipFile(output_path) as zip_file:
+            assert zip_file.read('document.xml') == expected
+    elif archive == 'output.tar':
+        with tarfile.open(output_path) as tar:
+            assert tar.extractfile('document.xml').read() == expected
+    else:
+        assert (output_path / 'document.xml').read_bytes() == expected
+
+
+def test_stdout_sink_document_tree(capsysbinary):
+    sink = StdoutSink('utf-8', pretty_print=True)
+    sink.write('document', etree.fromstring('<root><item/></root>'))
+
+    assert capsysbinary.readouterr().out == b'<root>\n  <item/>\n</root>\n\n'
+
+
+@pytest.mark.parametrize('compress, open_func', [('gzip', gzip.open), ('bz2', bz2.open), ('xz', lzma.open)])
+def test_file_sink_compressed(tmp_path, compress, open_func):
+    write_all(FileSink(tmp_path, compress=compress, compress_level=1))
+
+    suffix = COMPRESSION_CODECS[compress][0]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f'{name}.xml{suffix}' for name, _ in DOCUMENTS]
+    with open_func(tmp_path / f'document_3.xml{suffix}') as f:
+        assert f.read() == b'<root>3</root>'
+
+
+@pytest.mark.parametrize('name', ['output.xml', 'output.xml.gz'])
+def test_file_sink_compressed_single_file(tmp_path, name):
+    sink = FileSink(tmp_path / name, compress='gzip')
+    sink.write('document', b'<root/>')
+
+    # the suffix of the codec is added to the file name
+    assert [p.name for p in tmp_path.iterdir()] == ['output.xml.gz']
+    with gzip.open(tmp_path / 'output.xml.gz') as f:
+        assert f.read() == b'<root/>'
+
+
+@pytest.mark.parametrize('stdout_format, expected', [
+    pytest.param('length', b'\0\0\0\0\0\0\0\x0e<root>0</root>\0\0\0\0\0\0\0\x0e<root>1</root>', id='length'),
+    pytest.param('nul', b'<root>0</root>\0<root>1</root>\0', id='nul'),
+    pytest.param('lines', b'<root>0</root>\n<root>1</root>\n', id='lines'),
+])
+def test_stdout_sink_framing(capsysbinary, stdout_format, expected):
+    sink = StdoutSink('utf-8', stdout_format=stdout_format)
+    for filename, data in DOCUMENTS[:2]:
+        sink.write(filename, data)
+    sink.close()
+
+    assert capsysbinary.readouterr().out == expected
+
+
+def test_stdout_sink_lines_escapes_line_breaks(capsysbinary):
+    sink = StdoutSink('utf-8', stdout_format='lines')
+    sink.write('document', b'<root>line 1\r\nline 2</root>\n')
+    sink.close()
+
+    assert capsysbinary.readouterr().out == b'<root>line 1&#13;&#10;line 2</root>\n'
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'windows-1251'])
+def test_stdout_sink_lines_are_well_formed(capsysbinary, encoding):
+    sink = StdoutSink(encoding, stdout_format='lines')
+    root = etree.fromstring('<root a="x&#10;y">строка 1\nстрока 2<item/></root>')
+    sink.write('tree', root)
+    sink.write('bytes', etree.tostring(root, encoding=encoding))
+    sink.close()
+
+    lines = capsysbinary.readouterr().out.splitlines()
+    assert len(lines) == 2
+    for line in lines:
+        parsed = etree.fromstring(line)
+        assert parsed.text == 'строка 1\nстрока 2'
+        assert parsed.get('a') == 'x\ny'
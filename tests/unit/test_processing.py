@@ -0,0 +1,296 @@
+import gc
+import gzip
+import os
+import sys
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+import tests
+from xmlgenerator.configuration import Config, VariablesConfig, GeneratorConfig
+from xmlgenerator.output import FileSink
+from xmlgenerator.processing import DocumentProcessor, DocumentWriter, iter_jobs, process_serial, process_parallel, \
+    DocumentJob
+from xmlgenerator.hotspots import HotSpots
+from xmlgenerator.memory import MemoryTracker
+from xmlgenerator.profiling import Profiler
+
+os.chdir(os.path.dirname(os.path.abspath(tests.__file__)))
+
+XSD_FILES = [
+    Path('data/complex_schema.xsd').resolve(),
+    Path('data/simple_schemas/schema_1.xsd').resolve(),
+    Path('data/simple_schemas/schema_2.xsd').resolve(),
+]
+
+
+@pytest.fixture
+def args():
+    return Namespace(validation='schema', ignore_validation_errors=False, encoding='utf-8', pretty=False,
+                     ns_aliases={}, debug=False, stream=False, schema_cache=None,
+                     validate_sample=None, validate_first=0, validate_budget=None,
+                     compress=None, compress_level=None, random_engine='python', faker_pool=None,
+                     stats=None, profile=None, hotspots=None, memory_report=False)
+
+
+@pytest.fixture
+def config():
+    return Config(variables=VariablesConfig(global_={'batch': '{{ uuid }}'}))
+
+
+def test_iter_jobs(config):
+    config.specific = {'schema_2': GeneratorConfig(count=0)}
+    jobs = list(iter_jobs(XSD_FILES, config, 3))
+
+    assert len(jobs) == 6
+    assert [j.index for j in jobs] == [0, 1, 2, 0, 1, 2]
+    assert [j.xsd_file.name for j in jobs] == ['complex_schema.xsd'] * 3 + ['schema_1.xsd'] * 3
+
+
+def test_iter_jobs__count_precedence(config):
+    config.global_.count = 4
+    config.specific = {'schema_2': GeneratorConfig(count=1)}
+
+    assert [len(list(iter_jobs([xsd_file], config))) for xsd_file in XSD_FILES] == [4, 4, 1]
+    # the command line option takes precedence over the global count, but not over the specific one
+    assert [len(list(iter_jobs([xsd_file], config, 2))) for xsd_file in XSD_FILES] == [2, 2, 1]
+
+
+def test_document_does_not_depend_on_jobs_order(args, config):
+    processor1 = DocumentProcessor(args, config, 123)
+    processor2 = DocumentProcessor(args, config, 123)
+
+    job = DocumentJob(XSD_FILES[0], 5)
+    first = processor1.process(job)
+
+    processor2.process(DocumentJob(XSD_FILES[1], 0))
+    processor2.process(DocumentJob(XSD_FILES[0], 4))
+    second = processor2.process(job)
+
+    assert first == second
+    assert first[0].validation_error is None
+
+
+def test_parallel_output_is_identical_to_serial(args, config):
+    jobs = list(iter_jobs(XSD_FILES, config, 5))
+
+    serial = list(process_serial(DocumentProcessor(args, config, 123), jobs))
+    parallel = list(process_parallel(args, config, 123, None, jobs, 2))
+
+    assert len(serial) == len(jobs)
+    assert serial == parallel
+
+
+def test_streaming_output_is_identical_to_tree(args, config, tmp_path):
+    job = DocumentJob(XSD_FILES[0], 0)
+    expected = DocumentProcessor(args, config, 123).process(job)
+
+    args.stream = True
+    written = DocumentProcessor(args, config, 123, tmp_path).process(job)
+
+    assert written[0].data is None
+    assert written[0].validation_error is None
+    assert written[0].filename == expected[0].filename
+    assert (tmp_path / f'{written[0].filename}.xml').read_bytes() == expected[0].data
+
+
+def test_generated_tree_is_validated(args, config):
+    config.global_.value_override = {'.*': 'invalid value'}
+    documents = DocumentProcessor(args, config, 123).process(DocumentJob(XSD_FILES[0], 0))
+
+    assert documents[0].validation_error is not None
+
+
+def test_validation_sample_does_not_change_documents(args, config):
+    jobs = list(iter_jobs(XSD_FILES, config, 10))
+    expected = list(process_serial(DocumentProcessor(args, config, 123), jobs))
+
+    args.validate_sample = 0.3
+    args.validate_first = 2
+    sampled = list(process_serial(DocumentProcessor(args, config, 123), jobs))
+
+    validated = [d.validated for _, documents in sampled for d in documents]
+    assert [d.data for _, documents in sampled for d in documents] == \
+           [d.data for _, documents in expected for d in documents]
+    assert all(d.validated for _, documents in expected for d in documents)
+    assert 4 <= validated.count(True) < len(validated)
+
+
+def test_parallel_validation_budget_is_shared(args, config):
+    args.validate_budget = 1e-9
+    jobs = list(iter_jobs(XSD_FILES, config, 10))
+
+    results = list(process_parallel(args, config, 123, None, jobs, 2))
+
+    validated = [d.validated for _, documents in results for d in documents]
+    # documents are selected before validation, so each worker may validate one document before the budget is spent
+    assert 1 <= validated.count(True) <= 2
+    assert len(validated) == len(jobs)
+
+
+def test_parallel_processing_can_be_stopped(args, config):
+    jobs = list(iter_jobs(XSD_FILES, config, 200))
+    results = process_parallel(args, config, 123, None, jobs, 2)
+
+    next(results)
+    results.close()
+
+
+def test_document_writer(tmp_path):
+    with DocumentWriter(FileSink(tmp_path), queue_size=2) as writer:
+        for i in range(10):
+            writer.write(str(i), f'<doc{i}/>'.encode())
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(f'{i}.xml' for i in range(10))
+    assert (tmp_path / '7.xml').read_bytes() == b'<doc7/>'
+
+
+def test_document_writer_error(tmp_path):
+    with pytest.raises(OSError):
+        with DocumentWriter(FileSink(tmp_path / 'missing' / 'doc.xml')) as writer:
+            writer.write('doc', b'<doc/>')
+
+
+@pytest.mark.parametrize('validation', ['schema', 'libxml2'])
+def test_streaming_compressed_output(args, config, tmp_path, validation):
+    job = DocumentJob(XSD_FILES[0], 0)
+    expected = DocumentProcessor(args, config, 123).process(job)
+
+    args.stream = True
+    args.compress = 'gzip'
+    args.validation = validation
+    written = DocumentProcessor(args, config, 123, tmp_path).process(job)
+
+    assert written[0].validation_error is None
+    with gzip.open(tmp_path / f'{written[0].filename}.xml.gz') as f:
+        assert f.read() == expected[0].data
+
+
+@pytest.mark.parametrize('compress', [None, 'bz2'])
+def test_streaming_invalid_document_is_validated(args, config, tmp_path, monkeypatch, compress):
+    unraisable = []
+    monkeypatch.setattr(sys, 'unraisablehook', unraisable.append)
+    config.global_.value_override = {'.*': 'invalid value'}
+    args.stream = True
+    args.compress = compress
+
+    documents = DocumentProcessor(args, config, 123, tmp_path).process(DocumentJob(XSD_FILES[0], 0))
+    gc.collect()
+
+    assert documents[0].validation_error is not None
+    # the lazy resource is released before the written file is closed
+    assert unraisable == []
+
+
+def test_serialization_left_to_output(args, config):
+    job = DocumentJob(XSD_FILES[0], 0)
+    expected = DocumentProcessor(args, config, 123).process(job)
+    documents = DocumentProcessor(args, config, 123, serialize=False).process(job)
+
+    assert etree.iselement(documents[0].data)
+    assert etree.tostring(documents[0].data) == expected[0].data
+
+
+def test_phases_are_profiled(args, config):
+    profiler = Profiler()
+    processor = DocumentProcessor(args, config, 123, profiler=profiler)
+
+    processor.process(DocumentJob(XSD_FILES[1], 0))
+    processor.process(DocumentJob(XSD_FILES[1], 1))
+
+    phases = {name: times[2] for (schema, name), times in profiler._phases.items() if schema == 'schema_1.xsd'}
+    assert phases == {'schema build': 1, 'namespace map': 1, 'generation': 2, 'validation': 2, 'serialization': 2}
+
+
+def test_parallel_profiles_are_saved(args, config, tmp_path):
+    args.profile = 'run.prof'
+    jobs = list(iter_jobs(XSD_FILES[1:], config, 3))
+
+    list(process_parallel(args, config, 123, None, jobs, 2, tmp_path))
+
+    profiler = Profiler()
+    assert len(profiler.load_worker_profiles(tmp_path)) == 2
+    assert profiler._phases[('schema_1.xsd', 'generation')][2] == 3
+
+
+def test_document_stats(args, config):
+    args.stats = 'stats.json'
+    documents = DocumentProcessor(args, config, 123).process(DocumentJob(XSD_FILES[0], 0))
+
+    stats = documents[0].stats
+    tree = etree.fromstring(documents[0].data)
+    assert stats.elements == sum(1 for _ in tree.iter(etree.Element))
+    assert stats.attributes == sum(len(element.attrib) for element in tree.iter(etree.Element))
+    assert stats.output_bytes == len(documents[0].data)
+    assert stats.generation_time > 0 and stats.serialization_time > 0 and stats.validation_time > 0
+
+
+def test_document_stats_not_collected_by_default(args, config):
+    documents = DocumentProcessor(args, config, 123).process(DocumentJob(XSD_FILES[0], 0))
+
+    assert documents[0].stats is None
+
+
+@pytest.mark.parametrize('compress', [None, 'gzip'])
+def test_streaming_document_stats(args, config, tmp_path, compress):
+    args.stats = 'stats.json'
+    job = DocumentJob(XSD_FILES[0], 0)
+    expected = DocumentProcessor(args, config, 123).process(job)[0].stats
+
+    args.stream = True
+    args.compress = compress
+    stats = DocumentProcessor(args, config, 123, tmp_path).process(job)[0].stats
+
+    assert stats[:3] == expected[:3]
+    assert stats.serialization_time == 0.0
+    assert stats.validation_time > 0
+
+
+def test_hotspots_do_not_change_documents(args, config):
+    job = DocumentJob(XSD_FILES[0], 0)
+    expected = DocumentProcessor(args, config, 123).process(job)
+    hotspots = HotSpots()
+    documents = DocumentProcessor(args, config, 123, hotspots=hotspots).process(job)
+
+    assert documents == expected
+    elements = {key: calls for key, calls, total, own in hotspots.top('element', 100)}
+    assert elements['/root'] == 1
+
+
+def test_parallel_hotspots_are_saved(args, config, tmp_path):
+    args.hotspots = 10
+    jobs = list(iter_jobs(XSD_FILES[1:2], config, 3))
+
+    list(process_parallel(args, config, 123, None, jobs, 2, tmp_path))
+
+    hotspots = HotSpots()
+    assert hotspots.load_worker_hotspots(tmp_path) == 2
+    assert [item[:2] for item in hotspots.top('element', 10) if item[0] == '/root'] == [('/root', 3)]
+
+
+def test_memory_is_tracked(args, config):
+    tracker = MemoryTracker()
+    tracker.start()
+    processor = DocumentProcessor(args, config, 123, profiler=tracker)
+    try:
+        processor.process(DocumentJob(XSD_FILES[0], 0))
+        processor.process(DocumentJob(XSD_FILES[0], 1))
+    finally:
+        tracker.stop()
+
+    phases = {name: values[0] for (schema, name), values in tracker._phases.items() if schema == 'complex_schema.xsd'}
+    assert phases == {'schema build': 1, 'namespace map': 1, 'generation': 2, 'validation': 2, 'serialization': 2}
+    assert tracker._peak_sites[0] == 'complex_schema.xsd'
+
+
+def test_parallel_memory_reports_are_saved(args, config, tmp_path):
+    args.memory_report = True
+    jobs = list(iter_jobs(XSD_FILES[1:2], config, 3))
+
+    list(process_parallel(args, config, 123, None, jobs, 2, tmp_path))
+
+    tracker = MemoryTracker()
+    assert tracker.load_worker_memory(tmp_path) == 2
+    assert tracker._phases[('schema_1.xsd', 'generation')][0] == 3
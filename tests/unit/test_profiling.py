@@ -0,0 +1,77 @@
+import pstats
+
+from xmlgenerator.profiling import Profiler, NULL_PROFILER
+
+
+def _busy():
+    return sum(i * i for i in range(10000))
+
+
+def test_phases():
+    profiler = Profiler()
+    with profiler.phase('generation', 'a.xsd'):
+        _busy()
+    with profiler.phase('generation', 'a.xsd'):
+        _busy()
+    profiler.add('config load', None, 1.5, 1.0)
+
+    wall, cpu, count = profiler._phases[('a.xsd', 'generation')]
+    assert count == 2
+    assert wall > 0 and cpu > 0
+    assert profiler._phases[(None, 'config load')] == [1.5, 1.0, 1]
+
+
+def test_format_phases():
+    profiler = Profiler()
+    profiler.add('config load', None, 1.0, 0.5)
+    profiler.add('generation', 'b.xsd', 2.0, 1.0, 10)
+    profiler.add('generation', 'a.xsd', 3.0, 2.0, 20)
+    profiler.add('validation', 'a.xsd', 1.0, 1.0, 20)
+
+    assert profiler.format_phases().splitlines() == [
+        'phase                              count      wall, s       cpu, s',
+        'schema a.xsd:',
+        '  generation                          20        3.000        2.000',
+        '  validation                          20        1.000        1.000',
+        '  sum                                           4.000        3.000',
+        'schema b.xsd:',
+        '  generation                          10        2.000        1.000',
+        '  sum                                           2.000        1.000',
+        'all schemas:',
+        '  config load                          1        1.000        0.500',
+        '  generation                          30        5.000        3.000',
+        '  validation                          20        1.000        1.000',
+        '  sum                                           7.000        4.500',
+    ]
+
+
+def test_worker_profiles_are_merged(tmp_path):
+    profile_dir = tmp_path / 'workers'
+    profile_dir.mkdir()
+    worker = Profiler()
+    worker.start()
+    with worker.phase('generation', 'a.xsd'):
+        _busy()
+    worker.save_worker_profile(profile_dir)
+
+    profiler = Profiler()
+    profiler.start()
+    with profiler.phase('generation', 'a.xsd'):
+        _busy()
+    profiler.write_report(tmp_path / 'run.prof', profile_dir)
+
+    assert profiler._phases[('a.xsd', 'generation')][2] == 2
+    stats = pstats.Stats(str(tmp_path / 'run.prof'))
+    busy_calls = [value[1] for (_, _, name), value in stats.stats.items() if name == '_busy']
+    assert busy_calls == [2]
+    report = (tmp_path / 'run.prof.txt').read_text(encoding='utf-8')
+    assert 'profiles of 1 worker process(es) are merged' in report
+    assert 'function calls' in report
+
+
+def test_null_profiler():
+    with NULL_PROFILER.phase('generation', 'a.xsd'):
+        pass
+    NULL_PROFILER.add('config load', None, 1.0, 1.0)
+
+    assert not NULL_PROFILER.enabled
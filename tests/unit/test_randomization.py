@@ -1,10 +1,12 @@
 import logging
+import re
+import sys
 from datetime import time
 
 import pytest
 
 from xmlgenerator import randomization
-from xmlgenerator.randomization import Randomizer
+from xmlgenerator.randomization import Randomizer, NumpyRandomizer, create_randomizer, derive_seed
 
 randomization.logger.setLevel(logging.DEBUG)
 
@@ -44,3 +46,222 @@ def test_random_time_cross_hour():
     generated_time = randomizer.random_time('09:45:00', '17:15:00')
 
     assert time.fromisoformat('09:45:00') <= generated_time <= time.fromisoformat('17:15:00')
+
+
+def test_reseed_is_order_independent():
+    randomizer1 = Randomizer(seed=123)
+    randomizer2 = Randomizer(seed=123)
+
+    randomizer1.reseed('schema.xsd', 'root', 1)
+    first_value = randomizer1.integer(0, 1000000), randomizer1.email()
+
+    randomizer2.email()
+    randomizer2.reseed('schema.xsd', 'root', 0)
+    randomizer2.integer(0, 1000000)
+    randomizer2.reseed('schema.xsd', 'root', 1)
+    second_value = randomizer2.integer(0, 1000000), randomizer2.email()
+
+    assert first_value == second_value
+
+
+def test_derive_seed():
+    assert derive_seed(123, 'a', 1) == derive_seed('123', 'a', 1)
+    assert derive_seed(123, 'a', 1) != derive_seed(123, 'a', 2)
+    assert derive_seed(123, 'a', 1) != derive_seed(124, 'a', 1)
+
+
+class TestRegex:
+
+    @pytest.mark.parametrize('pattern', [
+        '[0-9]{10}',
+        r'\d{3}-\d{2}',
+        '(ab|cd|e)+x?',
+        r'(?:x|y){0,3}z*',
+        r'[a-c\d_]{1,4}',
+        r'\w+@\w+\.com',
+        r'[^abc]{3}',
+        r'\D\W?',
+        '.{2,5}',
+        '[А-Я]{2}[0-9]{9}',
+    ])
+    def test_matches_pattern(self, pattern):
+        randomizer = Randomizer(seed=123)
+        for _ in range(20):
+            value = randomizer.regex(pattern)
+            assert re.fullmatch(pattern, value), value
+
+    def test_backreference(self):
+        randomizer = Randomizer(seed=123)
+        for _ in range(20):
+            value = randomizer.regex(r'([A-Z]{2})-\1')
+            assert value[:2] == value[3:]
+
+    def test_whitespaces_are_replaced(self):
+        randomizer = Randomizer(seed=123)
+        for _ in range(20):
+            assert randomizer.regex(r'a\tb\s[\s\n]') == 'a b  '
+
+    def test_repeats_are_limited(self):
+        randomizer = Randomizer(seed=123)
+        assert all(len(randomizer.regex('a*')) <= 100 for _ in range(20))
+
+    def test_pattern_is_compiled_once(self):
+        randomizer = Randomizer(seed=123)
+        randomizer.regex('[0-9]{5}')
+        generate = randomizer._regexes['[0-9]{5}']
+        randomizer.regex('[0-9]{5}')
+
+        assert randomizer._regexes == {'[0-9]{5}': generate}
+
+    def test_reseed(self):
+        randomizer = Randomizer(seed=123)
+        randomizer.reseed('a')
+        first = [randomizer.regex(r'[^0-9]{5}(ab|cd)+') for _ in range(5)]
+        randomizer.reseed('a')
+        second = [randomizer.regex(r'[^0-9]{5}(ab|cd)+') for _ in range(5)]
+
+        assert first == second
+
+    def test_unsupported(self):
+        randomizer = Randomizer(seed=123)
+        with pytest.raises(ValueError, match='unsupported regular expression element: GROUPREF_EXISTS'):
+            randomizer.regex(r'(a)?(?(1)b|c)')
+
+
+class TestFakerPool:
+
+    def test_values_are_sampled_from_pool(self):
+        randomizer = Randomizer(seed=123, faker_pool=5)
+        values = {randomizer.last_name('ru_RU') for _ in range(100)}
+
+        assert 1 < len(values) <= 5
+
+    def test_pools_of_providers_and_locales_are_separate(self):
+        randomizer = Randomizer(seed=123, faker_pool=5)
+        randomizer.city('ru_RU')
+
+        assert randomizer._pools.keys() == {('city', 'ru_RU')}
+        randomizer.city()
+        randomizer.company_name('ru_RU')
+        assert randomizer._pools.keys() == {('city', 'ru_RU'), ('city', 'en_US'), ('company_name', 'ru_RU')}
+
+    def test_pools_are_refreshed(self):
+        randomizer = Randomizer(seed=123, faker_pool=5)
+        randomizer.refresh_pools(0)
+        first_pool = {randomizer.last_name() for _ in range(100)}
+        randomizer.refresh_pools(4)
+        assert {randomizer.last_name() for _ in range(100)} == first_pool
+
+        randomizer.refresh_pools(5)
+        assert {randomizer.last_name() for _ in range(100)} != first_pool
+
+    def test_is_order_independent(self):
+        randomizer1 = Randomizer(seed=123, faker_pool=10)
+        randomizer2 = Randomizer(seed=123, faker_pool=10)
+
+        randomizer1.reseed('schema.xsd', 'root', 25)
+        randomizer1.refresh_pools(25)
+        first_value = [randomizer1.email() for _ in range(5)]
+
+        for index in (0, 1, 11, 25):
+            randomizer2.reseed('schema.xsd', 'root', index)
+            randomizer2.refresh_pools(index)
+            second_value = [randomizer2.email() for _ in range(5)]
+
+        assert first_value == second_value
+
+    def test_disabled_by_default(self):
+        randomizer1 = Randomizer(seed=123)
+        randomizer2 = Randomizer(seed=123, faker_pool=10)
+
+        assert randomizer1.email() == randomizer2._faker().email()
+        assert not randomizer1._pools
+
+    def test_numpy_engine(self):
+        pytest.importorskip('numpy')
+        randomizer = create_randomizer(123, 'numpy', faker_pool=5)
+
+        assert len({randomizer.city() for _ in range(100)}) <= 5
+
+
+class TestNumpyRandomizer:
+
+    @pytest.fixture(autouse=True)
+    def numpy_required(self):
+        pytest.importorskip('numpy')
+
+    def test_reproducible_with_seed(self):
+        randomizer1 = create_randomizer(123, 'numpy')
+        randomizer2 = create_randomizer('123', 'numpy')
+        randomizer3 = create_randomizer(123, 'numpy')
+        values1 = [randomizer1.integer(0, 1000000) for _ in range(10000)]
+        values3 = [randomizer3.integer(0, 1000000) for _ in range(10000)]
+        assert values1 == values3
+        assert values1 != [randomizer2.integer(0, 1000000) for _ in range(10000)]
+
+    @pytest.mark.parametrize('seed', [-5, 2 ** 130])
+    def test_int_seed_out_of_state_range(self, seed):
+        randomizer1 = create_randomizer(seed, 'numpy')
+        randomizer2 = create_randomizer(seed, 'numpy')
+        values1 = [randomizer1.integer(0, 1000000) for _ in range(100)] + [randomizer1.ascii_string(5, 10)]
+        values2 = [randomizer2.integer(0, 1000000) for _ in range(100)] + [randomizer2.ascii_string(5, 10)]
+        assert values1 == values2
+
+    def test_reseed(self):
+        randomizer = create_randomizer(123, 'numpy')
+        randomizer.reseed('schema.xsd', 'root', 1)
+        first = [randomizer.ascii_string(5, 10), randomizer.random(), randomizer.regex('[0-9]{5}')]
+        randomizer.reseed('schema.xsd', 'root', 2)
+        randomizer.reseed('schema.xsd', 'root', 1)
+        second = [randomizer.ascii_string(5, 10), randomizer.random(), randomizer.regex('[0-9]{5}')]
+        assert first == second
+
+    def test_document_does_not_depend_on_previous_documents(self):
+        randomizer = create_randomizer(123, 'numpy')
+        randomizer.reseed('schema.xsd', 'root', 1)
+        first = [randomizer.ascii_string(5, 10) for _ in range(1000)] + [randomizer.random() for _ in range(10000)]
+        randomizer.reseed('schema.xsd', 'root', 2)
+        for _ in range(10000):
+            randomizer.ascii_string(50, 100)
+            randomizer.random()
+        randomizer.reseed('schema.xsd', 'root', 1)
+        second = [randomizer.ascii_string(5, 10) for _ in range(1000)] + [randomizer.random() for _ in range(10000)]
+        assert first == second
+
+    def test_buffers_are_filled_on_demand(self):
+        randomizer = create_randomizer(123, 'numpy')
+        for _ in range(10000):
+            randomizer.ascii_string(50, 100)
+            randomizer.random()
+        randomizer.reseed('schema.xsd', 'root', 1)
+        randomizer.random()
+        randomizer.ascii_string(5, 5)
+
+        assert randomizer._uniforms_size == NumpyRandomizer._MIN_BUFFER_SIZE
+        assert len(randomizer._letters) == NumpyRandomizer._MIN_LETTERS_SIZE
+
+    def test_spawn(self):
+        randomizer = create_randomizer(123, 'numpy')
+        assert isinstance(randomizer.spawn('global', 'name'), NumpyRandomizer)
+
+    def test_bounds(self):
+        randomizer = create_randomizer(123, 'numpy')
+        integers = {randomizer.integer(-2, 2) for _ in range(1000)}
+        floats = [randomizer.float(1.5, 2.5) for _ in range(1000)]
+        options = {randomizer.any(['a', 'b', 'c']) for _ in range(1000)}
+        assert integers == {-2, -1, 0, 1, 2}
+        assert all(1.5 <= f <= 2.5 for f in floats)
+        assert options == {'a', 'b', 'c'}
+
+    def test_ascii_string(self):
+        randomizer = create_randomizer(123, 'numpy')
+        for _ in range(100):
+            value = randomizer.ascii_string(3, 7)
+            assert 3 <= len(value) <= 7
+            assert value[0].isupper() and value.isalpha() and value.isascii()
+
+
+def test_numpy_engine_is_optional(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    with pytest.raises(RuntimeError, match="requires numpy package"):
+        create_randomizer(123, 'numpy')
@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import pytest
+
+import tests
+import xmlgenerator.schema_cache as schema_cache
+from xmlgenerator.schema_cache import SchemaCache
+
+os.chdir(os.path.dirname(os.path.abspath(tests.__file__)))
+
+
+@pytest.fixture
+def schemas_dir(tmp_path):
+    schemas_dir = tmp_path / 'schemas'
+    shutil.copytree('data/namespaces', schemas_dir)
+    return schemas_dir
+
+
+def _forbid_schema_building(monkeypatch):
+    def fail(*_):
+        raise AssertionError('schema must be loaded from cache')
+
+    monkeypatch.setattr(schema_cache, 'XMLSchema', fail)
+
+
+def test_schema_loaded_from_cache(tmp_path, schemas_dir, monkeypatch):
+    xsd_file = schemas_dir / 'custom_ns_1.xsd'
+    built_schema = SchemaCache(tmp_path / 'cache').load(xsd_file)
+    assert len(list((tmp_path / 'cache').iterdir())) == 1
+
+    _forbid_schema_building(monkeypatch)
+    cached_schema = SchemaCache(tmp_path / 'cache').load(xsd_file)
+
+    assert cached_schema is not built_schema
+    assert [e.name for e in cached_schema.root_elements] == [e.name for e in built_schema.root_elements]
+
+
+def test_cache_invalidated_when_imported_file_changed(tmp_path, schemas_dir, monkeypatch):
+    xsd_file = schemas_dir / 'custom_ns_1.xsd'
+    SchemaCache(tmp_path / 'cache').load(xsd_file)
+
+    imported_file = schemas_dir / '_commons.xsd'
+    imported_file.write_text(imported_file.read_text() + '\n')
+
+    built = []
+    original = schema_cache.XMLSchema
+    monkeypatch.setattr(schema_cache, 'XMLSchema', lambda *a: built.append(a) or original(*a))
+    SchemaCache(tmp_path / 'cache').load(xsd_file)
+    assert len(built) == 1
+
+    _forbid_schema_building(monkeypatch)
+    SchemaCache(tmp_path / 'cache').load(xsd_file)
+
+
+def test_broken_cache_entry_is_rebuilt(tmp_path, schemas_dir):
+    xsd_file = schemas_dir / 'custom_ns_1.xsd'
+    cache = SchemaCache(tmp_path / 'cache')
+    cache.load(xsd_file)
+    for entry in (tmp_path / 'cache').iterdir():
+        entry.write_bytes(b'broken')
+
+    xsd_schema = cache.load(xsd_file)
+
+    assert xsd_schema.root_elements
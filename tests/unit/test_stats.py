@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from xmlgenerator.stats import DocumentStats, RunStatistics, _percentile
+
+
+@pytest.mark.parametrize('percent, expected', [(50, 5), (90, 9), (99, 10), (100, 10), (1, 1), (0, 1)])
+def test_percentile(percent, expected):
+    assert _percentile(list(range(1, 11)), percent) == expected
+
+
+def test_statistics(tmp_path):
+    statistics = RunStatistics()
+    statistics.add('a.xsd', 0, 'root', 'a_0', DocumentStats(10, 2, 1000, 0.1, 0.01, 0.2), True, None)
+    statistics.add('a.xsd', 1, 'root', 'a_1', DocumentStats(20, 4, 3000, 0.3, 0.03, 0.4), True, 'error')
+    statistics.add('b.xsd', 0, 'doc', 'b_0', DocumentStats(5, 0, 500, 0.2, 0.02, 0.0), False, None)
+
+    output_file = tmp_path / 'stats.json'
+    statistics.write(output_file)
+    result = json.loads(output_file.read_text(encoding='utf-8'))
+
+    run = result['run']
+    assert run['schemas'] == 2
+    assert run['documents'] == 3
+    assert run['elements'] == 35
+    assert run['attributes'] == 6
+    assert run['output_bytes'] == 4500
+    assert run['validation'] == {'valid': 1, 'invalid': 1, 'skipped': 1}
+    assert run['time']['generation'] == pytest.approx(0.6)
+    assert run['latency']['generation']['p50'] == pytest.approx(0.2)
+    assert run['latency']['generation']['max'] == pytest.approx(0.3)
+    assert run['documents_per_second'] > 0
+    assert run['megabytes_per_second'] > 0
+
+    schema = result['schemas']['a.xsd']
+    assert schema['documents'] == 2
+    assert schema['latency']['total']['p99'] == pytest.approx(0.73)
+    assert schema['latency']['total']['mean'] == pytest.approx(0.52)
+    assert [document['validation'] for document in schema['per_document']] == ['valid', 'invalid']
+    assert result['schemas']['b.xsd']['per_document'][0] == {
+        'index': 0, 'root_element': 'doc', 'filename': 'b_0', 'elements': 5, 'attributes': 0, 'output_bytes': 500,
+        'generation_time': 0.2, 'serialization_time': 0.02, 'validation_time': 0.0, 'validation': 'skipped',
+    }
@@ -3,11 +3,12 @@ import os
 import pytest
 
 import tests
-from xmlgenerator.configuration import GeneratorConfig, VariablesConfig
+from xmlgenerator.configuration import Config, GeneratorConfig, GlobalGeneratorConfig, VariablesConfig
 from xmlgenerator.randomization import Randomizer
 from xmlgenerator.substitution import (
     ExpressionSyntaxError,
     Substitutor,
+    ValueOverrides,
     _extract_arguments,
     _parse_subexpressions, )
 
@@ -276,3 +277,84 @@ def test_reset_context():
     assert substitutor._local_context["source_filename"] == "second_file.xsd"
     assert substitutor._local_context["source_extracted"] == "second"
     assert substitutor._local_context["output_filename"] == "second_16dab037-65aa-4fcb-905f-7785ebff91d4"
+
+
+class TestValueOverrides:
+
+    def test_first_match_wins(self):
+        overrides = ValueOverrides({"^Name$": "first", "Name": "second", "Nam": "third"}.items())
+        assert overrides.resolve("Name") == "first"
+        assert overrides.resolve("LastName") == "second"
+        assert overrides.resolve("nam") == "third"
+
+    def test_empty_value_resets_override(self):
+        overrides = ValueOverrides({"^Name$": None, "Name": "value", "Code": ""}.items())
+        assert overrides.resolve("Name") is None
+        assert overrides.resolve("LastName") == "value"
+        assert overrides.resolve("Code") is None
+
+    def test_no_match(self):
+        overrides = ValueOverrides({"Name": "value"}.items())
+        assert overrides.resolve("Code") is None
+
+    def test_result_is_memoized(self):
+        overrides = ValueOverrides({"Name": "value"}.items())
+        assert overrides.resolve("LastName") == "value"
+        assert overrides.resolve("Code") is None
+        overrides._patterns.clear()
+        assert overrides.resolve("LastName") == "value"
+        assert overrides.resolve("Code") is None
+
+    def test_find(self):
+        overrides = ValueOverrides({"^Name$": None, "Name": "value"}.items())
+        assert overrides.find("LastName") == ("Name", "value")
+        assert overrides.find("Name") is None
+        assert overrides.find("Code") is None
+
+    def test_substitute_value_with_overrides(self):
+        substitutor = Substitutor(Randomizer(seed=1), VariablesConfig())
+        overrides = ValueOverrides({"Name": "{{ number(5, 5) }}", "Code": None}.items())
+        assert substitutor.substitute_value("LastName", overrides) == (True, "5")
+        assert substitutor.substitute_value("Code", overrides) == (False, None)
+        assert substitutor.substitute_value("Other", overrides) == (False, None)
+
+
+class TestExpressionCompilation:
+
+    def test_expression_is_compiled_once(self):
+        substitutor = Substitutor(Randomizer(seed=111), VariablesConfig())
+        compiled = substitutor._compile_expression("id-{{ number(1, 9) }}-{{ any('A', 'B') }}.")
+        assert substitutor._compile_expression("id-{{ number(1, 9) }}-{{ any('A', 'B') }}.") is compiled
+        assert compiled[0] == 'id-'
+        assert compiled[2] == '-'
+        assert compiled[4] == '.'
+        assert compiled[1].args == ((1, 9),)
+        assert compiled[3].args == (['A', 'B'],)
+
+    def test_plain_text_is_compiled_to_itself(self):
+        substitutor = Substitutor(Randomizer(seed=111), VariablesConfig())
+        assert substitutor._compile_expression("plain text") == "plain text"
+        assert substitutor._process_expression("plain text") == "plain text"
+
+    def test_compiled_expression_evaluates_each_time(self):
+        substitutor = Substitutor(Randomizer(seed=111), VariablesConfig())
+        values = {substitutor._process_expression("{{ number(0, 1000000) }}") for _ in range(10)}
+        assert len(values) > 1
+
+    @pytest.mark.parametrize('config', [
+        pytest.param(Config(global_=GlobalGeneratorConfig(value_override={'name': '{{ email( }}'})), id='value_override'),
+        pytest.param(Config(global_=GlobalGeneratorConfig(output_filename='{{ uuid }')), id='output_filename'),
+        pytest.param(Config(specific={'s': GeneratorConfig(output_filename='{{ }}')}), id='specific'),
+        pytest.param(Config(variables=VariablesConfig(global_={'id': '{{ func arg }}'})), id='global_variable'),
+        pytest.param(Config(variables=VariablesConfig(local={'id': '{{ func(a) b }}'})), id='local_variable'),
+    ])
+    def test_compile_config_syntax_errors(self, config):
+        substitutor = Substitutor(Randomizer(seed=111), config.variables)
+        with pytest.raises(ExpressionSyntaxError):
+            substitutor.compile_config(config)
+
+    def test_compile_config_unknown_function(self):
+        config = Config(global_=GlobalGeneratorConfig(value_override={'name': '{{ not_existing_func }}'}))
+        substitutor = Substitutor(Randomizer(seed=111), config.variables)
+        with pytest.raises(RuntimeError, match="Unknown function not_existing_func"):
+            substitutor.compile_config(config)
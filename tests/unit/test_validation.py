@@ -1,8 +1,20 @@
+import multiprocessing
+import os
+
 import pytest
+from lxml import etree
+from xmlschema import XMLSchema, XMLResource
 
+import tests
 import xmlgenerator.validation as validation
+from xmlgenerator.configuration import GeneratorConfig
+from xmlgenerator.generator import XmlGenerator, get_ns_map
+from xmlgenerator.randomization import Randomizer
+from xmlgenerator.substitution import Substitutor
 from xmlgenerator.validation import XmlValidator
 
+os.chdir(os.path.dirname(os.path.abspath(tests.__file__)))
+
 
 class DummySchema:
     def __init__(self, exc):
@@ -43,3 +55,132 @@ def test_validator_skips_validation_when_disabled():
     schema = DummySchema(Exception("should not raise"))
 
     validator.validate(schema, "<xml/>")
+
+
+class TestLibxml2Validation:
+
+    @pytest.fixture
+    def xsd_schema(self):
+        return XMLSchema('data/complex_schema.xsd')
+
+    def test_valid_document(self, xsd_schema):
+        validator = XmlValidator('libxml2', ignore_errors=False)
+        document = _generate(xsd_schema)
+
+        assert validator.check(xsd_schema, document) is None
+        assert validator._libxml2_schema[1] is not None
+
+    def test_invalid_document(self, xsd_schema):
+        validator = XmlValidator('libxml2', ignore_errors=False)
+
+        assert validator.check(xsd_schema, etree.fromstring('<unknown/>')) is not None
+
+    def test_invalid_document_file(self, xsd_schema, tmp_path):
+        validator = XmlValidator('libxml2', ignore_errors=False)
+        document_file = tmp_path / 'document.xml'
+        document_file.write_text('<unknown/>')
+
+        assert validator.check(xsd_schema, XMLResource(str(document_file), lazy=True)) is not None
+
+    def test_document_file_with_many_siblings(self, tmp_path, monkeypatch):
+        schema_file = tmp_path / 'schema.xsd'
+        schema_file.write_text('<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"><xs:element name="root">'
+                               '<xs:complexType><xs:sequence><xs:element name="item" type="xs:int" '
+                               'maxOccurs="unbounded"/></xs:sequence></xs:complexType></xs:element></xs:schema>')
+        document_file = tmp_path / 'document.xml'
+        document_file.write_text('<root>' + '<item>1</item>' * 10000 + '</root>')
+        # number of processed siblings kept before each parsed element
+        preceding = []
+        iterparse = etree.iterparse
+
+        def tracked_iterparse(*args, **kwargs):
+            for event, element in iterparse(*args, **kwargs):
+                if element.getparent() is not None:
+                    preceding.append(sum(1 for _ in element.itersiblings(preceding=True)))
+                yield event, element
+
+        monkeypatch.setattr(etree, 'iterparse', tracked_iterparse)
+        validator = XmlValidator('libxml2', ignore_errors=False)
+
+        assert validator.check(XMLSchema(str(schema_file)), XMLResource(str(document_file), lazy=True)) is None
+        # processed siblings are deleted, the tree does not grow with the number of elements
+        assert len(preceding) == 10000
+        assert max(preceding) <= 1
+
+    def test_compiled_schema_is_cached(self, xsd_schema):
+        validator = XmlValidator('libxml2', ignore_errors=False)
+        compiled = validator._get_libxml2_schema(xsd_schema)
+
+        assert validator._get_libxml2_schema(xsd_schema) is compiled
+
+    def test_fallback_to_xmlschema(self):
+        xsd_schema = XMLSchema('<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">'
+                               '<xs:element name="root" type="xs:int"/></xs:schema>')
+        validator = XmlValidator('libxml2', ignore_errors=False)
+
+        assert validator.check(xsd_schema, etree.fromstring('<root>1</root>')) is None
+        assert validator.check(xsd_schema, etree.fromstring('<root>a</root>')) is not None
+        assert validator._libxml2_schema == (xsd_schema, None)
+
+
+def _generate(xsd_schema):
+    randomizer = Randomizer(seed=1)
+    generator = XmlGenerator(randomizer, Substitutor(randomizer, None))
+    return generator.generate_xml(xsd_schema.root_elements[0], GeneratorConfig(), get_ns_map(xsd_schema))
+
+
+class TestValidationSampling:
+
+    def test_all_documents_selected_by_default(self):
+        validator = XmlValidator('schema', ignore_errors=False, seed=1)
+
+        assert all(validator.select(i, 'schema.xsd', 'root') for i in range(100))
+
+    def test_nothing_selected_when_disabled(self):
+        validator = XmlValidator('none', ignore_errors=False, seed=1)
+
+        assert not any(validator.select(i, 'schema.xsd', 'root') for i in range(100))
+
+    def test_sample(self):
+        validator = XmlValidator('schema', ignore_errors=False, sample=0.1, seed=1)
+        selected = [i for i in range(1000) if validator.select(i, 'schema.xsd', 'root')]
+
+        assert 50 < len(selected) < 150
+
+    def test_first_documents_always_selected(self):
+        validator = XmlValidator('schema', ignore_errors=False, sample=0, first=5, seed=1)
+        selected = [i for i in range(100) if validator.select(i, 'schema.xsd', 'root')]
+
+        assert selected == [0, 1, 2, 3, 4]
+
+    def test_selection_is_deterministic(self):
+        validator_1 = XmlValidator('schema', ignore_errors=False, sample=0.5, seed=1)
+        validator_2 = XmlValidator('schema', ignore_errors=False, sample=0.5, seed=1)
+        selected_1 = [i for i in range(100) if validator_1.select(i, 'schema.xsd', 'root')]
+        selected_2 = [i for i in reversed(range(100)) if validator_2.select(i, 'schema.xsd', 'root')]
+
+        assert selected_1 == sorted(selected_2)
+
+    def test_budget(self):
+        validator = XmlValidator('schema', ignore_errors=False, budget=0, seed=1)
+
+        assert validator.select(0, 'schema.xsd', 'root') is False
+
+    def test_budget_is_spent_by_validation(self):
+        validator = XmlValidator('schema', ignore_errors=False, budget=1, seed=1)
+        validator.check(DummySchema(None), "<xml/>")
+        validator._spent = 1
+
+        assert validator.select(0, 'schema.xsd', 'root') is False
+
+    def test_budget_is_shared(self):
+        spent = multiprocessing.Value('d', 0.0)
+        validator_1 = XmlValidator('schema', ignore_errors=False, budget=1, seed=1, shared_spent=spent)
+        validator_2 = XmlValidator('schema', ignore_errors=False, budget=1, seed=1, shared_spent=spent)
+        validator_1.check(DummySchema(None), "<xml/>")
+        assert validator_2.select(0, 'schema.xsd', 'root') is True
+
+        spent.value = 1
+
+        assert validator_1.select(0, 'schema.xsd', 'root') is False
+        assert validator_2.select(0, 'schema.xsd', 'root') is False
@@ -1,12 +1,13 @@
+import importlib.util
 import logging
+import os
 import sys
-from argparse import ArgumentParser, HelpFormatter, ArgumentError, Action
+from argparse import ArgumentParser, HelpFormatter, ArgumentError, ArgumentTypeError, Action
 from collections import Counter
 from pathlib import Path
 
-import shtab
-
 from xmlgenerator import __version__
+from xmlgenerator.output import get_archive_format, COMPRESSION_CODECS
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,27 @@ class StoreKeyPairDictAction(Action):
         setattr(namespace, self.dest, items)
 
 
+class PrintCompletionAction(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        import shtab
+        # completion ends after this option, as after the shtab's own action
+        shtab.OPTION_END += (PrintCompletionAction,)
+        for action in parser._actions:
+            if isinstance(getattr(action, 'complete', None), str):
+                action.complete = getattr(shtab, action.complete)
+        print(shtab.complete(parser, values))
+        parser.exit(0)
+
+
+def _fraction(value: str) -> float:
+    # accepts fractions in forms "0.01" and "1/100"
+    try:
+        numerator, _, denominator = value.partition('/')
+        return float(numerator) / float(denominator) if denominator else float(numerator)
+    except (ValueError, ZeroDivisionError):
+        raise ArgumentTypeError(f"invalid fraction value: '{value}'")
+
+
 def _get_parser():
     parser = MyParser(
         prog='xmlgenerator',
@@ -56,7 +78,55 @@ def _get_parser():
         "-o", "--output",
         metavar="<output.xml>",
         dest="output_path",
-        help="save the output to a directory or file"
+        help="save the output to a directory, file or archive (.zip, .tar, .tar.gz, .tgz, .tar.bz2, .tar.xz)"
+    )
+    parser.add_argument(
+        "--count",
+        metavar="<count>",
+        type=int,
+        help="number of documents to generate for each root element of each schema; takes precedence over "
+             "the global count of the configuration file (default: 1)"
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        metavar="<workers>",
+        type=int,
+        default=1,
+        help="number of worker processes; 0 - use all CPU cores (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="write elements to the output file as they are generated, without building the document in memory"
+    )
+    parser.add_argument(
+        "--stdout-format",
+        metavar="<format>",
+        dest="stdout_format",
+        choices=["text", "length", "nul", "lines"],
+        default="text",
+        help="format of documents stream written to stdout when output is not specified: text, length "
+             "(length-prefixed records), nul (NUL-separated records), lines (one document per line) "
+             "(default: %(default)s)"
+    )
+    parser.add_argument(
+        "--compress",
+        metavar="<codec>",
+        choices=list(COMPRESSION_CODECS),
+        help="compress output files (gzip, bz2, xz)"
+    )
+    parser.add_argument(
+        "--compress-level",
+        metavar="<level>",
+        dest="compress_level",
+        type=int,
+        help="compression level (gzip, bz2: 1-9, default 9; xz: 0-9, default 6)"
+    )
+    schema_cache_arg = parser.add_argument(
+        "--schema-cache",
+        metavar="<dir>",
+        dest="schema_cache",
+        help="directory to cache built schemas between runs"
     )
     parser.add_argument(
         "-p", "--pretty",
@@ -74,9 +144,31 @@ def _get_parser():
     parser.add_argument(
         "-v", "--validation",
         metavar="<validation>",
-        choices=["none", "schema", "schematron"],
+        choices=["none", "schema", "libxml2", "schematron"],
         default="schema",
-        help="validate the generated XML document (none, schema, schematron; default: %(default)s)"
+        help="validate the generated XML document (none, schema, libxml2, schematron; default: %(default)s)"
+    )
+    parser.add_argument(
+        "--validate-sample",
+        metavar="<fraction>",
+        dest="validate_sample",
+        type=_fraction,
+        help="validate only a random fraction of documents, e.g. 1/100 or 0.01 (default: validate all documents)"
+    )
+    parser.add_argument(
+        "--validate-first",
+        metavar="<count>",
+        dest="validate_first",
+        type=int,
+        default=0,
+        help="always validate the first documents of each schema when --validate-sample is used (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--validate-budget",
+        metavar="<seconds>",
+        dest="validate_budget",
+        type=float,
+        help="CPU time limit for validation, shared by all worker processes; further documents are not validated"
     )
     parser.add_argument(
         "-i",
@@ -96,6 +188,48 @@ def _get_parser():
         metavar="<seed>",
         help="set the randomization seed"
     )
+    parser.add_argument(
+        "--random-engine",
+        metavar="<engine>",
+        dest="random_engine",
+        choices=["python", "numpy"],
+        default="python",
+        help="random numbers engine (python, numpy - requires numpy package; default: %(default)s)"
+    )
+    parser.add_argument(
+        "--faker-pool",
+        metavar="<size>",
+        dest="faker_pool",
+        type=int,
+        help="sample names, addresses, companies, etc. from pools of pre-generated values, "
+             "refreshed every <size> documents (default: disabled)"
+    )
+    profile_arg = parser.add_argument(
+        "--profile",
+        metavar="<file>",
+        help="save cProfile statistics of the run to the file and a report of time spent in processing phases "
+             "to <file>.txt"
+    )
+    stats_arg = parser.add_argument(
+        "--stats",
+        metavar="<file>",
+        help="save statistics of the run (size, generation, serialization and validation time of each document, "
+             "throughput and latency percentiles) to the JSON file"
+    )
+    parser.add_argument(
+        "--memory-report",
+        action="store_true",
+        dest="memory_report",
+        help="print peak and retained memory of processing phases for each schema and top allocation sites "
+             "at the end of the run (slows down generation)"
+    )
+    parser.add_argument(
+        "--hotspots",
+        metavar="<count>",
+        type=int,
+        help="print <count> most expensive element paths, XSD types and value overrides (by generation time) "
+             "at the end of the run"
+    )
     parser.add_argument(
         "-d", "--debug",
         action="store_true",
@@ -108,14 +242,20 @@ def _get_parser():
         help="show the current version"
     )
 
-    # add shell completions
-    config_arg.complete = shtab.FILE
-    source_arg.complete = shtab.FILE
-    output_arg.complete = shtab.FILE
-    shtab.add_argument_to(parser, ["-C", "--completion"], "print a shell completion script (bash, zsh, tcsh)")
-    completion_act = [a for a in parser._actions if a.dest == 'completion']
-    if completion_act:
-        completion_act[0].metavar = '<shell>'
+    # add shell completions (shtab is imported only when a completion script is requested)
+    config_arg.complete = 'FILE'
+    source_arg.complete = 'FILE'
+    output_arg.complete = 'FILE'
+    schema_cache_arg.complete = 'DIRECTORY'
+    profile_arg.complete = 'FILE'
+    stats_arg.complete = 'FILE'
+    parser.add_argument(
+        "-C", "--completion",
+        metavar="<shell>",
+        choices=["bash", "zsh", "tcsh", "fish", "powershell"],
+        action=PrintCompletionAction,
+        help="print a shell completion script (bash, zsh, tcsh, fish, powershell)"
+    )
 
     return parser
 
@@ -133,6 +273,56 @@ def parse_args():
         if not config_path.exists() or not config_path.is_file():
             parser.error(f"configuration file {config_path} does not exist.")
 
+    if args.count is not None and args.count < 1:
+        parser.error("option --count must be a positive integer.")
+
+    if args.schema_cache:
+        schema_cache_path = Path(args.schema_cache)
+        if schema_cache_path.exists() and not schema_cache_path.is_dir():
+            parser.error(f"option --schema-cache points to existing file {schema_cache_path}. It must be a directory.")
+
+    if args.stream and not args.output_path:
+        parser.error("option --stream requires option -o/--output.")
+
+    if args.stdout_format != 'text':
+        if args.output_path:
+            parser.error("option --stdout-format can't be used with option -o/--output.")
+        if args.stdout_format == 'lines' and args.pretty:
+            parser.error("option -p/--pretty can't be used with --stdout-format lines.")
+
+    if args.compress_level is not None:
+        if not args.compress:
+            parser.error("option --compress-level requires option --compress.")
+        min_level = 0 if args.compress == 'xz' else 1
+        if not min_level <= args.compress_level <= 9:
+            parser.error(f"option --compress-level must be between {min_level} and 9 for {args.compress}.")
+
+    if args.compress and not args.output_path:
+        parser.error("option --compress requires option -o/--output.")
+
+    if args.validate_sample is not None and not 0 <= args.validate_sample <= 1:
+        parser.error("option --validate-sample must be between 0 and 1.")
+
+    if args.validate_first < 0:
+        parser.error("option --validate-first must not be negative.")
+
+    if args.validate_budget is not None and args.validate_budget < 0:
+        parser.error("option --validate-budget must not be negative.")
+
+    if args.random_engine == 'numpy' and importlib.util.find_spec('numpy') is None:
+        parser.error("option --random-engine numpy requires numpy package. Install it with: pip install numpy")
+
+    if args.faker_pool is not None and args.faker_pool < 1:
+        parser.error("option --faker-pool must be a positive integer.")
+
+    if args.hotspots is not None and args.hotspots < 1:
+        parser.error("option --hotspots must be a positive integer.")
+
+    if args.workers < 0:
+        parser.error("option -w/--workers must not be negative.")
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+
     # check namespace aliases are unique
     if args.ns_aliases:
         counts = Counter(args.ns_aliases.values())
@@ -154,16 +344,26 @@ def parse_args():
         explicit_dir = args.output_path.endswith(('/', '\\'))
         looks_like_dir = explicit_dir or not output_path.suffix
 
-        if len(xsd_files) > 1:
+        if get_archive_format(output_path) is not None:
+            if is_existing_dir:
+                parser.error(
+                    f"option -o/--output points to existing directory {output_path}. It must be an archive file.")
+            if args.stream:
+                parser.error("option --stream can't be used with archive output.")
+            if args.compress:
+                parser.error("option --compress can't be used with archive output.")
+            output_path.absolute().parent.mkdir(parents=True, exist_ok=True)
+        elif len(xsd_files) > 1 or (args.count or 1) > 1:
+            reason = 'multiple schemas are provided' if len(xsd_files) > 1 else 'option --count is greater than 1'
             if is_existing_file:
                 parser.error(
                     f"option -o/--output points to existing file {output_path}. "
-                    "It must be a directory when multiple schemas are provided."
+                    f"It must be a directory when {reason}."
                 )
 
             if not is_existing_dir:
                 if not looks_like_dir:
-                    parser.error("option -o/--output must be a directory when multiple schemas are provided.")
+                    parser.error(f"option -o/--output must be a directory when {reason}.")
 
             if not is_existing_dir:
                 output_path.mkdir(parents=True, exist_ok=True)
@@ -175,6 +375,17 @@ def parse_args():
     return args, xsd_files, output_path
 
 
+def check_output_counts(xsd_files: list[Path], output_path: Path | None, config, count: int | None):
+    # counts of the configuration file are known only after it is loaded:
+    # a single output file can't hold more than one document
+    if output_path is None or output_path.is_dir() or get_archive_format(output_path) is not None:
+        return
+    for xsd_file in xsd_files:
+        if config.get_count(xsd_file.name, count) > 1:
+            _get_parser().error(f"option -o/--output must be a directory when count of documents "
+                                f"for schema {xsd_file.name} is greater than 1.")
+
+
 def _collect_xsd_files(source_paths, parser):
     xsd_files = []
     for source_path in source_paths:
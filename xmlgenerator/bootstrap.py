@@ -1,15 +1,16 @@
 import logging
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
 
-from lxml import etree
-from xmlschema import XMLSchema
-
-import xmlgenerator
-from xmlgenerator.arguments import parse_args
+from xmlgenerator.arguments import parse_args, check_output_counts
 from xmlgenerator.configuration import load_config
-from xmlgenerator.generator import XmlGenerator, get_ns_map
+from xmlgenerator.output import open_sink
+from xmlgenerator.profiling import NULL_PROFILER
 from xmlgenerator.randomization import Randomizer
-from xmlgenerator.substitution import ExpressionSyntaxError, Substitutor
-from xmlgenerator.validation import XmlValidator
+from xmlgenerator.substitution import ExpressionSyntaxError
 
 # TODO кастомные переменные для локального контекста
 # TODO типизировать
@@ -51,81 +52,134 @@ def main():
 
 
 def _main():
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
     args, xsd_files, output_path = parse_args()
     _setup_loggers(args)
 
+    profiler = NULL_PROFILER
+    if args.profile:
+        from xmlgenerator.profiling import Profiler
+        profiler = Profiler()
+        profiler.add('argument parsing', None, time.perf_counter() - start_wall, time.process_time() - start_cpu)
+        profiler.start()
+
+    # memory is tracked in the phases of the profiler (which may be disabled)
+    phases = profiler
+    if args.memory_report:
+        from xmlgenerator.memory import MemoryTracker
+        phases = MemoryTracker(profiler)
+        phases.start()
+
+    hotspots = None
+    if args.hotspots:
+        from xmlgenerator.hotspots import HotSpots
+        hotspots = HotSpots()
+
+    # worker processes save their profiles, memory reports and hot spots to a temporary directory
+    report_dir = None
+    if (args.profile or args.memory_report or args.hotspots) and args.workers > 1:
+        report_dir = Path(tempfile.mkdtemp(prefix='xmlgenerator-report-'))
+
+    statistics = None
+    if args.stats:
+        from xmlgenerator.stats import RunStatistics
+        statistics = RunStatistics()
+
+    try:
+        _generate(args, xsd_files, output_path, phases, hotspots, report_dir, statistics)
+    finally:
+        if statistics is not None:
+            statistics.write(Path(args.stats))
+        if args.profile:
+            profiler.write_report(Path(args.profile), report_dir)
+        # reports are printed to stderr, as stdout may be the output of documents
+        if args.memory_report:
+            phases.stop()
+            if report_dir is not None:
+                phases.load_worker_memory(report_dir)
+            sys.stderr.write(phases.format_report())
+        if hotspots is not None:
+            if report_dir is not None:
+                hotspots.load_worker_hotspots(report_dir)
+            sys.stderr.write(hotspots.format_report(args.hotspots))
+        if report_dir is not None:
+            shutil.rmtree(report_dir, ignore_errors=True)
+
+
+def _generate(args, xsd_files, output_path, profiler, hotspots, report_dir, statistics):
+
     if output_path:
         logger.debug('specified output path: %s', output_path.absolute())
     else:
         logger.debug('output path is not specified. Generated XML document will be written to stdout')
 
-    config = load_config(args.config_yaml)
+    with profiler.phase('config load'):
+        config = load_config(args.config_yaml)
+    check_output_counts(xsd_files, output_path, config, args.count)
 
-    randomizer = Randomizer(args.seed)
-    substitutor = Substitutor(randomizer, config.variables)
-    generator = XmlGenerator(randomizer, substitutor)
-    validator = XmlValidator(args.validation, args.ignore_validation_errors)
+    # xmlschema and lxml are imported only when documents are to be generated
+    with profiler.phase('import'):
+        from xmlgenerator.processing import DocumentProcessor, DocumentWriter, iter_jobs, process_serial, \
+            process_parallel
+
+    # the same base seed is used in all worker processes
+    seed = Randomizer(args.seed).seed
+    # in single process mode documents are serialized once, directly into the output
+    # (unless statistics or memory are collected, which require serialized documents)
+    serialize = statistics is not None or args.memory_report
+    processor = DocumentProcessor(args, config, seed, output_path, serialize=serialize, profiler=profiler,
+                                  hotspots=hotspots)
 
     total_count = len(xsd_files)
     logger.debug('found %s schema(s)', total_count)
-    for index, xsd_file in enumerate(xsd_files):
-        logger.info('processing schema %s of %s: %s', index + 1, total_count, xsd_file.as_uri())
-
-        # get configuration override for current schema
-        local_config = config.get_for_file(xsd_file.name)
-
-        # load XSD schema
-        xsd_schema = XMLSchema(xsd_file)  # loglevel='DEBUG'
-
-        # get namespace mapping
-        ns_map = get_ns_map(xsd_schema, args.ns_aliases)
-
-        root_elements_count = len(xsd_schema.root_elements)
-        if root_elements_count > 1:
-            logger.debug('schema "%s" contains %s root elements', xsd_file.name, root_elements_count)
-
-        for xsd_root_element in xsd_schema.root_elements:
-            # Reset context for current schema and root element
-            substitutor.reset_context(xsd_file.name, xsd_root_element.local_name, local_config)
-            # Generate XML document
-            xml_root = generator.generate_xml(xsd_root_element, local_config, ns_map)
-            # Marshall to string
-            xml_str = etree.tostring(xml_root, encoding=args.encoding, pretty_print=args.pretty)
-            decoded = xml_str.decode('cp1251' if args.encoding == 'windows-1251' else args.encoding)
-
-            # Print out to console
-            if not output_path:
-                logger.debug('print xml document to stdout')
-                print(decoded)
-
-            # Validation (if enabled)
-            validator.validate(xsd_schema, decoded)
-
-            # Get output filename for current schema (without extension)
-            xml_filename = substitutor.get_output_filename()
-
-            # Export XML to file
-            if output_path:
-                output_file = output_path
-                if output_path.is_dir():
-                    output_file = output_path / f'{xml_filename}.xml'
-                output_file = output_file.absolute()
-                logger.debug('save xml document as %s', output_file.as_uri())
-                if output_file.exists():
-                    logger.warning('file %s already exists and will be overwritten', output_file.as_uri())
-                with open(output_file, 'wb') as f:
-                    f.write(xml_str)
+    jobs = iter_jobs(xsd_files, config, args.count)
+    if args.workers > 1:
+        jobs = list(jobs)
+        results = process_parallel(args, config, seed, output_path, jobs, args.workers, report_dir)
+    else:
+        results = process_serial(processor, jobs)
+
+    current_file = None
+    validated_count = skipped_count = 0
+    sink = open_sink(output_path, args.encoding, args.pretty, args.compress, args.compress_level, args.stdout_format)
+    with DocumentWriter(sink, profiler=profiler) as writer:
+        for job, documents in results:
+            if job.xsd_file != current_file:
+                current_file = job.xsd_file
+                logger.info('processing schema %s of %s: %s',
+                            xsd_files.index(current_file) + 1, total_count, current_file.as_uri())
+
+            for document in documents:
+                # Validation result (if enabled)
+                if document.validated:
+                    validated_count += 1
+                else:
+                    skipped_count += 1
+                if statistics is not None:
+                    statistics.add(job.xsd_file.name, job.index, document.root_element, document.filename,
+                                   document.stats, document.validated, document.validation_error)
+                if document.validation_error is not None:
+                    processor.validator.report(document.validation_error)
+
+                # Export XML to file, archive or stdout in the writer thread (already written in streaming mode)
+                if document.data is not None:
+                    writer.write(document.filename, document.data, job.xsd_file.name)
+
+    if args.validation != 'none':
+        logger.info('validated %s document(s), skipped %s', validated_count, skipped_count)
 
 
 def _setup_loggers(args):
     logging.addLevelName(logging.WARNING, 'WARN')
     log_level = logging.DEBUG if args.debug else logging.INFO
     logger.setLevel(log_level)
-    xmlgenerator.configuration.logger.setLevel(log_level)
-    xmlgenerator.validation.logger.setLevel(log_level)
-    xmlgenerator.generator.logger.setLevel(log_level)
-    xmlgenerator.substitution.logger.setLevel(log_level)
-    xmlgenerator.randomization.logger.setLevel(log_level)
+    # loggers are configured by names, as modules may not be imported yet
+    for module in _LOGGED_MODULES:
+        logging.getLogger(f'xmlgenerator.{module}').setLevel(log_level)
+
+
+_LOGGED_MODULES = ('configuration', 'processing', 'output', 'schema_cache', 'validation', 'generator', 'substitution',
+                   'randomization', 'lines', 'profiling', 'stats', 'hotspots', 'memory')
 
 
 def _log_expression_error(exc: ExpressionSyntaxError) -> None:
@@ -5,8 +5,6 @@ import sys
 from dataclasses import dataclass, field, Field
 from typing import Dict, get_args, get_origin, Any
 
-import yaml
-
 logger = logging.getLogger(__name__)
 
 
@@ -36,6 +34,7 @@ class VariablesConfig:
 class GeneratorConfig:
     source_filename: str = None
     output_filename: str = None
+    count: int = None
     randomization: RandomizationConfig = field(default_factory=lambda: RandomizationConfig())
     value_override: Dict[str, str] = field(default_factory=dict)
 
@@ -70,12 +69,25 @@ class Config:
         _log_configration('using global configration:', self.global_)
         return self.global_
 
+    def get_count(self, xsd_name, count: int = None) -> int:
+        # number of documents: count of the specific configuration, then the command line option (count),
+        # then count of the global configuration
+        for pattern, conf in self.specific.items():
+            if re.match(pattern, xsd_name):
+                if conf.count is not None:
+                    return conf.count
+                break
+        if count is not None:
+            return count
+        return self.global_.count if self.global_.count is not None else 1
+
 
 def load_config(file_path: str | None) -> "Config":
     if not file_path:
         config = Config()
         _log_configration("created default configuration:", config)
         return config
+    import yaml
     with open(file_path, 'r') as file:
         config_data: dict[str, str] = yaml.safe_load(file) or {}
         config = _map_to_class(config_data, Config, "")
@@ -155,6 +167,7 @@ def _merge_dicts(base_dict, extra_dict):
 
 def _log_configration(message, config):
     if logger.isEnabledFor(logging.DEBUG):
+        import yaml
         logger.debug(message)
         as_dict = dataclasses.asdict(config)
         dumped = yaml.safe_dump(as_dict, allow_unicode=True, width=float("inf"), sort_keys=False, indent=4)
@@ -1,4 +1,5 @@
 import logging
+import time
 from dataclasses import dataclass, replace
 from decimal import Decimal
 from typing import Optional, Any, Callable, Dict
@@ -10,8 +11,9 @@ from xmlschema.validators import XsdComplexType, XsdAtomicRestriction, XsdTotalD
     XsdMinLengthFacet, XsdAnyElement, XsdAtomicBuiltin, XsdEnumerationFacets, XsdMaxExclusiveFacet, XsdMaxInclusiveFacet
 
 from xmlgenerator.configuration import GeneratorConfig
+from xmlgenerator.hotspots import HotSpots, ELEMENT, TYPE, OVERRIDE
 from xmlgenerator.randomization import Randomizer
-from xmlgenerator.substitution import Substitutor
+from xmlgenerator.substitution import Substitutor, ValueOverrides
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +30,85 @@ class TypeConstraints:
     rand_config: Optional[Any] = None
 
 
+_ELEMENT = 'element'
+_GROUP = 'group'
+_ANY = 'any'
+
+_PLANS_CACHE_SIZE = 64
+
+
+# Generation plan: the XSD structure with everything that does not change between documents resolved in advance
+# (occurs bounds merged with configuration, attribute usage, type constraints and value generators).
+# Plan nodes are not modified after compilation.
+
+class ValuePlan:
+    __slots__ = ('target_name', 'is_complex', 'enumeration', 'type_id', 'generator', 'constraints', 'error',
+                 'type_name')
+
+    def __init__(self, target_name, is_complex=False, enumeration=None, type_id=None, generator=None,
+                 constraints=None, error=None, type_name=None):
+        self.target_name = target_name
+        self.is_complex = is_complex
+        self.enumeration = enumeration
+        self.type_id = type_id
+        self.generator = generator
+        self.constraints = constraints
+        # deferred error: raised only when the value has to be generated (it may be overridden by configuration)
+        self.error = error
+        # name of the XSD type (for reports)
+        self.type_name = type_name
+
+
+class AttributePlan:
+    __slots__ = ('name', 'optional', 'value')
+
+    def __init__(self, name, optional, value: ValuePlan):
+        self.name = name
+        self.optional = optional
+        self.value = value
+
+
+class ElementPlan:
+    __slots__ = ('name', 'min_occurs', 'max_occurs', 'attributes', 'value', 'content')
+    kind = _ELEMENT
+
+    def __init__(self, name, min_occurs, max_occurs, attributes=(), value=None):
+        self.name = name
+        self.min_occurs = min_occurs
+        self.max_occurs = max_occurs
+        self.attributes = attributes
+        self.value = value
+        # assigned by compiler after registration of the element (schemas may be recursive)
+        self.content = None
+
+
+class GroupPlan:
+    __slots__ = ('model', 'min_occurs', 'max_occurs', 'particles')
+    kind = _GROUP
+
+    def __init__(self, model, min_occurs, max_occurs, particles=()):
+        self.model = model
+        self.min_occurs = min_occurs
+        self.max_occurs = max_occurs
+        self.particles = particles
+
+
+class AnyPlan:
+    __slots__ = ()
+    kind = _ANY
+
+
+class DocumentPlan:
+    __slots__ = ('xsd_element', 'config', 'root', 'probability', 'value_override')
+
+    def __init__(self, xsd_element, config: GeneratorConfig, root: ElementPlan, value_override: ValueOverrides):
+        self.xsd_element = xsd_element
+        self.config = config
+        self.root = root
+        self.probability = config.randomization.probability
+        self.value_override = value_override
+
+
 class XmlGenerator:
     def __init__(self, randomizer: Randomizer, substitutor: Substitutor):
         self.randomizer = randomizer
@@ -85,190 +166,126 @@ class XmlGenerator:
             'NMTOKEN': self._generate_nmtoken,
             'NMTOKENS': self._generate_nmtokens,
         }
+        self._plans: Dict[tuple, DocumentPlan] = {}
 
     def generate_xml(self, xsd_root_element, local_config: GeneratorConfig, ns_map=None) -> etree.Element:
         logger.debug('generate xml document with root element "%s"', xsd_root_element.local_name)
-        xml_root_element = etree.Element(xsd_root_element.name, nsmap=ns_map)
-        xml_tree = etree.ElementTree(xml_root_element)
-        self._add_elements(xml_tree, xml_root_element, xsd_root_element, local_config)
-        return xml_root_element
-
-    def _add_elements(self, xml_tree, xml_element, xsd_element, local_config: GeneratorConfig) -> None:
-        rand_config = local_config.randomization
-        min_occurs_conf = rand_config.min_occurs
-        max_occurs_conf = rand_config.max_occurs
-
-        # Process child elements --------------------------------------------------------------------------------------
-        if isinstance(xsd_element, XsdElement):
-            element_xpath = xml_tree.getpath(xml_element)
-            logger.debug('element: %s [created]', element_xpath)
-
-            xsd_element_type = getattr(xsd_element, 'type', None)
-
-            # Add attributes if they are
-            attributes = getattr(xsd_element, 'attributes', dict())
-            if len(attributes) > 0 and xsd_element_type.local_name != 'anyType':
-                for attr_name, attr in attributes.items():
-                    logger.debug('element: %s; attribute: "%s" - [processing]', element_xpath, attr_name)
-                    use = attr.use  # optional | required | prohibited
-                    if use == 'prohibited':
-                        logger.debug('element: %s; attribute: "%s" - [skipped]', element_xpath, attr_name)
-                        continue
-                    elif use == 'optional':
-                        if self.randomizer.random() > rand_config.probability:
-                            logger.debug('element: %s; attribute: "%s" - [skipped]', element_xpath, attr_name)
-                            continue
-
-                    attr_value = self._generate_value(attr.type, attr_name, local_config)
-                    if attr_value is not None:
-                        xml_element.set(attr_name, str(attr_value))
-                        logger.debug('element: %s; attribute: "%s" = "%s"', element_xpath, attr_name, attr_value)
-
-            if isinstance(xsd_element_type, XsdAtomicBuiltin):
-                text = self._generate_value(xsd_element_type, xsd_element.name, local_config)
-                xml_element.text = text
-                logger.debug('element: %s = "%s"', element_xpath, text)
-
-            elif isinstance(xsd_element_type, XsdAtomicRestriction):
-                text = self._generate_value(xsd_element_type, xsd_element.name, local_config)
-                xml_element.text = text
-                logger.debug('element: %s = "%s"', element_xpath, text)
-
-            elif isinstance(xsd_element_type, XsdComplexType):
-                xsd_element_type_content = xsd_element_type.content
-                if isinstance(xsd_element_type_content, XsdGroup):
-                    self._add_elements(xml_tree, xml_element, xsd_element_type_content, local_config)
-                else:
-                    raise RuntimeError()
-
-            else:
-                raise RuntimeError()
-
-        elif isinstance(xsd_element, XsdGroup):
-            model = xsd_element.model
-
-            min_occurs = getattr(xsd_element, 'min_occurs', None)
-            max_occurs = getattr(xsd_element, 'max_occurs', None)
-            min_occurs, max_occurs = merge_constraints(
-                schema_min=min_occurs,
-                schema_max=max_occurs,
-                config_min=min_occurs_conf,
-                config_max=max_occurs_conf
-            )
-            if max_occurs is None:
-                max_occurs = 10
-            group_occurs = self.randomizer.integer(min_occurs, max_occurs)
-            logger.debug('add %s (random between %s and %s) groups of type "%s"',
-                         group_occurs, min_occurs, max_occurs, model)
-
-            if model == 'all':
-                for _ in range(group_occurs):
-                    xsd_group_content = xsd_element.content
-                    for xsd_child_element_type in xsd_group_content:
-
-                        min_occurs = getattr(xsd_child_element_type, 'min_occurs', None)
-                        max_occurs = getattr(xsd_child_element_type, 'max_occurs', None)
-                        min_occurs, max_occurs = merge_constraints(
-                            schema_min=min_occurs,
-                            schema_max=max_occurs,
-                            config_min=min_occurs_conf,
-                            config_max=max_occurs_conf
-                        )
-                        if max_occurs is None:
-                            max_occurs = 10
-                        element_occurs = self.randomizer.integer(min_occurs, max_occurs)
-                        logger.debug('element_occurs: %s (random between %s and %s)', element_occurs, min_occurs,
-                                     max_occurs)
-
-                        for _ in range(element_occurs):
-                            xml_child_element = etree.SubElement(xml_element, xsd_child_element_type.name)
-                            self._add_elements(xml_tree, xml_child_element, xsd_child_element_type, local_config)
-
-            elif model == 'sequence':
-                for _ in range(group_occurs):
-                    xsd_group_content = xsd_element.content
-                    for xsd_child_element_type in xsd_group_content:
-                        if isinstance(xsd_child_element_type, XsdElement):
-
-                            min_occurs = getattr(xsd_child_element_type, 'min_occurs', None)
-                            max_occurs = getattr(xsd_child_element_type, 'max_occurs', None)
-                            min_occurs, max_occurs = merge_constraints(
-                                schema_min=min_occurs,
-                                schema_max=max_occurs,
-                                config_min=min_occurs_conf,
-                                config_max=max_occurs_conf
-                            )
-                            if max_occurs is None:
-                                max_occurs = 10
-                            element_occurs = self.randomizer.integer(min_occurs, max_occurs)
-                            logger.debug('element_occurs: %s (random between %s and %s)', element_occurs, min_occurs,
-                                         max_occurs)
-
-                            for _ in range(element_occurs):
-                                xml_child_element = etree.SubElement(xml_element, xsd_child_element_type.name)
-                                self._add_elements(xml_tree, xml_child_element, xsd_child_element_type, local_config)
-
-                        elif isinstance(xsd_child_element_type, XsdGroup):
-                            xml_child_element = xml_element
-                            self._add_elements(xml_tree, xml_child_element, xsd_child_element_type, local_config)
-
-                        elif isinstance(xsd_child_element_type, XsdAnyElement):
-                            xml_child_element = etree.SubElement(xml_element, "Any")
-                            self._add_elements(xml_tree, xml_child_element, xsd_child_element_type, local_config)
-
-                        else:
-                            raise RuntimeError(xsd_child_element_type)
-
-            elif model == 'choice':
-                for _ in range(group_occurs):
-                    xsd_child_element_type = self.randomizer.any(xsd_element)
-
-                    min_occurs = getattr(xsd_child_element_type, 'min_occurs', None)
-                    max_occurs = getattr(xsd_child_element_type, 'max_occurs', None)
-                    min_occurs, max_occurs = merge_constraints(
-                        schema_min=min_occurs,
-                        schema_max=max_occurs,
-                        config_min=min_occurs_conf,
-                        config_max=max_occurs_conf
-                    )
-                    if max_occurs is None:
-                        max_occurs = 10
-                    element_occurs = self.randomizer.integer(min_occurs, max_occurs)
-                    logger.debug('element_occurs: %s (random between %s and %s)', element_occurs, min_occurs,
-                                 max_occurs)
-
-                    for _ in range(element_occurs):
-                        xml_child_element = etree.SubElement(xml_element, xsd_child_element_type.name)
-                        self._add_elements(xml_tree, xml_child_element, xsd_child_element_type, local_config)
+        plan = self._get_plan(xsd_root_element, local_config)
+        writer = _TreeWriter(ns_map)
+        self._execute_element(writer, plan, plan.root)
+        return writer.root
+
+    def write_xml(self, output, xsd_root_element, local_config: GeneratorConfig, ns_map=None,
+                  encoding='utf-8', pretty_print=False) -> tuple[int, int]:
+        # Elements are written to the output (binary file object) as soon as they are generated,
+        # so the document tree is never built in memory. The result is the same as etree.tostring() gives.
+        # Returns numbers of written elements and attributes.
+        logger.debug('write xml document with root element "%s"', xsd_root_element.local_name)
+        plan = self._get_plan(xsd_root_element, local_config)
+        if encoding.lower() not in ('utf-8', 'us-ascii'):
+            output.write(f"<?xml version='1.0' encoding='{encoding}'?>\n".encode('ascii'))
+        with etree.xmlfile(output, encoding=encoding) as xml_file:
+            writer = _StreamWriter(xml_file, ns_map, pretty_print, output, encoding)
+            self._execute_element(writer, plan, plan.root)
+        if pretty_print:
+            output.write(b'\n')
+        return writer.elements, writer.attributes
+
+    def compile_plan(self, xsd_root_element, local_config: GeneratorConfig) -> 'DocumentPlan':
+        logger.debug('compile generation plan for root element "%s"', xsd_root_element.local_name)
+        compiler = _PlanCompiler(self.generators, local_config)
+        root = compiler.compile_element(xsd_root_element)
+        # value_override table is shared by plans of all root elements with the same configuration
+        value_override = next((plan.value_override for plan in self._plans.values() if plan.config is local_config),
+                              None)
+        if value_override is None:
+            value_override = ValueOverrides(local_config.value_override.items())
+        return DocumentPlan(xsd_root_element, local_config, root, value_override)
+
+    def _get_plan(self, xsd_root_element, local_config: GeneratorConfig) -> 'DocumentPlan':
+        key = (id(xsd_root_element), id(local_config))
+        plan = self._plans.get(key)
+        # ids may be reused by new objects, so check the source objects as well
+        if plan is None or plan.xsd_element is not xsd_root_element or plan.config is not local_config:
+            plan = self.compile_plan(xsd_root_element, local_config)
+            if len(self._plans) >= _PLANS_CACHE_SIZE:
+                del self._plans[next(iter(self._plans))]
+            self._plans[key] = plan
+        return plan
+
+    def _execute_element(self, writer, plan: 'DocumentPlan', element: 'ElementPlan') -> None:
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+        # Add attributes if they are
+        xml_attributes = {}
+        for attribute in element.attributes:
+            if attribute.optional and self.randomizer.random() > plan.probability:
+                logger.debug('element: %s; attribute: "%s" - [skipped]', element.name, attribute.name)
+                continue
+            attr_value = self._generate_value(plan, attribute.value)
+            if attr_value is not None:
+                xml_attributes[attribute.name] = str(attr_value)
+
+        writer.start(element.name, xml_attributes)
+        element_xpath = writer.path() if debug_enabled else None
+        logger.debug('element: %s [created]', element_xpath)
+        if debug_enabled:
+            for attr_name, attr_value in xml_attributes.items():
+                logger.debug('element: %s; attribute: "%s" = "%s"', element_xpath, attr_name, attr_value)
+
+        if element.value is not None:
+            text = self._generate_value(plan, element.value)
+            writer.text(text)
+            logger.debug('element: %s = "%s"', element_xpath, text)
+        elif element.content is not None:
+            self._execute_group(writer, plan, element.content)
+        else:
+            raise RuntimeError(f"Can't generate element {element.name}: unsupported content")
 
-            else:
-                raise RuntimeError()
+        writer.end()
 
-        elif isinstance(xsd_element, XsdAnyElement):
-            # для any не добавляем никаких дочерних тегов и атрибутов
-            pass
+    def _execute_group(self, writer, plan: 'DocumentPlan', group: 'GroupPlan') -> None:
+        group_occurs = self.randomizer.integer(group.min_occurs, group.max_occurs)
+        logger.debug('add %s (random between %s and %s) groups of type "%s"',
+                     group_occurs, group.min_occurs, group.max_occurs, group.model)
 
+        if group.model == 'choice':
+            for _ in range(group_occurs):
+                self._execute_particle(writer, plan, self.randomizer.any(group.particles))
         else:
-            raise RuntimeError()
-
-    def _generate_value(self, xsd_type, target_name, local_config: GeneratorConfig) -> str | None:
-        if xsd_type is None:
-            raise RuntimeError(f"xsd_type is None. Target name: {target_name}")
+            for _ in range(group_occurs):
+                for particle in group.particles:
+                    self._execute_particle(writer, plan, particle)
+
+    def _execute_particle(self, writer, plan: 'DocumentPlan', particle) -> None:
+        kind = particle.kind
+        if kind is _ELEMENT:
+            element_occurs = self.randomizer.integer(particle.min_occurs, particle.max_occurs)
+            logger.debug('element_occurs: %s (random between %s and %s)', element_occurs, particle.min_occurs,
+                         particle.max_occurs)
+            for _ in range(element_occurs):
+                self._execute_element(writer, plan, particle)
+        elif kind is _GROUP:
+            self._execute_group(writer, plan, particle)
+        else:
+            # для any не добавляем никаких дочерних тегов и атрибутов
+            writer.start("Any", {})
+            writer.end()
 
-        if isinstance(xsd_type, XsdComplexType):
+    def _generate_value(self, plan: 'DocumentPlan', value: 'ValuePlan') -> str | None:
+        if value.is_complex:
             return None
 
         # -------------------------------------------------------------------------------------------------------------
         # Ищем переопределение значения в конфигурации
-        value_override = local_config.value_override
-        is_found, overridden_value = self.substitutor.substitute_value(target_name, value_override.items())
+        is_found, overridden_value = self.substitutor.substitute_value(value.target_name, plan.value_override)
         if is_found:
             logger.debug('value resolved: "%s"', overridden_value)
             return overridden_value
 
         # -------------------------------------------------------------------------------------------------------------
         # If there is an enumeration, select a random value from it
-        enumeration = getattr(xsd_type, 'enumeration', None)
+        enumeration = value.enumeration
         if enumeration is not None:
             random_enum = self.randomizer.any(enumeration)
             logger.debug('use random value from enumeration: "%s" %s', random_enum, enumeration)
@@ -276,27 +293,14 @@ class XmlGenerator:
 
         # -------------------------------------------------------------------------------------------------------------
         # Генерируем значения для стандартных типов и типов с ограничениями
-        if isinstance(xsd_type, XsdAtomicBuiltin) or isinstance(xsd_type, XsdAtomicRestriction):
-            constraints = extract_type_constraints(xsd_type, local_config)
-            type_id = xsd_type.id or xsd_type.base_type.id or xsd_type.root_type.id
-            logger.debug('generate value for type: "%s"', type_id)
-            generator = self.generators.get(type_id)
-            if generator is None:
-                raise RuntimeError(f"Generator not found for type: {type_id}")
-            generated_value = generator(constraints)
-
-            logger.debug('value generated: "%s"', generated_value)
-            return generated_value
+        if value.error is not None:
+            raise RuntimeError(value.error)
 
-        # -------------------------------------------------------------------------------------------------------------
-        # Проверяем базовый тип
-        base_type = getattr(xsd_type, 'base_type', None)
-
-        # невозможный кейс (только если попался комплексный тип)
-        if base_type is None:
-            raise RuntimeError(f"base_type is None. Target name: {target_name}")
+        logger.debug('generate value for type: "%s"', value.type_id)
+        generated_value = value.generator(value.constraints)
 
-        raise RuntimeError(f"Can't generate value - unhandled type. Target name: {target_name}")
+        logger.debug('value generated: "%s"', generated_value)
+        return generated_value
 
     # noinspection PyUnusedLocal
     def _generate_boolean(self, constraints: TypeConstraints):
@@ -305,8 +309,7 @@ class XmlGenerator:
     def _generate_string(self, constraints: TypeConstraints):
         if constraints.patterns is not None:
             # Генерация строки по regex
-            random_enum = self.randomizer.any(constraints.patterns)
-            random_pattern = random_enum.attrib['value']
+            random_pattern = self.randomizer.any(constraints.patterns)
             return self.randomizer.regex(random_pattern)
 
         # Иначе генерируем случайную строку
@@ -528,6 +531,283 @@ class XmlGenerator:
         raise RuntimeError('not yet implemented')
 
 
+class InstrumentedXmlGenerator(XmlGenerator):
+    # Generator collecting time and calls of element paths, XSD types and value overrides into hot spots.
+    # A separate class, so the plain generator has no instrumentation overhead.
+
+    def __init__(self, randomizer: Randomizer, substitutor: Substitutor, hotspots: HotSpots):
+        super().__init__(randomizer, substitutor)
+        self.hotspots = hotspots
+        self._paths = ['']
+        # time of child elements of the current element
+        self._children_time = 0.0
+        self._local_names = {}
+        self._overrides = {}
+
+    def _execute_element(self, writer, plan: 'DocumentPlan', element: 'ElementPlan') -> None:
+        local_name = self._local_names.get(element.name)
+        if local_name is None:
+            local_name = self._local_names[element.name] = etree.QName(element.name).localname
+        path = f'{self._paths[-1]}/{local_name}'
+        self._paths.append(path)
+        outer_children_time, self._children_time = self._children_time, 0.0
+        started = time.perf_counter()
+        try:
+            super()._execute_element(writer, plan, element)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.hotspots.add(ELEMENT, path, elapsed, elapsed - self._children_time)
+            self._children_time = outer_children_time + elapsed
+            self._paths.pop()
+
+    def _generate_value(self, plan: 'DocumentPlan', value: 'ValuePlan') -> str | None:
+        if value.is_complex:
+            return None
+        started = time.perf_counter()
+        result = super()._generate_value(plan, value)
+        elapsed = time.perf_counter() - started
+        override = self._find_override(plan.value_override, value.target_name)
+        if override is not None:
+            self.hotspots.add(OVERRIDE, override, elapsed, elapsed)
+        else:
+            self.hotspots.add(TYPE, value.type_name or value.type_id or value.target_name, elapsed, elapsed)
+        return result
+
+    def _find_override(self, value_override: ValueOverrides, target_name) -> str | None:
+        key = (value_override, target_name)
+        try:
+            return self._overrides[key]
+        except KeyError:
+            pass
+        found = value_override.find(target_name)
+        override = f'{found[0]} -> {found[1]}' if found is not None else None
+        self._overrides[key] = override
+        return override
+
+
+class _PlanCompiler:
+
+    def __init__(self, generators, local_config: GeneratorConfig):
+        self._generators = generators
+        self._config = local_config
+        self._min_occurs_conf = local_config.randomization.min_occurs
+        self._max_occurs_conf = local_config.randomization.max_occurs
+        self._elements: Dict[int, ElementPlan] = {}
+        self._groups: Dict[int, GroupPlan] = {}
+
+    def compile_element(self, xsd_element) -> ElementPlan:
+        plan = self._elements.get(id(xsd_element))
+        if plan is not None:
+            return plan
+
+        xsd_element_type = getattr(xsd_element, 'type', None)
+
+        attributes = []
+        xsd_attributes = getattr(xsd_element, 'attributes', dict())
+        if len(xsd_attributes) > 0 and xsd_element_type.local_name != 'anyType':
+            for attr_name, attr in xsd_attributes.items():
+                use = attr.use  # optional | required | prohibited
+                if use == 'prohibited':
+                    continue
+                value = self.compile_value(attr.type, attr_name)
+                attributes.append(AttributePlan(attr_name, use == 'optional', value))
+
+        value = None
+        if isinstance(xsd_element_type, (XsdAtomicBuiltin, XsdAtomicRestriction)):
+            value = self.compile_value(xsd_element_type, xsd_element.name)
+
+        min_occurs, max_occurs = self._merge_occurs(xsd_element)
+        plan = ElementPlan(xsd_element.name, min_occurs, max_occurs, tuple(attributes), value)
+        self._elements[id(xsd_element)] = plan
+
+        if isinstance(xsd_element_type, XsdComplexType):
+            xsd_element_type_content = xsd_element_type.content
+            if isinstance(xsd_element_type_content, XsdGroup):
+                plan.content = self.compile_group(xsd_element_type_content)
+
+        return plan
+
+    def compile_group(self, xsd_group) -> GroupPlan:
+        plan = self._groups.get(id(xsd_group))
+        if plan is not None:
+            return plan
+
+        model = xsd_group.model
+        if model not in ('all', 'sequence', 'choice'):
+            raise RuntimeError(f"Unsupported group model: {model}")
+
+        min_occurs, max_occurs = self._merge_occurs(xsd_group)
+        plan = GroupPlan(model, min_occurs, max_occurs)
+        self._groups[id(xsd_group)] = plan
+
+        particles = []
+        for xsd_particle in xsd_group:
+            if isinstance(xsd_particle, XsdElement):
+                particles.append(self.compile_element(xsd_particle))
+            elif isinstance(xsd_particle, XsdGroup):
+                particles.append(self.compile_group(xsd_particle))
+            elif isinstance(xsd_particle, XsdAnyElement):
+                particles.append(AnyPlan())
+            else:
+                raise RuntimeError(xsd_particle)
+        plan.particles = tuple(particles)
+
+        return plan
+
+    def compile_value(self, xsd_type, target_name) -> ValuePlan:
+        if xsd_type is None:
+            return ValuePlan(target_name, error=f"xsd_type is None. Target name: {target_name}")
+
+        if isinstance(xsd_type, XsdComplexType):
+            return ValuePlan(target_name, is_complex=True)
+
+        enumeration = getattr(xsd_type, 'enumeration', None)
+
+        if isinstance(xsd_type, XsdAtomicBuiltin) or isinstance(xsd_type, XsdAtomicRestriction):
+            constraints = extract_type_constraints(xsd_type, self._config)
+            type_id = xsd_type.id or xsd_type.base_type.id or xsd_type.root_type.id
+            type_name = xsd_type.local_name or f'anonymous {type_id} of {target_name}'
+            generator = self._generators.get(type_id)
+            if generator is None:
+                return ValuePlan(target_name, enumeration=enumeration, type_id=type_id,
+                                 error=f"Generator not found for type: {type_id}", type_name=type_name)
+            return ValuePlan(target_name, enumeration=enumeration, type_id=type_id, generator=generator,
+                             constraints=constraints, type_name=type_name)
+
+        # невозможный кейс (только если попался комплексный тип)
+        base_type = getattr(xsd_type, 'base_type', None)
+        if base_type is None:
+            return ValuePlan(target_name, enumeration=enumeration,
+                             error=f"base_type is None. Target name: {target_name}")
+
+        return ValuePlan(target_name, enumeration=enumeration,
+                         error=f"Can't generate value - unhandled type. Target name: {target_name}")
+
+    def _merge_occurs(self, xsd_particle):
+        min_occurs = getattr(xsd_particle, 'min_occurs', None)
+        max_occurs = getattr(xsd_particle, 'max_occurs', None)
+        min_occurs, max_occurs = merge_constraints(
+            schema_min=min_occurs,
+            schema_max=max_occurs,
+            config_min=self._min_occurs_conf,
+            config_max=self._max_occurs_conf
+        )
+        if max_occurs is None:
+            max_occurs = 10
+        return min_occurs, max_occurs
+
+
+class _TreeWriter:
+    # builds the document tree in memory
+
+    def __init__(self, ns_map):
+        self._ns_map = ns_map
+        self._stack = []
+        self.root = None
+
+    def start(self, name, attributes):
+        if self._stack:
+            element = etree.SubElement(self._stack[-1], name, attributes)
+        else:
+            element = etree.Element(name, attributes, nsmap=self._ns_map)
+            self.root = element
+        self._stack.append(element)
+
+    def text(self, value):
+        self._stack[-1].text = value
+
+    def end(self):
+        self._stack.pop()
+
+    def path(self):
+        return self.root.getroottree().getpath(self._stack[-1])
+
+
+class _StreamWriter:
+    # writes elements to lxml incremental writer (etree.xmlfile); the start tag of an element is written
+    # with its first content, so that an element without content is written as an empty-element tag
+
+    def __init__(self, xml_file, ns_map, pretty_print, output, encoding):
+        self._xml_file = xml_file
+        self._ns_map = ns_map
+        self._pretty_print = pretty_print
+        self._output = output
+        self._encoding = encoding
+        self._stack = []
+        self._names = []
+        self._has_children = []
+        self._pending = None
+        self._empty_parent = None
+        self._start_tag_size = 0
+        self.elements = 0
+        self.attributes = 0
+
+    def start(self, name, attributes):
+        self._start_pending()
+        self.elements += 1
+        self.attributes += len(attributes)
+        if self._stack:
+            if self._pretty_print:
+                self._xml_file.write('\n' + '  ' * len(self._stack))
+            self._has_children[-1] = True
+        self._pending = name, attributes
+        self._names.append(name)
+        self._has_children.append(False)
+
+    def text(self, value):
+        # an empty text is written as start and end tags, as in the tree (None is no text)
+        if value is not None:
+            self._start_pending()
+        if value:
+            self._xml_file.write(value)
+
+    def end(self):
+        self._names.pop()
+        if self._pending is not None:
+            self._has_children.pop()
+            self._write_empty(*self._pending)
+            self._pending = None
+            return
+        context = self._stack.pop()
+        if self._pretty_print and self._has_children.pop():
+            self._xml_file.write('\n' + '  ' * len(self._stack))
+        context.__exit__(None, None, None)
+
+    def path(self):
+        return '/' + '/'.join(etree.QName(name).localname for name in self._names)
+
+    def _start_pending(self):
+        if self._pending is None:
+            return
+        name, attributes = self._pending
+        self._pending = None
+        if self._stack:
+            context = self._xml_file.element(name, attributes)
+        else:
+            context = self._xml_file.element(name, attributes, nsmap=self._ns_map)
+        context.__enter__()
+        self._stack.append(context)
+
+    def _write_empty(self, name, attributes):
+        if not self._stack:
+            self._xml_file.write(etree.Element(name, attributes, nsmap=self._ns_map))
+            return
+        # the incremental writer has no empty-element tags, and elements written with it repeat namespace
+        # declarations, so the element is serialized as a child of an element with the namespaces of the root
+        if self._empty_parent is None:
+            self._empty_parent = etree.Element(self._names[0], nsmap=self._ns_map)
+            # serialized as '<root .../>', the start tag is the same without '/'
+            self._start_tag_size = len(self._tostring(self._empty_parent)) - 1
+        element = etree.SubElement(self._empty_parent, name, attributes)
+        data = self._tostring(self._empty_parent)
+        self._empty_parent.remove(element)
+        self._xml_file.flush()
+        self._output.write(data[self._start_tag_size:data.rindex(b'</')])
+
+    def _tostring(self, element) -> bytes:
+        return etree.tostring(element, encoding=self._encoding, xml_declaration=False)
+
+
 _default_aliases = {
     XSD_NAMESPACE: "xs",
     XSI_NAMESPACE: "xsi",
@@ -592,6 +872,9 @@ def extract_type_constraints(xsd_type, local_config: GeneratorConfig) -> TypeCon
     total_digits = None
     fraction_digits = None
     patterns = getattr(xsd_type, 'patterns', None)
+    if patterns is not None:
+        # pattern facets are resolved to regular expressions once, when the generation plan is compiled
+        patterns = [pattern.attrib['value'] for pattern in patterns]
     validators = getattr(xsd_type, 'validators', None)
     for validator in validators:
         if isinstance(validator, XsdMinExclusiveFacet):
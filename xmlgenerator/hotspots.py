@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# categories of hot spots, in the order of the report
+ELEMENT = 'element'
+TYPE = 'type'
+OVERRIDE = 'override'
+CATEGORIES = (ELEMENT, TYPE, OVERRIDE)
+
+_TITLES = {
+    ELEMENT: 'elements (total time includes child elements)',
+    TYPE: 'XSD types (values generated by type)',
+    OVERRIDE: 'value overrides (pattern -> expression)',
+}
+_KEY_WIDTH = 60
+
+
+class HotSpots:
+    # Generation time and call counts of element paths, XSD types and value overrides.
+    # Collected only by the instrumented generator, so it costs nothing when disabled.
+    # Worker processes save their hot spots to a directory, which are merged when the report is written.
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def add(self, category: str, key: str, total: float, own: float, count: int = 1):
+        item = self._items.get((category, key))
+        if item is None:
+            with self._lock:
+                item = self._items.setdefault((category, key), [0, 0.0, 0.0])
+        item[0] += count
+        item[1] += total
+        item[2] += own
+
+    def save_worker_hotspots(self, report_dir: Path):
+        import json
+        items = [[category, key, *values] for (category, key), values in self._items.items()]
+        file_name = Path(report_dir) / f'hotspots-{os.getpid()}.json'
+        file_name.write_text(json.dumps(items), encoding='utf-8')
+
+    def load_worker_hotspots(self, report_dir: Path) -> int:
+        # hot spots of workers are added to the hot spots of this process; returns number of workers
+        import json
+        files = sorted(Path(report_dir).glob('hotspots-*.json'))
+        for file_name in files:
+            for category, key, count, total, own in json.loads(file_name.read_text(encoding='utf-8')):
+                self.add(category, key, total, own, count)
+        return len(files)
+
+    def top(self, category: str, count: int) -> list[tuple[str, int, float, float]]:
+        # (key, calls, total time, own time) sorted by own time
+        items = [(key, *values) for (item_category, key), values in self._items.items() if item_category == category]
+        items.sort(key=lambda item: (-item[3], item[0]))
+        return items[:count]
+
+    def format_report(self, count: int) -> str:
+        lines = [f'hot spots, top {count} by own time:',
+                 f'{"":<{_KEY_WIDTH + 2}} {"calls":>10} {"total, s":>12} {"own, s":>12} {"own/call, us":>14}']
+        for category in CATEGORIES:
+            items = self.top(category, count)
+            if not items:
+                continue
+            lines.append(_TITLES[category] + ':')
+            for key, calls, total, own in items:
+                if len(key) > _KEY_WIDTH:
+                    key = '...' + key[3 - _KEY_WIDTH:]
+                lines.append(f'  {key:<{_KEY_WIDTH}} {calls:>10} {total:>12.3f} {own:>12.3f} '
+                             f'{own / calls * 1e6:>14.1f}')
+        return '\n'.join(lines) + '\n'
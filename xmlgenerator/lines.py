@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, repeat
+from operator import add
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 16 << 20
+_WHITESPACE = b' \t\n\r\x0b\x0c'
+
+# index file: header (magic, size and modification time of the text file, number of lines), then offsets of lines;
+# indexes are saved to the cache directory with names derived from paths of text files
+_INDEX_SUFFIX = '.lineidx'
+_INDEX_MAGIC = b'XGLINES1'
+_INDEX_HEADER = struct.Struct('<8sQQQ')
+
+# indexes of smaller files are built in memory each time
+PERSIST_INDEX_MIN_SIZE = 16 << 20
+DEFAULT_MEMORY_BUDGET = 256 << 20
+
+
+class LineStore:
+    # Lines of a text file (utf-8) backed by a memory-mapped file and an index of line offsets,
+    # so a line is read without loading the file into memory. Trailing whitespaces of the file are ignored.
+    # Index of a large file is saved to the index directory and memory-mapped as well, so worker processes share it;
+    # if the index directory is not specified or can't be written, the index is kept in memory.
+
+    def __init__(self, file_path: Path, persist_index_min_size: int = PERSIST_INDEX_MIN_SIZE,
+                 index_dir: Path | None = None):
+        self.file_path = Path(file_path)
+        self._index_dir = index_dir
+        self._file = open(self.file_path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+        self._index_mmap = None
+        persist = index_dir is not None and stat.st_size >= persist_index_min_size
+        # offsets of line starts; the last item is the end of content plus one (as if followed by a line break)
+        self._offsets = (persist and self._load_index(stat)) or self._build_index(stat, persist)
+        self._count = len(self._offsets) - 1
+
+    @property
+    def index_size(self) -> int:
+        return len(self._offsets) * 8
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < self._count:
+            raise IndexError('line index out of range')
+        line = self._mmap[self._offsets[index]:self._offsets[index + 1] - 1]
+        if line.endswith(b'\r'):
+            line = line[:-1]
+        return line.decode('utf-8')
+
+    def close(self):
+        if self._index_mmap is not None:
+            self._offsets.release()
+            self._index_mmap.close()
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def _build_index(self, stat, persist: bool) -> array:
+        logger.debug('build lines index of %s', self.file_path)
+        data = self._mmap
+        end = len(data)
+        while end and data[end - 1] in _WHITESPACE:
+            end -= 1
+
+        offsets = array('Q')
+        start = 0
+        while start < end:
+            # file is scanned by chunks ending with a line break
+            chunk_end = min(start + _CHUNK_SIZE, end)
+            if chunk_end < end:
+                line_break = data.rfind(b'\n', start, chunk_end)
+                if line_break < 0:
+                    line_break = data.find(b'\n', chunk_end, end)
+                chunk_end = line_break + 1 if line_break >= 0 else end
+            # start of the chunk, starts of lines after each line break, end of the chunk plus one
+            lengths = map(len, data[start:chunk_end].split(b'\n'))
+            offsets.extend(accumulate(map(add, lengths, repeat(1)), initial=start))
+            if chunk_end < end:
+                # the next chunk starts with the last line start
+                del offsets[-2:]
+            start = chunk_end
+        if not offsets:
+            offsets.append(0)
+
+        if persist:
+            self._save_index(stat, offsets)
+        return offsets
+
+    def _index_file(self) -> Path:
+        key = hashlib.sha256(str(self.file_path.absolute()).encode('utf-8')).hexdigest()[:32]
+        return Path(self._index_dir) / f'{self.file_path.name}.{key}{_INDEX_SUFFIX}'
+
+    def _load_index(self, stat) -> memoryview | None:
+        index_file = self._index_file()
+        try:
+            with open(index_file, 'rb') as f:
+                index_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        header = _INDEX_HEADER.unpack_from(index_mmap) if len(index_mmap) >= _INDEX_HEADER.size else None
+        if header is None or header[:3] != (_INDEX_MAGIC, stat.st_size, stat.st_mtime_ns) \
+                or len(index_mmap) != _INDEX_HEADER.size + (header[3] + 1) * 8:
+            logger.debug('lines index %s is outdated', index_file)
+            index_mmap.close()
+            return None
+        logger.debug('load lines index %s', index_file)
+        self._index_mmap = index_mmap
+        return memoryview(index_mmap)[_INDEX_HEADER.size:].cast('Q')
+
+    def _save_index(self, stat, offsets: array):
+        index_file = self._index_file()
+        # write to temporary file first, as several processes may write the same index at once
+        tmp_file = index_file.with_name(f'{index_file.name}.{os.getpid()}.tmp')
+        try:
+            index_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, len(offsets) - 1))
+                offsets.tofile(f)
+            os.replace(tmp_file, index_file)
+            logger.debug('lines index saved to %s', index_file)
+        except OSError as ex:
+            logger.debug('failed to save lines index %s, it is kept in memory: %s', index_file, ex)
+            try:
+                tmp_file.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+
+class LineStoreCache:
+    # Opened line stores within the memory budget (total size of indexes); least recently used stores are closed.
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 persist_index_min_size: int = PERSIST_INDEX_MIN_SIZE, index_dir: Path | None = None):
+        self._memory_budget = memory_budget
+        self._persist_index_min_size = persist_index_min_size
+        self._index_dir = index_dir
+        self._stores = OrderedDict()
+        self._size = 0
+
+    def get(self, file_path: Path) -> LineStore:
+        store = self._stores.get(file_path)
+        if store is not None:
+            self._stores.move_to_end(file_path)
+            return store
+
+        store = LineStore(file_path, self._persist_index_min_size, self._index_dir)
+        self._stores[file_path] = store
+        self._size += store.index_size
+        # the requested store is kept even if it alone exceeds the budget
+        while self._size > self._memory_budget and len(self._stores) > 1:
+            _, evicted = self._stores.popitem(last=False)
+            logger.debug('close lines of %s', evicted.file_path)
+            self._size -= evicted.index_size
+            evicted.close()
+        return store
+
+    def clear(self):
+        for store in self._stores.values():
+            store.close()
+        self._stores.clear()
+        self._size = 0
+
+
+def default_index_dir() -> Path | None:
+    # user cache directory: %LOCALAPPDATA% on Windows, $XDG_CACHE_HOME or ~/.cache on other platforms
+    base = os.environ.get('LOCALAPPDATA') if sys.platform == 'win32' else os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        try:
+            base = Path.home() / '.cache'
+        except RuntimeError:
+            return None
+    return Path(base) / 'xmlgenerator' / 'lines'
+
+
+# line stores are shared by all randomizers of the process
+line_stores = LineStoreCache(index_dir=default_index_dir())
@@ -0,0 +1,303 @@
+import logging
+import os
+import threading
+from pathlib import Path
+
+from xmlgenerator.profiling import PHASES, NULL_PROFILER
+
+logger = logging.getLogger(__name__)
+
+_MB = 1 << 20
+_TOP_SITES = 15
+_RSS_INTERVAL = 0.01
+
+
+class MemoryTracker:
+    # Peak and retained memory of processing phases for each schema, and top allocation sites.
+    # Python allocations are traced with tracemalloc (memory allocated by libxml2 is not traced by it), resident set
+    # size of the process is sampled by a background thread. Phases of the thread which created the tracker are
+    # measured (tracemalloc peak is process-wide, so phases of other threads are passed to the wrapped profiler only).
+    # Phases must not be nested.
+    #
+    # Library usage:
+    #     tracker = MemoryTracker()
+    #     tracker.start()
+    #     processor = DocumentProcessor(args, config, seed, profiler=tracker)
+    #     ...
+    #     tracker.stop()
+    #     print(tracker.format_report())
+
+    enabled = True
+
+    def __init__(self, profiler=NULL_PROFILER, frames: int = 1, top_sites: int = _TOP_SITES,
+                 rss_interval: float = _RSS_INTERVAL):
+        self._profiler = profiler
+        self._frames = frames
+        self._top_sites = top_sites
+        self._rss_interval = rss_interval
+        self._owner = threading.get_ident()
+        # (schema, phase) -> [count, peak, retained, rss peak]
+        self._phases = {}
+        self._max_peak = -1
+        # top sites at the end of the schema phase with the highest peak: [schema, phase, peak, sites];
+        # a snapshot is taken at most once for each phase of each schema, so its cost does not grow with documents
+        self._peak_sites = None
+        self._snapshot_phases = set()
+        # allocation sites before the first schema phase (modules, configuration), other sites are compared to them
+        self._baseline = None
+        self._retained_sites = []
+        self._rss_peak = 0
+        self._process_rss_peaks = []
+        self._started_tracing = False
+        self._sampler = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+            self._started_tracing = True
+        self._rss_peak = _current_rss() or 0
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample_rss, name='xmlgenerator-rss-sampler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        # takes the snapshot of allocations retained at the end of the run and stops tracing
+        import tracemalloc
+        if self._sampler is None:
+            return
+        self._stopped.set()
+        self._sampler.join()
+        self._sampler = None
+        if tracemalloc.is_tracing():
+            self._retained_sites = _top_sites(_group_sites(tracemalloc.take_snapshot()), self._top_sites,
+                                              self._baseline)
+            self._baseline = None
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        self._process_rss_peaks.append(_peak_rss())
+
+    def phase(self, name: str, schema: str = None):
+        if threading.get_ident() != self._owner:
+            return self._profiler.phase(name, schema)
+        return _MemoryPhase(self, name, schema, self._profiler.phase(name, schema))
+
+    def add(self, name: str, schema: str | None, peak: int, retained: int, rss_peak: int | None, count: int = 1):
+        key = (schema, name)
+        phase = self._phases.get(key)
+        if phase is None:
+            self._phases[key] = [count, peak, retained, rss_peak]
+        else:
+            phase[0] += count
+            phase[1] = max(phase[1], peak)
+            phase[2] += retained
+            phase[3] = _max(phase[3], rss_peak)
+
+    def save_worker_memory(self, report_dir: Path):
+        import json
+        self.stop()
+        data = {
+            'phases': [[schema, name, *values] for (schema, name), values in self._phases.items()],
+            'peak_sites': self._peak_sites,
+            'retained_sites': self._retained_sites,
+            'rss_peak': self._process_rss_peaks[-1],
+        }
+        file_name = Path(report_dir) / f'memory-{os.getpid()}.json'
+        file_name.write_text(json.dumps(data), encoding='utf-8')
+
+    def load_worker_memory(self, report_dir: Path) -> int:
+        # phases of workers are added to the phases of this process, allocation sites are merged;
+        # returns number of workers
+        import json
+        files = sorted(Path(report_dir).glob('memory-*.json'))
+        retained = {location: [size, count] for location, size, count in self._retained_sites}
+        for file_name in files:
+            data = json.loads(file_name.read_text(encoding='utf-8'))
+            for schema, name, count, peak, retained_size, rss_peak in data['phases']:
+                self.add(name, schema, peak, retained_size, rss_peak, count)
+            if data['peak_sites'] is not None and data['peak_sites'][2] > self._max_peak:
+                self._max_peak = data['peak_sites'][2]
+                self._peak_sites = data['peak_sites']
+            for location, size, count in data['retained_sites']:
+                site = retained.setdefault(location, [0, 0])
+                site[0] += size
+                site[1] += count
+            self._process_rss_peaks.append(data['rss_peak'])
+        sites = sorted(([location, *site] for location, site in retained.items()), key=lambda site: -site[1])
+        self._retained_sites = sites[:self._top_sites]
+        return len(files)
+
+    def to_dict(self) -> dict:
+        # sizes are in bytes; rss values are None if not available on the platform
+        schemas = {}
+        for (schema, name), (count, peak, retained, rss_peak) in self._phases.items():
+            schemas.setdefault(schema, {})[name] = {
+                'count': count, 'peak': peak, 'retained': retained, 'rss_peak': rss_peak,
+            }
+        peak_sites = None
+        if self._peak_sites is not None:
+            schema, name, peak, sites = self._peak_sites
+            peak_sites = {'schema': schema, 'phase': name, 'peak': peak, 'sites': _sites_dict(sites)}
+        return {
+            'schemas': schemas,
+            'process_rss_peaks': self._process_rss_peaks,
+            'peak_sites': peak_sites,
+            'retained_sites': _sites_dict(self._retained_sites),
+        }
+
+    def format_report(self) -> str:
+        # peak of a schema is the highest peak of its phases, retained memory is summed over phases
+        sections = {}
+        totals = {}
+        for (schema, name), values in self._phases.items():
+            sections.setdefault(schema, {})[name] = values
+            total = totals.setdefault(name, [0, 0, 0, None])
+            total[0] += values[0]
+            total[1] = max(total[1], values[1])
+            total[2] += values[2]
+            total[3] = _max(total[3], values[3])
+
+        lines = ['memory: peak and retained python allocations (tracemalloc), peak resident set size of the process',
+                 f'{"phase":<30} {"count":>9} {"peak, MB":>12} {"retained, MB":>14} {"rss peak, MB":>14}']
+        for schema in sorted(schema for schema in sections if schema is not None):
+            lines.append(f'schema {schema}:')
+            lines.extend(_format_section(sections[schema]))
+        lines.append('all schemas:')
+        lines.extend(_format_section(totals))
+
+        if self._process_rss_peaks:
+            lines.append(f'peak rss of the process: {_mb(self._process_rss_peaks[0])} MB')
+            worker_peaks = [rss for rss in self._process_rss_peaks[1:] if rss is not None]
+            if worker_peaks:
+                lines.append(f'peak rss of {len(worker_peaks)} worker process(es): {_mb(max(worker_peaks))} MB max')
+
+        if self._peak_sites is not None:
+            schema, name, peak, sites = self._peak_sites
+            lines.append(f'top allocation sites at the end of the phase with the highest peak '
+                         f'({name}, {schema}, peak {_mb(peak)} MB; growth since the first schema phase):')
+            lines.extend(_format_sites(sites))
+        if self._retained_sites:
+            lines.append('top allocation sites retained at the end of the run (growth since the first schema phase):')
+            lines.extend(_format_sites(self._retained_sites))
+        return '\n'.join(lines) + '\n'
+
+    def _phase_started(self, schema: str | None):
+        if schema is not None and self._baseline is None:
+            import tracemalloc
+            self._baseline = _group_sites(tracemalloc.take_snapshot())
+
+    def _phase_done(self, name: str, schema: str | None, peak: int, retained: int, rss_peak: int | None):
+        self.add(name, schema, peak, retained, rss_peak)
+        if schema is not None and peak > self._max_peak and (schema, name) not in self._snapshot_phases:
+            import tracemalloc
+            self._snapshot_phases.add((schema, name))
+            self._max_peak = peak
+            sites = _top_sites(_group_sites(tracemalloc.take_snapshot()), self._top_sites, self._baseline)
+            self._peak_sites = [schema, name, peak, sites]
+
+    def _sample_rss(self):
+        while not self._stopped.wait(self._rss_interval):
+            rss = _current_rss()
+            if rss is not None and rss > self._rss_peak:
+                self._rss_peak = rss
+
+
+class _MemoryPhase:
+    __slots__ = ('_tracker', '_name', '_schema', '_inner', '_start')
+
+    def __init__(self, tracker: MemoryTracker, name: str, schema: str | None, inner):
+        self._tracker = tracker
+        self._name = name
+        self._schema = schema
+        self._inner = inner
+
+    def __enter__(self):
+        import tracemalloc
+        self._inner.__enter__()
+        self._tracker._phase_started(self._schema)
+        self._start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self._tracker._rss_peak = _current_rss() or 0
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        rss = _current_rss()
+        rss_peak = max(self._tracker._rss_peak, rss) if rss is not None else None
+        self._tracker._phase_done(self._name, self._schema, peak - self._start, current - self._start, rss_peak)
+        self._inner.__exit__(exc_type, exc_val, exc_tb)
+
+
+def _group_sites(snapshot) -> dict[str, tuple[int, int]]:
+    # size and number of blocks by allocation line; traces are grouped first, as filtering all of them is slow,
+    # then lines of tracemalloc, import machinery and this module are dropped
+    import tracemalloc
+    excluded = {tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>', __file__}
+    sites = {}
+    for statistic in snapshot.statistics('lineno'):
+        frame = statistic.traceback[0]
+        if frame.filename not in excluded:
+            sites[f'{frame.filename}:{frame.lineno}'] = statistic.size, statistic.count
+    return sites
+
+
+def _top_sites(sites: dict, count: int, baseline: dict = None) -> list[list]:
+    # largest allocation sites, or largest growth since the baseline
+    if baseline is None:
+        items = [[location, size, blocks] for location, (size, blocks) in sites.items()]
+    else:
+        items = []
+        for location, (size, blocks) in sites.items():
+            base_size, base_blocks = baseline.get(location, (0, 0))
+            if size > base_size:
+                items.append([location, size - base_size, blocks - base_blocks])
+    items.sort(key=lambda item: -item[1])
+    return items[:count]
+
+
+def _sites_dict(sites: list) -> list[dict]:
+    return [{'location': location, 'size': size, 'blocks': count} for location, size, count in sites]
+
+
+def _format_section(phases: dict) -> list[str]:
+    lines = []
+    for name in sorted(phases, key=lambda name: PHASES.index(name) if name in PHASES else len(PHASES)):
+        count, peak, retained, rss_peak = phases[name]
+        lines.append(f'  {name:<28} {count:>9} {_mb(peak):>12} {_mb(retained):>14} {_mb(rss_peak):>14}')
+    return lines
+
+
+def _format_sites(sites: list) -> list[str]:
+    return [f'  {_mb(size):>10} MB {count:>10} blocks  {location}' for location, size, count in sites]
+
+
+def _mb(size: int | None) -> str:
+    return 'n/a' if size is None else f'{size / _MB:.3f}'
+
+
+def _max(a: int | None, b: int | None) -> int | None:
+    if a is None:
+        return b
+    return a if b is None else max(a, b)
+
+
+def _current_rss() -> int | None:
+    # resident set size of the process (Linux only)
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
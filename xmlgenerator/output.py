@@ -0,0 +1,222 @@
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import sys
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_TAR_MODES = {
+    '.tar': 'w',
+    '.tar.gz': 'w:gz',
+    '.tgz': 'w:gz',
+    '.tar.bz2': 'w:bz2',
+    '.tar.xz': 'w:xz',
+}
+_STDOUT_BUFFER_SIZE = 1 << 20
+
+# codec -> (file suffix, open function, name of compression level argument)
+COMPRESSION_CODECS = {
+    'gzip': ('.gz', gzip.open, 'compresslevel'),
+    'bz2': ('.bz2', bz2.open, 'compresslevel'),
+    'xz': ('.xz', lzma.open, 'preset'),
+}
+
+
+# Sinks receive generated documents with their output filename (without extension).
+# A document is either already serialized (bytes from a worker process) or a document tree,
+# which is serialized once, directly into the destination where it is possible.
+
+class _Sink:
+
+    def __init__(self, encoding: str, pretty_print: bool):
+        # lxml is imported with the first sink, it is not required to parse arguments
+        from lxml import etree
+        self._etree = etree
+        self._encoding = encoding
+        self._pretty_print = pretty_print
+
+    def _to_bytes(self, data) -> bytes:
+        if isinstance(data, bytes):
+            return data
+        return self._etree.tostring(data, encoding=self._encoding, pretty_print=self._pretty_print)
+
+    def _write_to(self, f, data):
+        if isinstance(data, bytes):
+            f.write(data)
+            return
+        # same result as etree.tostring() gives
+        if self._encoding.lower() not in ('utf-8', 'us-ascii'):
+            f.write(f"<?xml version='1.0' encoding='{self._encoding}'?>\n".encode('ascii'))
+        self._etree.ElementTree(data).write(f, encoding=self._encoding, xml_declaration=False,
+                                            pretty_print=self._pretty_print)
+
+
+class FileSink(_Sink):
+    # writes each document to a separate file (or to the only output file), optionally compressed
+
+    def __init__(self, output_path: Path, encoding: str = 'utf-8', pretty_print: bool = False,
+                 compress: str = None, compress_level: int = None):
+        super().__init__(encoding, pretty_print)
+        self._output_path = output_path
+        self._compress = compress
+        self._compress_level = compress_level
+
+    def write(self, filename: str, data):
+        output_file = resolve_output_file(self._output_path, filename, self._compress)
+        with open_output_file(output_file, 'wb', self._compress, self._compress_level) as f:
+            self._write_to(f, data)
+
+    def close(self):
+        pass
+
+
+class TarSink(_Sink):
+
+    def __init__(self, archive_file: Path, mode: str, encoding: str = 'utf-8', pretty_print: bool = False):
+        super().__init__(encoding, pretty_print)
+        _warn_if_exists(archive_file)
+        self._tar = tarfile.open(archive_file, mode)
+        self._mtime = int(time.time())
+
+    def write(self, filename: str, data):
+        # tar header requires size of the document, so it is serialized to bytes first
+        data = self._to_bytes(data)
+        member = tarfile.TarInfo(f'{filename}.xml')
+        member.size = len(data)
+        member.mtime = self._mtime
+        member.mode = 0o644
+        logger.debug('add xml document %s to archive %s', member.name, self._tar.name)
+        self._tar.addfile(member, io.BytesIO(data))
+
+    def close(self):
+        self._tar.close()
+
+
+class ZipSink(_Sink):
+
+    def __init__(self, archive_file: Path, encoding: str = 'utf-8', pretty_print: bool = False):
+        super().__init__(encoding, pretty_print)
+        _warn_if_exists(archive_file)
+        self._zip = zipfile.ZipFile(archive_file, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, filename: str, data):
+        member = zipfile.ZipInfo(f'{filename}.xml', date_time=time.localtime()[:6])
+        member.compress_type = zipfile.ZIP_DEFLATED
+        member.external_attr = 0o644 << 16
+        logger.debug('add xml document %s to archive %s', member.filename, self._zip.filename)
+        with self._zip.open(member, 'w', force_zip64=True) as f:
+            self._write_to(f, data)
+
+    def close(self):
+        self._zip.close()
+
+
+class StdoutSink(_Sink):
+    # text - documents are written one after another, each followed by line break
+    # length - each document is preceded by its length in bytes (8 bytes, big-endian)
+    # nul - each document is followed by NUL byte
+    # lines - one document per line (line breaks inside documents are replaced with character references)
+
+    def __init__(self, encoding: str = 'utf-8', pretty_print: bool = False, stdout_format: str = 'text'):
+        super().__init__(encoding, pretty_print)
+        self._format = stdout_format
+        self._buffer = bytearray()
+
+    def write(self, filename: str, data):
+        logger.debug('print xml document to stdout')
+        match self._format:
+            case 'text':
+                self._flush()
+                self._write_to(sys.stdout.buffer, data)
+                sys.stdout.buffer.write(b'\n')
+                sys.stdout.buffer.flush()
+                return
+            case 'length':
+                data = self._to_bytes(data)
+                self._buffer += len(data).to_bytes(8, 'big')
+                self._buffer += data
+            case 'nul':
+                self._buffer += self._to_bytes(data)
+                self._buffer += b'\0'
+            case 'lines':
+                data = self._to_bytes(data)
+                # line breaks are escaped inside the document element only, the line break after
+                # the XML declaration is dropped
+                if data.startswith(b'<?xml'):
+                    end = data.index(b'?>') + 2
+                    self._buffer += data[:end]
+                    data = data[end:].lstrip(b'\r\n')
+                self._buffer += data.rstrip(b'\n').replace(b'\r', b'&#13;').replace(b'\n', b'&#10;')
+                self._buffer += b'\n'
+        if len(self._buffer) >= _STDOUT_BUFFER_SIZE:
+            self._flush()
+
+    def close(self):
+        self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            sys.stdout.buffer.write(self._buffer)
+            sys.stdout.buffer.flush()
+            self._buffer.clear()
+
+
+def open_sink(output_path: Path | None, encoding: str, pretty_print: bool = False, compress: str = None,
+              compress_level: int = None, stdout_format: str = 'text'):
+    if output_path is None:
+        return StdoutSink(encoding, pretty_print, stdout_format)
+
+    archive_format = get_archive_format(output_path)
+    if archive_format == '.zip':
+        logger.debug('write xml documents to zip archive %s', output_path.absolute())
+        return ZipSink(output_path, encoding, pretty_print)
+    if archive_format is not None:
+        logger.debug('write xml documents to tar archive %s', output_path.absolute())
+        return TarSink(output_path, _TAR_MODES[archive_format], encoding, pretty_print)
+    return FileSink(output_path, encoding, pretty_print, compress, compress_level)
+
+
+def open_output_file(output_file: Path, mode: str, compress: str = None, compress_level: int = None):
+    # opens output file in binary mode; compressed data is written (or read) by chunks
+    if compress is None:
+        return open(output_file, mode)
+    _, open_func, level_arg = COMPRESSION_CODECS[compress]
+    if compress_level is None or 'r' in mode:
+        return open_func(output_file, mode)
+    return open_func(output_file, mode, **{level_arg: compress_level})
+
+
+def get_archive_format(output_path: Path) -> str | None:
+    # returns archive suffix ('.zip', '.tar', '.tar.gz', ...) or None if output is not an archive
+    name = output_path.name.lower()
+    if name.endswith('.zip'):
+        return '.zip'
+    for suffix in _TAR_MODES:
+        if name.endswith(suffix):
+            return suffix
+    return None
+
+
+def resolve_output_file(output_path: Path, xml_filename: str, compress: str = None) -> Path:
+    # compressed files get the suffix of the codec, also the only output file (unless it already has it)
+    suffix = COMPRESSION_CODECS[compress][0] if compress else ''
+    output_file = output_path
+    if output_path.is_dir():
+        output_file = output_path / f'{xml_filename}.xml{suffix}'
+    elif not output_path.name.lower().endswith(suffix):
+        output_file = output_path.with_name(output_path.name + suffix)
+    output_file = output_file.absolute()
+    logger.debug('save xml document as %s', output_file.as_uri())
+    _warn_if_exists(output_file)
+    return output_file
+
+
+def _warn_if_exists(output_file: Path):
+    if output_file.exists():
+        logger.warning('file %s already exists and will be overwritten', output_file.absolute().as_uri())
@@ -0,0 +1,314 @@
+import logging
+import multiprocessing
+import multiprocessing.util
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Iterable, Iterator
+
+from lxml import etree
+from xmlschema import XMLSchema, XMLResource
+
+from xmlgenerator.configuration import Config
+from xmlgenerator.generator import XmlGenerator, InstrumentedXmlGenerator, get_ns_map
+from xmlgenerator.hotspots import HotSpots
+from xmlgenerator.output import resolve_output_file, open_output_file
+from xmlgenerator.profiling import Profiler, NULL_PROFILER
+from xmlgenerator.randomization import create_randomizer
+from xmlgenerator.schema_cache import SchemaCache
+from xmlgenerator.stats import DocumentStats
+from xmlgenerator.substitution import Substitutor
+from xmlgenerator.validation import XmlValidator
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentJob(NamedTuple):
+    xsd_file: Path
+    index: int
+
+
+class GeneratedDocument(NamedTuple):
+    root_element: str
+    filename: str
+    # serialized document, or the document tree if serialization is left to the output (single process mode),
+    # or None if the document was written to the output file during generation (streaming mode)
+    data: bytes | etree._Element | None
+    validation_error: str | None
+    # False if validation is disabled or the document was not selected for validation
+    validated: bool
+    # collected only if run statistics are enabled
+    stats: DocumentStats | None = None
+
+
+# Generates documents for jobs. The last loaded schema is kept, so consecutive jobs of the same schema reuse it.
+# Each document is generated with a seed derived from the schema name, the root element and the document index,
+# so the result does not depend on the order of jobs or on the process that executes them.
+class DocumentProcessor:
+
+    def __init__(self, args, config: Config, seed, output_path: Path | None = None, serialize: bool = True,
+                 profiler=NULL_PROFILER, hotspots: HotSpots = None, validation_spent=None):
+        self._args = args
+        self.profiler = profiler
+        self._serialize = serialize
+        self._collect_stats = args.stats is not None
+        self._config = config
+        self._output_path = output_path
+        self.randomizer = create_randomizer(seed, args.random_engine, args.faker_pool)
+        self.substitutor = Substitutor(self.randomizer, config.variables)
+        self.substitutor.compile_config(config)
+        if hotspots is None:
+            self.generator = XmlGenerator(self.randomizer, self.substitutor)
+        else:
+            self.generator = InstrumentedXmlGenerator(self.randomizer, self.substitutor, hotspots)
+        self.validator = XmlValidator(args.validation, args.ignore_validation_errors, args.validate_sample,
+                                      args.validate_first, args.validate_budget, seed, validation_spent)
+        self._schema_cache = SchemaCache(args.schema_cache) if args.schema_cache else None
+        self._loaded_file = None
+        self._loaded = None
+
+    def process(self, job: DocumentJob) -> list[GeneratedDocument]:
+        xsd_schema, ns_map, local_config = self._load_schema(job.xsd_file)
+        profiler, schema_name = self.profiler, job.xsd_file.name
+
+        documents = []
+        for xsd_root_element in xsd_schema.root_elements:
+            root_element_name = xsd_root_element.local_name
+            self.randomizer.reseed(job.xsd_file.name, root_element_name, job.index)
+            self.randomizer.refresh_pools(job.index)
+            # Reset context for current schema and root element
+            self.substitutor.reset_context(job.xsd_file.name, root_element_name, local_config)
+
+            validated = self.validator.select(job.index, job.xsd_file.name, root_element_name)
+
+            if self._args.stream:
+                documents.append(self._write_document(xsd_schema, xsd_root_element, local_config, ns_map, validated))
+                continue
+
+            # Generate XML document
+            started = time.perf_counter()
+            with profiler.phase('generation', schema_name):
+                xml_root = self.generator.generate_xml(xsd_root_element, local_config, ns_map)
+            generated = time.perf_counter()
+            # Validation (if enabled) of the generated tree, without parsing the serialized document again
+            validation_error = None
+            if validated:
+                with profiler.phase('validation', schema_name):
+                    validation_error = self.validator.check(xsd_schema, xml_root)
+            validated_at = time.perf_counter()
+            # Marshall to bytes (documents are passed from worker processes serialized)
+            xml_data = xml_root
+            if self._serialize:
+                with profiler.phase('serialization', schema_name):
+                    xml_data = etree.tostring(xml_root, encoding=self._args.encoding, pretty_print=self._args.pretty)
+            stats = None
+            if self._collect_stats:
+                serialized = time.perf_counter()
+                stats = DocumentStats(_count_elements(xml_root), _count_attributes(xml_root),
+                                      len(xml_data) if self._serialize else 0,
+                                      generated - started, serialized - validated_at, validated_at - generated)
+            # Get output filename for current document (without extension)
+            xml_filename = self.substitutor.get_output_filename()
+            documents.append(GeneratedDocument(root_element_name, xml_filename, xml_data, validation_error, validated,
+                                               stats))
+
+        return documents
+
+    def _write_document(self, xsd_schema, xsd_root_element, local_config, ns_map, validated) -> GeneratedDocument:
+        compress, compress_level = self._args.compress, self._args.compress_level
+        xml_filename = self.substitutor.get_output_filename()
+        output_file = resolve_output_file(self._output_path, xml_filename, compress)
+        schema_name = xsd_schema.name
+        # Generate XML document directly to the output file (compressed by chunks if required)
+        started = time.perf_counter()
+        with self.profiler.phase('generation', schema_name), \
+                open_output_file(output_file, 'wb', compress, compress_level) as f:
+            elements, attributes = self.generator.write_xml(f, xsd_root_element, local_config, ns_map,
+                                                            encoding=self._args.encoding,
+                                                            pretty_print=self._args.pretty)
+            # position of (compressed) file object is the size of uncompressed data
+            output_bytes = f.tell()
+        generated = time.perf_counter()
+        # Validation (if enabled) reads the written file lazily
+        validation_error = None
+        if validated:
+            with self.profiler.phase('validation', schema_name), open_output_file(output_file, 'rb', compress) as f:
+                validation_error = self.validator.check(xsd_schema, XMLResource(f, lazy=True))
+        stats = None
+        if self._collect_stats:
+            # serialization is a part of generation in streaming mode
+            stats = DocumentStats(elements, attributes, output_bytes, generated - started, 0.0,
+                                  time.perf_counter() - generated)
+        return GeneratedDocument(xsd_root_element.local_name, xml_filename, None, validation_error, validated, stats)
+
+    def _load_schema(self, xsd_file: Path):
+        if self._loaded_file != xsd_file:
+            # get configuration override for current schema
+            local_config = self._config.get_for_file(xsd_file.name)
+
+            # load XSD schema
+            logger.debug('load schema %s', xsd_file.as_uri())
+            with self.profiler.phase('schema build', xsd_file.name):
+                if self._schema_cache is not None:
+                    xsd_schema = self._schema_cache.load(xsd_file)
+                else:
+                    xsd_schema = XMLSchema(xsd_file)  # loglevel='DEBUG'
+
+            # get namespace mapping
+            with self.profiler.phase('namespace map', xsd_file.name):
+                ns_map = get_ns_map(xsd_schema, self._args.ns_aliases)
+
+            root_elements_count = len(xsd_schema.root_elements)
+            if root_elements_count > 1:
+                logger.debug('schema "%s" contains %s root elements', xsd_file.name, root_elements_count)
+
+            self._loaded_file = xsd_file
+            self._loaded = xsd_schema, ns_map, local_config
+
+        return self._loaded
+
+
+def _count_elements(xml_root: etree._Element) -> int:
+    return sum(1 for _ in xml_root.iter(etree.Element))
+
+
+def _count_attributes(xml_root: etree._Element) -> int:
+    return sum(len(element.attrib) for element in xml_root.iter(etree.Element))
+
+
+def iter_jobs(xsd_files: list[Path], config: Config, count_option: int = None) -> Iterator[DocumentJob]:
+    for xsd_file in xsd_files:
+        # number of documents to generate for each root element
+        count = config.get_count(xsd_file.name, count_option)
+        if count < 1:
+            logger.warning('invalid documents count %s for schema "%s". Skip schema', count, xsd_file.name)
+            continue
+        logger.debug('schema "%s": %s document(s) for each root element', xsd_file.name, count)
+        for index in range(count):
+            yield DocumentJob(xsd_file, index)
+
+
+def process_serial(processor: DocumentProcessor, jobs: Iterable[DocumentJob]):
+    for job in jobs:
+        yield job, processor.process(job)
+
+
+def process_parallel(args, config: Config, seed, output_path: Path | None, jobs: list[DocumentJob], workers: int,
+                     report_dir: Path = None):
+    # consecutive jobs of one schema are sent to a worker in chunks, so the schema is loaded once per chunk
+    # (and a worker loads the next schema while others are still generating documents of the previous one)
+    chunksize = max(1, min(64, len(jobs) // (workers * 4)))
+    # number of jobs sent to the pool but not yet consumed is bounded, so results do not pile up in memory
+    # when consumer (writing) is slower than generation
+    slots = threading.Semaphore(chunksize * workers * _PENDING_CHUNKS_PER_WORKER)
+    stopped = threading.Event()
+    logger.debug('process %s job(s) with %s worker(s), chunk size: %s', len(jobs), workers, chunksize)
+    # CPU time spent on validation is shared by workers, so the validation budget applies to the whole run
+    validation_spent = multiprocessing.Value('d', 0.0) if args.validate_budget is not None else None
+    initargs = (args, config, seed, output_path, report_dir, validation_spent)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        try:
+            for job, documents in zip(jobs, pool.imap(_process_job, _acquire_each(jobs, slots, stopped), chunksize)):
+                yield job, documents
+                slots.release()
+            # workers exit normally (and save their profiles, memory reports and hot spots, if enabled)
+            pool.close()
+            pool.join()
+        finally:
+            # unblock the pool's task feeder, otherwise the pool can't be terminated
+            stopped.set()
+            slots.release()
+
+
+def _acquire_each(jobs: Iterable[DocumentJob], slots: threading.Semaphore, stopped: threading.Event):
+    for job in jobs:
+        slots.acquire()
+        if stopped.is_set():
+            slots.release()
+            return
+        yield job
+
+
+class DocumentWriter:
+    # Writes documents to the sink (files, archive or stdout) in a separate thread,
+    # so I/O does not stall generation. Documents are written in the order they are passed.
+
+    def __init__(self, sink, queue_size: int = 64, profiler=NULL_PROFILER):
+        self._sink = sink
+        self._profiler = profiler
+        self._queue = queue.Queue(queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='xmlgenerator-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, filename: str, data: bytes, schema_name: str = None):
+        self._raise_error()
+        self._queue.put((filename, data, schema_name))
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            try:
+                self._sink.close()
+            except BaseException as ex:
+                self._error = self._error or ex
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # pending documents are written even if processing is interrupted
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        while (item := self._queue.get()) is not None:
+            if self._error is not None:
+                continue
+            filename, data, schema_name = item
+            try:
+                # in single process mode documents are serialized by the sink, so it is a part of this phase
+                with self._profiler.phase('write', schema_name):
+                    self._sink.write(filename, data)
+            except BaseException as ex:
+                self._error = ex
+
+
+_PENDING_CHUNKS_PER_WORKER = 4
+
+_worker_processor: DocumentProcessor | None = None
+
+
+def _init_worker(args, config, seed, output_path, report_dir, validation_spent):
+    global _worker_processor
+    # setup logging in worker process (required for 'spawn' start method)
+    from xmlgenerator import bootstrap
+    bootstrap._setup_loggers(args)
+    # profile, memory report and hot spots are saved to the report directory when the worker exits
+    profiler = NULL_PROFILER
+    hotspots = None
+    if report_dir is not None and args.profile:
+        profiler = Profiler()
+        profiler.start()
+        multiprocessing.util.Finalize(profiler, profiler.save_worker_profile, args=(report_dir,), exitpriority=10)
+    if report_dir is not None and args.memory_report:
+        from xmlgenerator.memory import MemoryTracker
+        profiler = MemoryTracker(profiler)
+        profiler.start()
+        multiprocessing.util.Finalize(profiler, profiler.save_worker_memory, args=(report_dir,), exitpriority=10)
+    if report_dir is not None and args.hotspots:
+        hotspots = HotSpots()
+        multiprocessing.util.Finalize(hotspots, hotspots.save_worker_hotspots, args=(report_dir,), exitpriority=10)
+    _worker_processor = DocumentProcessor(args, config, seed, output_path, profiler=profiler, hotspots=hotspots,
+                                          validation_spent=validation_spent)
+
+
+def _process_job(job: DocumentJob) -> list[GeneratedDocument]:
+    return _worker_processor.process(job)
@@ -0,0 +1,165 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('import', 'argument parsing', 'config load', 'schema build', 'namespace map', 'generation', 'serialization',
+          'validation', 'write')
+
+_TOP_FUNCTIONS = 40
+
+
+class Profiler:
+    # Collects wall and CPU time of processing phases for each schema, and cProfile statistics.
+    # CPU time is measured for the thread executing the phase (documents are written in a separate thread).
+    # Worker processes save their profiles to a directory, which is merged when the report is written.
+
+    enabled = True
+
+    def __init__(self):
+        # profiling modules are imported only if profiling is enabled
+        import cProfile
+        self._phases = {}
+        self._lock = threading.Lock()
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def phase(self, name: str, schema: str = None) -> '_Phase':
+        return _Phase(self, name, schema)
+
+    def add(self, name: str, schema: str | None, wall: float, cpu: float, count: int = 1):
+        key = (schema, name)
+        with self._lock:
+            times = self._phases.get(key)
+            if times is None:
+                self._phases[key] = [wall, cpu, count]
+            else:
+                times[0] += wall
+                times[1] += cpu
+                times[2] += count
+
+    def save_worker_profile(self, profile_dir: Path):
+        import json
+        self.stop()
+        file_name = Path(profile_dir) / f'worker-{os.getpid()}'
+        self._profile.dump_stats(file_name.with_suffix('.pstats'))
+        phases = [[schema, name, *times] for (schema, name), times in self._phases.items()]
+        file_name.with_suffix('.json').write_text(json.dumps(phases), encoding='utf-8')
+
+    def load_worker_profiles(self, profile_dir: Path) -> list[Path]:
+        # phases of workers are added to the phases of this process; returns profiles of workers
+        import json
+        profiles = sorted(Path(profile_dir).glob('worker-*.pstats'))
+        for phases_file in sorted(Path(profile_dir).glob('worker-*.json')):
+            for schema, name, wall, cpu, count in json.loads(phases_file.read_text(encoding='utf-8')):
+                self.add(name, schema, wall, cpu, count)
+        return profiles
+
+    def write_report(self, output_file: Path, profile_dir: Path = None):
+        import pstats
+        self.stop()
+        worker_profiles = self.load_worker_profiles(profile_dir) if profile_dir else []
+        stats = pstats.Stats(self._profile)
+        for worker_profile in worker_profiles:
+            stats.add(str(worker_profile))
+        stats.dump_stats(output_file)
+
+        report_file = output_file.with_name(output_file.name + '.txt')
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write(self.format_phases())
+            if worker_profiles:
+                f.write(f'\nprofiles of {len(worker_profiles)} worker process(es) are merged; '
+                        f'time of phases is summed over processes\n')
+            f.write('\n')
+            stats.stream = f
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_TOP_FUNCTIONS)
+        logger.info('profile saved to %s, phases report: %s', output_file, report_file)
+
+    def format_phases(self) -> str:
+        # phases executed once per run (argument parsing, config load) are included into totals only
+        sections = {}
+        totals = {}
+        for (schema, name), times in self._phases.items():
+            sections.setdefault(schema, {})[name] = times
+            total = totals.setdefault(name, [0.0, 0.0, 0])
+            for i, value in enumerate(times):
+                total[i] += value
+
+        lines = [f'{"phase":<30} {"count":>9} {"wall, s":>12} {"cpu, s":>12}']
+        for schema in sorted(schema for schema in sections if schema is not None):
+            lines.append(f'schema {schema}:')
+            lines.extend(_format_section(sections[schema]))
+        lines.append('all schemas:')
+        lines.extend(_format_section(totals))
+        return '\n'.join(lines) + '\n'
+
+
+def _format_section(phases: dict) -> list[str]:
+    lines = []
+    wall_sum = cpu_sum = 0.0
+    for name in PHASES:
+        if name in phases:
+            wall, cpu, count = phases[name]
+            wall_sum += wall
+            cpu_sum += cpu
+            lines.append(f'  {name:<28} {count:>9} {wall:>12.3f} {cpu:>12.3f}')
+    lines.append(f'  {"sum":<28} {"":>9} {wall_sum:>12.3f} {cpu_sum:>12.3f}')
+    return lines
+
+
+class _Phase:
+    __slots__ = ('_profiler', '_name', '_schema', '_wall', '_cpu')
+
+    def __init__(self, profiler: Profiler, name: str, schema: str | None):
+        self._profiler = profiler
+        self._name = name
+        self._schema = schema
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._profiler.add(self._name, self._schema,
+                           time.perf_counter() - self._wall, time.thread_time() - self._cpu)
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class NullProfiler:
+    # used when profiling is disabled
+
+    enabled = False
+    _phase = _NullPhase()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def phase(self, name: str, schema: str = None) -> _NullPhase:
+        return self._phase
+
+    def add(self, name: str, schema: str | None, wall: float, cpu: float, count: int = 1):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
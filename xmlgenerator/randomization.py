@@ -1,20 +1,27 @@
+import hashlib
 import logging
 import mimetypes
 import random
 import re
 import string
 import sys
+import uuid
 from datetime import datetime, date, time, timedelta
+from functools import partial
 from pathlib import Path
 
-import rstr
-from faker import Faker
+from xmlgenerator.lines import LineStore, line_stores
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
 
 logger = logging.getLogger(__name__)
 
 
 class Randomizer:
-    def __init__(self, seed=None):
+    def __init__(self, seed=None, faker_pool: int = None):
         if not seed:
             seed = random.randrange(sys.maxsize)
             logger.debug('initialize with random seed: %s', seed)
@@ -22,10 +29,45 @@ class Randomizer:
             logger.debug('initialize with provided seed: %s', seed)
 
         self._fakers = {}
+        # random generators of fakers by locale (created before fakers, as uuid values do not require faker)
+        self._faker_randoms = {}
+        self._base_seed = seed
         self._seed = seed
         self._rnd = random.Random(seed)
-        self._rstr = rstr.Rstr(self._rnd)
-        self._loaded_files = {}
+        self._regexes = {}
+        self._resolved_files = {}
+        # pooled mode: values of Faker providers are sampled from pools of pre-generated values
+        self._faker_pool = faker_pool
+        self._pool_fakers = {}
+        self._pools = {}
+        self._pools_epoch = 0
+
+    @property
+    def seed(self):
+        return self._base_seed
+
+    def reseed(self, *parts):
+        # reseed generator and all created fakers with a seed derived from the initial seed,
+        # so generated values do not depend on the order in which documents are generated
+        seed = derive_seed(self._base_seed, *parts)
+        self._seed = seed
+        self._rnd.seed(seed)
+        for faker_random in self._faker_randoms.values():
+            faker_random.seed(seed)
+
+    def spawn(self, *parts):
+        # spawned randomizers generate a few values, so they do not use pools
+        return type(self)(derive_seed(self._base_seed, *parts))
+
+    def refresh_pools(self, document_index: int):
+        # pools are rebuilt every `faker_pool` documents; content of pools depends only on the document index,
+        # so the result does not depend on the order of documents or on the process that generates them
+        if self._faker_pool is None:
+            return
+        epoch = document_index // self._faker_pool
+        if epoch != self._pools_epoch:
+            self._pools_epoch = epoch
+            self._pools.clear()
 
     def _faker(self, locale='en_US'):
         if locale is None:
@@ -33,20 +75,43 @@ class Randomizer:
         faker = self._fakers.get(locale)
         if faker is None:
             logger.debug('initialize new faker with locale: %s', locale)
-            faker = Faker(locale=locale)
-            faker.seed_instance(self._seed)
+            faker = _new_faker(locale)
+            faker.random = self._faker_random(locale)
             self._fakers[locale] = faker
         else:
             logger.debug('get existing faker with locale: %s', locale)
 
         return faker
 
-    def _lines(self, file_path: str):
+    def _faker_random(self, locale: str) -> random.Random:
+        faker_random = self._faker_randoms.get(locale)
+        if faker_random is None:
+            faker_random = self._faker_randoms[locale] = random.Random(self._seed)
+        return faker_random
+
+    def _fake(self, provider: str, locale: str | None, produce):
+        if locale is None:
+            locale = 'en_US'
+        if self._faker_pool is None:
+            return produce(self._faker(locale))
+
+        pool = self._pools.get((provider, locale))
+        if pool is None:
+            # pools are filled by separate fakers, so values generated directly by fakers are not affected
+            faker = self._pool_fakers.get(locale)
+            if faker is None:
+                faker = self._pool_fakers[locale] = _new_faker(locale)
+            faker.seed_instance(derive_seed(self._base_seed, 'faker pool', provider, locale, self._pools_epoch))
+            logger.debug('fill pool of %s values for %s (%s)', self._faker_pool, provider, locale)
+            pool = self._pools[(provider, locale)] = [produce(faker) for _ in range(self._faker_pool)]
+        return self.any(pool)
+
+    def _lines(self, file_path: str) -> LineStore:
         if file_path is None or len(file_path) == 0:
             raise RuntimeError('no file specified')
 
-        file_lines = self._loaded_files.get(file_path)
-        if file_lines is None:
+        resolved_path = self._resolved_files.get(file_path)
+        if resolved_path is None:
             resolved_path = Path(file_path).resolve()
             if not resolved_path.exists():
                 raise FileNotFoundError(f'file {resolved_path} does not exists')
@@ -55,18 +120,11 @@ class Randomizer:
             mime = mimetypes.guess_type(resolved_path)
             if mime[0] is None or not mime[0].startswith('text/'):
                 raise RuntimeError(f'file {resolved_path} is not text file')
-            try:
-                with open(resolved_path, 'r', encoding='utf-8') as f:
-                    file_content = f.read().rstrip()
-                    if not file_content:
-                        file_lines = []
-                    else:
-                        file_lines = file_content.split('\n')
-                    self._loaded_files[file_path] = file_lines
-            except FileNotFoundError:
-                raise FileNotFoundError(f'file {resolved_path} does not exists')
+            self._resolved_files[file_path] = resolved_path
 
-        return file_lines
+        # file is memory-mapped and indexed once per process; the least recently used files are closed
+        # when the memory budget is exceeded
+        return line_stores.get(resolved_path)
 
     def random(self):
         return self._rnd.random()
@@ -78,11 +136,14 @@ class Randomizer:
         return self._rnd.choice(self._lines(file_path))
 
     def regex(self, pattern):
-        xeger = self._rstr.xeger(pattern)
-        return re.sub(r'\s', ' ', xeger)
+        generate = self._regexes.get(pattern)
+        if generate is None:
+            generate = self._regexes[pattern] = _RegexCompiler(self._rnd).compile(pattern)
+        return generate()
 
     def uuid(self):
-        return self._faker().uuid4()
+        # the same as Faker.uuid4(), without importing faker
+        return str(uuid.UUID(int=self._faker_random('en_US').getrandbits(128), version=4))
 
     def integer(self, min_value, max_value):
         return self._rnd.randint(min_value, max_value)
@@ -146,62 +207,62 @@ class Randomizer:
 
     def first_name(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).first_name_male()
+        return self._fake('first_name', locale, lambda faker: faker.first_name_male())
 
     def last_name(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).last_name_male()
+        return self._fake('last_name', locale, lambda faker: faker.last_name_male())
 
     def middle_name(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        faker = self._faker(locale)
-        return faker.middle_name_male() if hasattr(faker, 'middle_name_male') else faker.first_name_male()
+        return self._fake('middle_name', locale, lambda faker: faker.middle_name_male()
+                          if hasattr(faker, 'middle_name_male') else faker.first_name_male())
 
     def phone_number(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).phone_number()
+        return self._fake('phone_number', locale, lambda faker: faker.phone_number())
 
     def email(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).email()
+        return self._fake('email', locale, lambda faker: faker.email())
 
     # address
 
     def country(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).country()
+        return self._fake('country', locale, lambda faker: faker.country())
 
     def city(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        faker = self._faker(locale)
-        return faker.city_name() if hasattr(faker, 'city_name') else faker.city()
+        return self._fake('city', locale, lambda faker: faker.city_name()
+                          if hasattr(faker, 'city_name') else faker.city())
 
     def street(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).street_name()
+        return self._fake('street', locale, lambda faker: faker.street_name())
 
     def house_number(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).building_number()
+        return self._fake('house_number', locale, lambda faker: faker.building_number())
 
     def postcode(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).postcode()
+        return self._fake('postcode', locale, lambda faker: faker.postcode())
 
     def administrative_unit(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).administrative_unit()
+        return self._fake('administrative_unit', locale, lambda faker: faker.administrative_unit())
 
     # other
 
     def company_name(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        return self._faker(locale).company()
+        return self._fake('company_name', locale, lambda faker: faker.company())
 
     def bank_name(self, args=None):
         locale = args.strip(' ').strip("'").strip('"') if args is not None else None
-        faker = self._faker(locale)
-        return faker.bank() if hasattr(faker, 'bank') else faker.company()
+        return self._fake('bank_name', locale, lambda faker: faker.bank()
+                          if hasattr(faker, 'bank') else faker.company())
 
     # ru_RU only
 
@@ -223,3 +284,245 @@ class Randomizer:
     def snils_formatted(self):
         snils = self._faker('ru_RU').snils()
         return f"{snils[:3]}-{snils[3:6]}-{snils[6:9]} {snils[9:]}"
+
+
+class NumpyRandomizer(Randomizer):
+    # Draws uniform numbers in bulk with NumPy (PCG64) and generates strings by vectorized indexing into an alphabet.
+    # Values which are not drawn by this engine (regex, dates, faker values) are generated by the base randomizer,
+    # which is seeded with the same seed, so the result is reproducible with the same seed.
+    # Buffers are filled on demand: the first fill after reseeding is small and each next one is twice as large,
+    # so a document which draws a few values does not pay for a full buffer. Sizes of fills depend only on the values
+    # drawn after reseeding, so a document does not depend on the documents generated before it.
+
+    _MIN_BUFFER_SIZE = 64
+    _BUFFER_SIZE = 4096
+    _MIN_LETTERS_SIZE = 256
+    _LETTERS_SIZE = 65536
+    # increment of the PCG64 stream (any odd number)
+    _PCG_INCREMENT = 0x5851f42d4c957f2d
+
+    def __init__(self, seed=None, faker_pool: int = None):
+        super().__init__(seed, faker_pool)
+        self._np = _import_numpy()
+        self._alphabet = self._np.frombuffer(string.ascii_lowercase.encode('ascii'), dtype=self._np.uint8)
+        self._bit_generator = self._np.random.PCG64()
+        self._generator = self._np.random.Generator(self._bit_generator)
+        self._init_generator(self._base_seed)
+
+    def reseed(self, *parts):
+        super().reseed(*parts)
+        self._init_generator(self._seed)
+
+    def _init_generator(self, seed):
+        # the state is set directly from the derived seed, it is much cheaper than creating a new generator;
+        # int seeds are reduced to the 128-bit state (negative and large seeds are accepted as by the python engine)
+        seed = seed % 2 ** 128 if isinstance(seed, int) else derive_seed(seed)
+        self._bit_generator.state = {
+            'bit_generator': 'PCG64',
+            'state': {'state': seed, 'inc': self._PCG_INCREMENT},
+            'has_uint32': 0,
+            'uinteger': 0,
+        }
+        self._next_uniform = iter(()).__next__
+        self._uniforms_size = self._MIN_BUFFER_SIZE // 2
+        self._letters = b''
+        self._letters_position = 0
+        self._letters_size = self._MIN_LETTERS_SIZE // 2
+
+    def _fill_uniforms(self) -> float:
+        # fills the buffer and returns its first value
+        self._uniforms_size = min(self._uniforms_size * 2, self._BUFFER_SIZE)
+        self._next_uniform = iter(self._generator.random(self._uniforms_size).tolist()).__next__
+        return self._next_uniform()
+
+    def random(self):
+        try:
+            return self._next_uniform()
+        except StopIteration:
+            return self._fill_uniforms()
+
+    def any(self, options):
+        return options[int(self.random() * len(options))]
+
+    def integer(self, min_value, max_value):
+        value = min_value + int(self.random() * (max_value - min_value + 1))
+        # product of the uniform value and a large range may be rounded up to the range
+        return value if value <= max_value else max_value
+
+    def float(self, min_value, max_value):
+        return min_value + self.random() * (max_value - min_value)
+
+    def ascii_string(self, min_length, max_length):
+        if min_length is None:
+            min_length = 1
+        if max_length is None:
+            max_length = 20
+
+        length = self.integer(min_length, max_length)
+        position = self._letters_position
+        if position + length > len(self._letters):
+            self._letters_size = min(self._letters_size * 2, self._LETTERS_SIZE)
+            size = max(self._letters_size, length)
+            indexes = self._generator.integers(0, len(self._alphabet), size=size)
+            self._letters = self._alphabet[indexes].tobytes()
+            position = 0
+        self._letters_position = position + length
+        return self._letters[position:position + length].decode('ascii').capitalize()
+
+
+# The * and + characters match any number of repeats, this is the upper bound of repeats in generated strings
+_STAR_PLUS_LIMIT = 100
+_WHITESPACE = re.compile(r'\s')
+
+_CATEGORIES = {
+    'CATEGORY_DIGIT': string.digits,
+    'CATEGORY_NOT_DIGIT': string.ascii_letters + string.punctuation,
+    'CATEGORY_SPACE': string.whitespace,
+    'CATEGORY_NOT_SPACE': string.printable.strip(),
+    'CATEGORY_WORD': string.ascii_letters + string.digits + '_',
+    'CATEGORY_NOT_WORD': ''.join(sorted(set(string.printable).difference(string.ascii_letters + string.digits + '_'))),
+}
+
+
+class _RegexCompiler:
+    # Compiles a regular expression into a function generating matching strings, so the expression is parsed once.
+    # Character sets are resolved at compilation, consecutive literals are joined. Strings are generated by the same
+    # rules as rstr.xeger (and with the same calls to the random generator); whitespaces are replaced with spaces.
+
+    def __init__(self, rnd: random.Random):
+        self._rnd = rnd
+        self._groups = {}
+        self._has_whitespace = False
+
+    def compile(self, pattern: str):
+        generate = self._sequence(sre_parse.parse(pattern))
+        groups = self._groups
+        if self._has_whitespace:
+            sub = _WHITESPACE.sub
+            return lambda: groups.clear() or sub(' ', generate())
+        if groups:
+            return lambda: groups.clear() or generate()
+        return generate
+
+    def _sequence(self, parsed):
+        # adjacent constant parts are joined
+        parts = []
+        for opcode, value in parsed:
+            part = self._state(opcode.name, value)
+            if isinstance(part, str) and parts and isinstance(parts[-1], str):
+                parts[-1] += part
+            elif part != '':
+                parts.append(part)
+
+        if not parts:
+            return lambda: ''
+        if len(parts) == 1:
+            part = parts[0]
+            return part if callable(part) else lambda: part
+        funcs = [part if callable(part) else (lambda constant=part: constant) for part in parts]
+        return lambda: ''.join([func() for func in funcs])
+
+    def _state(self, opcode: str, value):
+        # returns a constant string or a function generating a string
+        rnd = self._rnd
+        match opcode:
+            case 'LITERAL':
+                return self._constant(chr(value))
+            case 'NOT_LITERAL':
+                return self._choice(string.printable.replace(chr(value), ''))
+            case 'ANY':
+                return self._choice(string.printable.replace('\n', ''))
+            case 'IN':
+                return self._choice(self._candidates(value))
+            case 'AT' | 'ASSERT_NOT':
+                return ''
+            case 'ASSERT':
+                return self._sequence(value[1])
+            case 'BRANCH':
+                branches = [self._sequence(branch) for branch in value[1]]
+                return lambda: rnd.choice(branches)()
+            case 'SUBPATTERN':
+                group, generate = value[0], self._sequence(value[-1])
+                if not group:
+                    return generate
+                groups = self._groups
+                groups[group] = None
+
+                def generate_group():
+                    result = groups[group] = generate()
+                    return result
+
+                return generate_group
+            case 'ATOMIC_GROUP':
+                return self._sequence(value)
+            case 'GROUPREF':
+                groups = self._groups
+                return lambda: groups[value]
+            case 'MIN_REPEAT' | 'MAX_REPEAT' | 'POSSESSIVE_REPEAT':
+                start, end, item = value
+                end = min(end, _STAR_PLUS_LIMIT)
+                generate = self._sequence(item)
+                randint = rnd.randint
+                return lambda: ''.join([generate() for _ in range(randint(start, end))])
+        raise ValueError(f'unsupported regular expression element: {opcode}')
+
+    def _candidates(self, items) -> list[str]:
+        candidates = []
+        negate = False
+        for opcode, value in items:
+            match opcode.name:
+                case 'NEGATE':
+                    negate = True
+                case 'LITERAL':
+                    candidates.append(chr(value))
+                case 'RANGE':
+                    candidates.extend(chr(i) for i in range(value[0], value[1] + 1))
+                case 'CATEGORY':
+                    candidates.extend(_CATEGORIES[value.name])
+                case _:
+                    raise ValueError(f'unsupported regular expression element: {opcode.name}')
+        if negate:
+            candidates = sorted(set(string.printable).difference(candidates))
+        return candidates
+
+    def _choice(self, candidates):
+        if _WHITESPACE.search(''.join(candidates)):
+            self._has_whitespace = True
+        return partial(self._rnd.choice, candidates)
+
+    def _constant(self, constant: str) -> str:
+        if _WHITESPACE.search(constant):
+            self._has_whitespace = True
+        return constant
+
+
+RANDOM_ENGINES = {
+    'python': Randomizer,
+    'numpy': NumpyRandomizer,
+}
+
+
+def create_randomizer(seed=None, engine: str = 'python', faker_pool: int = None) -> Randomizer:
+    return RANDOM_ENGINES[engine](seed, faker_pool)
+
+
+def _new_faker(locale: str):
+    # faker takes a long time to import, so it is imported only when a faker value is generated
+    from faker import Faker
+    return Faker(locale=locale)
+
+
+def _import_numpy():
+    # numpy is an optional dependency
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("random engine 'numpy' requires numpy package: pip install xmlgenerator[numpy]")
+    return numpy
+
+
+def derive_seed(seed, *parts) -> int:
+    # stable across processes and independent of PYTHONHASHSEED
+    key = '\x1f'.join(str(part) for part in (seed, *parts))
+    digest = hashlib.sha256(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') or 1
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+import xmlschema
+from xmlschema import XMLSchema
+
+import xmlgenerator
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaCache:
+    # Persistent cache of built XMLSchema objects.
+    # Each entry holds content hashes of the schema and all its imported/included files,
+    # so the entry is rebuilt automatically when any of these files is changed.
+
+    def __init__(self, cache_dir: str | Path):
+        self._cache_dir = Path(cache_dir)
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def load(self, xsd_file: Path) -> XMLSchema:
+        entry_file = self._entry_file(xsd_file)
+        xsd_schema = self._read_entry(entry_file)
+        if xsd_schema is not None:
+            logger.debug('schema %s loaded from cache %s', xsd_file.name, entry_file)
+            return xsd_schema
+
+        xsd_schema = XMLSchema(xsd_file)
+        self._write_entry(entry_file, xsd_schema)
+        return xsd_schema
+
+    def _entry_file(self, xsd_file: Path) -> Path:
+        # entries depend on versions because of pickle compatibility
+        key = '\x1f'.join((
+            str(Path(xsd_file).resolve()),
+            xmlgenerator.__version__,
+            xmlschema.__version__,
+            sys.version,
+        ))
+        return self._cache_dir / (hashlib.sha256(key.encode('utf-8')).hexdigest() + '.pickle')
+
+    @staticmethod
+    def _read_entry(entry_file: Path) -> XMLSchema | None:
+        if not entry_file.is_file():
+            return None
+        try:
+            with open(entry_file, 'rb') as f:
+                dependencies = pickle.load(f)
+                for path, digest in dependencies.items():
+                    if _file_digest(path) != digest:
+                        logger.debug('cache entry %s is outdated: %s has been changed', entry_file, path)
+                        return None
+                return pickle.load(f)
+        except Exception as ex:
+            logger.warning('failed to read schema cache entry %s: %s', entry_file, ex)
+            return None
+
+    @staticmethod
+    def _write_entry(entry_file: Path, xsd_schema: XMLSchema) -> None:
+        dependencies = {}
+        for schema in xsd_schema.maps.iter_schemas():
+            path = _url_to_path(schema.url)
+            if path is not None:
+                dependencies[path] = _file_digest(path)
+
+        try:
+            # write to temporary file first, as several processes may write the same entry at once
+            fd, tmp_name = tempfile.mkstemp(dir=entry_file.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(dependencies, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    pickle.dump(xsd_schema, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_name, entry_file)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+            logger.debug('schema %s saved to cache %s (%s dependencies)', xsd_schema.name, entry_file,
+                         len(dependencies))
+        except Exception as ex:
+            logger.warning('failed to write schema cache entry %s: %s', entry_file, ex)
+
+
+def _url_to_path(url: str | None) -> str | None:
+    if not url:
+        return None
+    parts = urlsplit(url)
+    if len(parts.scheme) == 1:
+        # windows drive letter
+        return url
+    if parts.scheme not in ('', 'file'):
+        # remote schemas are not tracked
+        return None
+    return url2pathname(parts.path)
+
+
+def _file_digest(path: str) -> str | None:
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
@@ -0,0 +1,122 @@
+import json
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+_PERCENTILES = (50, 90, 95, 99)
+_TIMES = ('generation', 'serialization', 'validation', 'total')
+
+
+class DocumentStats(NamedTuple):
+    elements: int
+    attributes: int
+    # size of serialized document (before compression)
+    output_bytes: int
+    generation_time: float
+    serialization_time: float
+    validation_time: float
+
+
+class RunStatistics:
+    # Collects statistics of generated documents and writes them as JSON at the end of the run:
+    # documents of each schema, totals, throughput and latency percentiles of each schema and of the whole run.
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._started_at = datetime.now(timezone.utc)
+        self._schemas = {}
+
+    def add(self, schema_name: str, index: int, root_element: str, filename: str, stats: DocumentStats,
+            validated: bool, validation_error: str | None):
+        if not validated:
+            outcome = 'skipped'
+        elif validation_error is None:
+            outcome = 'valid'
+        else:
+            outcome = 'invalid'
+        self._schemas.setdefault(schema_name, []).append((index, root_element, filename, stats, outcome))
+
+    def to_dict(self) -> dict:
+        elapsed = time.perf_counter() - self._started
+        schemas = {}
+        all_documents = []
+        for schema_name, documents in self._schemas.items():
+            all_documents.extend(documents)
+            schemas[schema_name] = {
+                **_summary(documents),
+                'per_document': [_document_dict(*document) for document in documents],
+            }
+
+        summary = _summary(all_documents)
+        return {
+            'run': {
+                'started_at': self._started_at.isoformat(timespec='seconds'),
+                'wall_time': round(elapsed, 6),
+                'schemas': len(schemas),
+                **summary,
+                'documents_per_second': round(summary['documents'] / elapsed, 3) if elapsed else None,
+                'megabytes_per_second': round(summary['output_bytes'] / elapsed / 1e6, 3) if elapsed else None,
+            },
+            'schemas': schemas,
+        }
+
+    def write(self, output_file: Path):
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        logger.info('run statistics saved to %s', output_file)
+
+
+def _document_dict(index, root_element, filename, stats: DocumentStats, outcome) -> dict:
+    return {
+        'index': index,
+        'root_element': root_element,
+        'filename': filename,
+        'elements': stats.elements,
+        'attributes': stats.attributes,
+        'output_bytes': stats.output_bytes,
+        'generation_time': round(stats.generation_time, 6),
+        'serialization_time': round(stats.serialization_time, 6),
+        'validation_time': round(stats.validation_time, 6),
+        'validation': outcome,
+    }
+
+
+def _summary(documents: list) -> dict:
+    outcomes = [document[4] for document in documents]
+    stats = [document[3] for document in documents]
+    times = {
+        'generation': [s.generation_time for s in stats],
+        'serialization': [s.serialization_time for s in stats],
+        'validation': [s.validation_time for s in stats],
+        'total': [s.generation_time + s.serialization_time + s.validation_time for s in stats],
+    }
+    return {
+        'documents': len(documents),
+        'elements': sum(s.elements for s in stats),
+        'attributes': sum(s.attributes for s in stats),
+        'output_bytes': sum(s.output_bytes for s in stats),
+        'validation': {outcome: outcomes.count(outcome) for outcome in ('valid', 'invalid', 'skipped')},
+        'time': {name: round(sum(times[name]), 6) for name in _TIMES},
+        'latency': {name: _latency(times[name]) for name in _TIMES},
+    }
+
+
+def _latency(values: list[float]) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+    latency = {f'p{p}': round(_percentile(values, p), 6) for p in _PERCENTILES}
+    latency['max'] = round(values[-1], 6)
+    latency['mean'] = round(sum(values) / len(values), 6)
+    return latency
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    # nearest-rank method
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
@@ -1,11 +1,12 @@
 import logging
 import re
+from functools import partial
 from typing import NamedTuple, Optional
 
-from xmlgenerator.configuration import VariablesConfig
+from xmlgenerator.configuration import Config, VariablesConfig
 from xmlgenerator.randomization import Randomizer
 
-__all__ = ['Substitutor', 'ExpressionSyntaxError']
+__all__ = ['Substitutor', 'ValueOverrides', 'ExpressionSyntaxError']
 
 logger = logging.getLogger(__name__)
 
@@ -16,49 +17,66 @@ class Substitutor:
         self._variables_config = variables_config
         self._local_context = {}
         self._global_context = {}
+        # compiled expressions by template text
+        self._compiled = {}
+        # function name -> (arguments parser, provider called with parsed arguments)
         self._providers_dict = {
             # scope access functions
-            'global': lambda args: self._get_variable_from_scope(args, self._global_context, 'global'),
-            'local': lambda args: self._get_variable_from_scope(args, self._local_context, 'local'),
+            'global': (_parse_global_name,
+                       lambda name: self._get_variable_from_scope(name, self._global_context, 'global')),
+            'local': (_parse_local_name,
+                      lambda name: self._get_variable_from_scope(name, self._local_context, 'local')),
 
             # local scope functions
-            'root_element': lambda args: self._local_context["root_element"],
-            'source_filename': lambda args: self._local_context["source_filename"],
-            'source_extracted': lambda args: self._local_context["source_extracted"],
-            'output_filename': lambda args: self.get_output_filename(),
-
-            'any': lambda args: self._any(args),
-            'any_from': lambda args: self._any_from(args),
-            'regex': lambda args: self._regex(args),
-            'uuid': lambda args: self._randomizer.uuid(),
-            'number': lambda args: self._number(args),
-            'date': lambda args: self._date_formatted(args),
-
-            'first_name': lambda args: self._randomizer.first_name(args),
-            'last_name': lambda args: self._randomizer.last_name(args),
-            'middle_name': lambda args: self._randomizer.middle_name(args),
-            'phone_number': lambda args: self._randomizer.phone_number(args),
-            'email': lambda args: self._randomizer.email(args),
-
-            'country': lambda args: self._randomizer.country(args),
-            'city': lambda args: self._randomizer.city(args),
-            'street': lambda args: self._randomizer.street(args),
-            'house_number': lambda args: self._randomizer.house_number(args),
-            'postcode': lambda args: self._randomizer.postcode(args),
-            'administrative_unit': lambda args: self._randomizer.administrative_unit(args),
-
-            'company_name': lambda args: self._randomizer.company_name(args),
-            'bank_name': lambda args: self._randomizer.bank_name(args),
+            'root_element': (None, lambda args: self._local_context["root_element"]),
+            'source_filename': (None, lambda args: self._local_context["source_filename"]),
+            'source_extracted': (None, lambda args: self._local_context["source_extracted"]),
+            'output_filename': (None, lambda args: self.get_output_filename()),
+
+            'any': (_parse_options, lambda options: self._randomizer.any(options)),
+            'any_from': (_unquote, lambda file_path: self._randomizer.any_from(file_path)),
+            'regex': (_parse_pattern, lambda pattern: self._randomizer.regex(pattern)),
+            'uuid': (None, lambda args: self._randomizer.uuid()),
+            'number': (_parse_bounds, lambda bounds: str(self._randomizer.integer(*bounds))),
+            'date': (_parse_dates, lambda dates: self._randomizer.random_datetime(*dates).strftime("%Y%m%d")),
+
+            'first_name': (_parse_locale, lambda locale: self._randomizer.first_name(locale)),
+            'last_name': (_parse_locale, lambda locale: self._randomizer.last_name(locale)),
+            'middle_name': (_parse_locale, lambda locale: self._randomizer.middle_name(locale)),
+            'phone_number': (_parse_locale, lambda locale: self._randomizer.phone_number(locale)),
+            'email': (_parse_locale, lambda locale: self._randomizer.email(locale)),
+
+            'country': (_parse_locale, lambda locale: self._randomizer.country(locale)),
+            'city': (_parse_locale, lambda locale: self._randomizer.city(locale)),
+            'street': (_parse_locale, lambda locale: self._randomizer.street(locale)),
+            'house_number': (_parse_locale, lambda locale: self._randomizer.house_number(locale)),
+            'postcode': (_parse_locale, lambda locale: self._randomizer.postcode(locale)),
+            'administrative_unit': (_parse_locale, lambda locale: self._randomizer.administrative_unit(locale)),
+
+            'company_name': (_parse_locale, lambda locale: self._randomizer.company_name(locale)),
+            'bank_name': (_parse_locale, lambda locale: self._randomizer.bank_name(locale)),
 
             # ru_RU only
-            'inn_fl': lambda args: self._randomizer.inn_fl(),
-            'inn_ul': lambda args: self._randomizer.inn_ul(),
-            'ogrn_ip': lambda args: self._randomizer.ogrn_ip(),
-            'ogrn_fl': lambda args: self._randomizer.ogrn_fl(),
-            'kpp': lambda args: self._randomizer.kpp(),
-            'snils_formatted': lambda args: self._randomizer.snils_formatted(),
+            'inn_fl': (None, lambda args: self._randomizer.inn_fl()),
+            'inn_ul': (None, lambda args: self._randomizer.inn_ul()),
+            'ogrn_ip': (None, lambda args: self._randomizer.ogrn_ip()),
+            'ogrn_fl': (None, lambda args: self._randomizer.ogrn_fl()),
+            'kpp': (None, lambda args: self._randomizer.kpp()),
+            'snils_formatted': (None, lambda args: self._randomizer.snils_formatted()),
         }
 
+    def compile_config(self, config: Config):
+        # parse all expressions of configuration in advance, so errors are reported at startup
+        generator_configs = [config.global_, *config.specific.values()]
+        expressions = [c.output_filename for c in generator_configs]
+        expressions += [e for c in generator_configs for e in c.value_override.values()]
+        expressions += config.variables.global_.values()
+        expressions += config.variables.local.values()
+        for expression in expressions:
+            if expression:
+                self._compile_expression(expression)
+        logger.debug('compiled %s expression(s)', len(self._compiled))
+
     def reset_context(self, xsd_filename, root_element_name, config_local):
         self._local_context.clear()
         self._local_context["source_filename"] = xsd_filename
@@ -79,11 +97,7 @@ class Substitutor:
         logger.debug('local_context["source_extracted"] = %s (extracted with regexp %s)', source_extracted, source_filename)
         logger.debug('local_context["output_filename"]  = %s', resolved_value)
 
-    def _get_variable_from_scope(self, args: Optional[str], context: dict, scope_name: str):
-        variable_name = args.strip(' ').strip("'").strip('"') if args is not None else None
-        if not variable_name:
-            raise RuntimeError(f"{scope_name.capitalize()} variable name is not specified")
-
+    def _get_variable_from_scope(self, variable_name: str, context: dict, scope_name: str):
         logger.debug('get variable "%s" from %s context...', variable_name, scope_name)
         value = context.get(variable_name)
         if value is None:
@@ -95,7 +109,10 @@ class Substitutor:
             if expression is None:
                 raise RuntimeError(f"{scope_name.capitalize()} variable '{variable_name}' is not defined")
 
-            value = self._process_expression(expression)
+            if scope_name == 'global':
+                value = self._process_global_expression(variable_name, expression)
+            else:
+                value = self._process_expression(expression)
             logger.debug('variable "%s" added to %s context. value: %s', variable_name, scope_name, value)
             context[variable_name] = value
         else:
@@ -103,61 +120,103 @@ class Substitutor:
 
         return value
 
+    def _process_global_expression(self, variable_name, expression):
+        # global variables are evaluated with a dedicated randomizer, so their values
+        # do not depend on which document (or worker process) accesses them first
+        randomizer = self._randomizer
+        self._randomizer = randomizer.spawn('global', variable_name)
+        try:
+            return self._process_expression(expression)
+        finally:
+            self._randomizer = randomizer
+
     def get_output_filename(self):
         return self._local_context.get("output_filename")
 
     def substitute_value(self, target_name, items):
-        for target_name_pattern, expression in items:
-            if re.search(target_name_pattern, target_name, re.IGNORECASE):
-                if expression:
-                    result_value = self._process_expression(expression)
-                    return True, result_value
-                else:
-                    return False, None
-        return False, None
+        overrides = items if isinstance(items, ValueOverrides) else ValueOverrides(items)
+        expression = overrides.resolve(target_name)
+        if expression is None:
+            return False, None
+        result_value = self._process_expression(expression)
+        return True, result_value
 
     def _process_expression(self, expression):
         logger.debug('processing expression: %s', expression)
-        result_value: str = expression
-        resolved_substitutions = []
-        subexpressions = _parse_subexpressions(expression)
-        for se in subexpressions:
-            func_name = se.function
-            func_args = se.argument
-            func_lambda = self._providers_dict.get(func_name)
-            if func_lambda is None:
-                raise RuntimeError(f"Unknown function {func_name}")
+        compiled = self._compiled.get(expression)
+        if compiled is None:
+            compiled = self._compile_expression(expression)
 
-            resolved_value = func_lambda(func_args)
-            resolved_substitutions.append((se.start, se.end, str(resolved_value)))
-
-        for start, end, replacement in reversed(resolved_substitutions):
-            result_value = result_value[:start] + replacement + result_value[end:]
+        if compiled.__class__ is str:
+            result_value = compiled
+        else:
+            result_value = ''.join([segment if segment.__class__ is str else str(segment()) for segment in compiled])
 
         logger.debug('expression resolved to value: %s', result_value)
         return result_value
 
-    def _any(self, args):
-        separated_args = str(args).split(sep=",")
-        options = [i.strip(' ').strip("'").strip('"') for i in separated_args]
-        return self._randomizer.any(options)
+    def _compile_expression(self, expression):
+        # Template is parsed once into a list of literal segments and provider calls with parsed arguments.
+        # Templates without placeholders are compiled to the template itself.
+        compiled = self._compiled.get(expression)
+        if compiled is not None:
+            return compiled
 
-    def _any_from(self, args):
-        file_path = args.strip(' ').strip("'").strip('"')
-        return self._randomizer.any_from(file_path)
-
-    def _regex(self, args):
-        pattern = args.strip("'").strip('"')
-        return self._randomizer.regex(pattern)
-
-    def _number(self, args):
-        left_bound, right_bound = (int(i) for i in str(args).split(sep=","))
-        return str(self._randomizer.integer(left_bound, right_bound))
-
-    def _date_formatted(self, args):
-        date_from, date_until = (i.strip(' ').strip("'").strip('"') for i in str(args).split(sep=","))
-        random_date = self._randomizer.random_datetime(date_from, date_until)
-        return random_date.strftime("%Y%m%d")
+        subexpressions = _parse_subexpressions(expression)
+        if not subexpressions:
+            compiled = expression
+        else:
+            compiled = []
+            cursor = 0
+            for se in subexpressions:
+                provider = self._providers_dict.get(se.function)
+                if provider is None:
+                    raise RuntimeError(f"Unknown function {se.function}")
+                parse_arguments, func = provider
+                arguments = parse_arguments(se.argument) if parse_arguments is not None else se.argument
+                if se.start > cursor:
+                    compiled.append(expression[cursor:se.start])
+                compiled.append(partial(func, arguments))
+                cursor = se.end
+            if cursor < len(expression):
+                compiled.append(expression[cursor:])
+
+        self._compiled[expression] = compiled
+        return compiled
+
+
+class ValueOverrides:
+    # Compiled value_override table. Patterns are compiled once and the result of matching
+    # is remembered for each target name, so repeated lookups cost one dict access.
+
+    def __init__(self, items):
+        self._patterns = [(re.compile(pattern, re.IGNORECASE), expression) for pattern, expression in items]
+        self._resolved: dict[str, Optional[str]] = {}
+
+    def resolve(self, target_name) -> Optional[str]:
+        # returns expression of the first matched pattern, or None if there is no match
+        # or the matched pattern has an empty value (override is reset)
+        try:
+            return self._resolved[target_name]
+        except KeyError:
+            pass
+
+        resolved = None
+        for pattern, expression in self._patterns:
+            if pattern.search(target_name):
+                resolved = expression or None
+                break
+        self._resolved[target_name] = resolved
+        return resolved
+
+    def find(self, target_name) -> Optional[tuple[str, str]]:
+        # returns pattern and expression of the override applied to the target (not cached, used for reports)
+        if self.resolve(target_name) is None:
+            return None
+        for pattern, expression in self._patterns:
+            if pattern.search(target_name):
+                return pattern.pattern, expression
+        return None
 
 
 class _ParsedExpression(NamedTuple):
@@ -186,6 +245,46 @@ class ExpressionSyntaxError(ValueError):
         self.position = self._clamp_position(self.position, expression)
 
 
+def _unquote(args: Optional[str]) -> Optional[str]:
+    return args.strip(' ').strip("'").strip('"') if args is not None else None
+
+
+def _parse_global_name(args: Optional[str]) -> str:
+    variable_name = _unquote(args)
+    if not variable_name:
+        raise RuntimeError("Global variable name is not specified")
+    return variable_name
+
+
+def _parse_local_name(args: Optional[str]) -> str:
+    variable_name = _unquote(args)
+    if not variable_name:
+        raise RuntimeError("Local variable name is not specified")
+    return variable_name
+
+
+def _parse_locale(args: Optional[str]) -> Optional[str]:
+    return _unquote(args)
+
+
+def _parse_options(args: Optional[str]) -> list[str]:
+    return [_unquote(i) for i in str(args).split(sep=",")]
+
+
+def _parse_pattern(args: Optional[str]) -> str:
+    return args.strip("'").strip('"')
+
+
+def _parse_bounds(args: Optional[str]) -> tuple[int, int]:
+    left_bound, right_bound = (int(i) for i in str(args).split(sep=","))
+    return left_bound, right_bound
+
+
+def _parse_dates(args: Optional[str]) -> tuple[str, str]:
+    date_from, date_until = (_unquote(i) for i in str(args).split(sep=","))
+    return date_from, date_until
+
+
 def _parse_subexpressions(expression: str) -> list[_ParsedExpression]:
     subexpressions: list[_ParsedExpression] = []
     cursor = 0
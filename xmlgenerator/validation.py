@@ -1,27 +1,84 @@
 import logging
+import random
 import sys
+import time
+import traceback
 
-from xmlschema import XMLSchemaValidationError
+from lxml import etree
+from xmlschema import XMLSchemaValidationError, XMLResource
+
+from xmlgenerator.randomization import derive_seed
 
 logger = logging.getLogger(__name__)
 
 
 class XmlValidator:
-    def __init__(self, post_validate: str, ignore_errors: bool):
+    def __init__(self, post_validate: str, ignore_errors: bool, sample: float = None, first: int = 0,
+                 budget: float = None, seed: int = None, shared_spent=None):
         self.ignore_errors = ignore_errors
+        # documents selection: first documents of each schema, then a random fraction of the rest
+        self._sample = 1.0 if sample is None else sample
+        self._first = first
+        self._seed = seed
+        # CPU time limit for validation (seconds); worker processes share the spent time (multiprocessing.Value),
+        # so the limit applies to the whole run
+        self._budget = budget
+        self._spent = 0.0
+        self._shared_spent = shared_spent
+        # compiled libxml2 schema for the last used xsd schema (None if libxml2 can't compile it)
+        self._libxml2_schema = None, None
         match post_validate:
             case 'none':
                 self.validation_func = self._skip_validation
             case 'schema':
                 self.validation_func = self._validate_with_schema
+            case 'libxml2':
+                self.validation_func = self._validate_with_libxml2
             case 'schematron':
                 self.validation_func = self._validate_with_schematron
             case _:
                 raise ValueError(f"Unknown validation mode: {post_validate}")
+        self._enabled = post_validate != 'none'
         logger.debug("post validation: %s, ignore errors: %s", post_validate, ignore_errors)
+        if self._enabled and (self._sample < 1 or budget is not None):
+            logger.debug("validation sample: %s, first: %s, budget: %s", self._sample, first, budget)
+
+    def select(self, index: int, *parts) -> bool:
+        # Decides whether the document should be validated. Random choice is made with its own seed
+        # derived from the document key, so it does not affect generated content and does not depend on jobs order.
+        if not self._enabled:
+            return False
+        if self._budget is not None and self._spent_time() >= self._budget:
+            return False
+        if index < self._first or self._sample >= 1:
+            return True
+        return random.Random(derive_seed(self._seed, 'validation', *parts, index)).random() < self._sample
 
     def validate(self, xsd_schema, document):
-        self.validation_func(xsd_schema, document)
+        error = self.check(xsd_schema, document)
+        if error is not None:
+            self.report(error)
+
+    def check(self, xsd_schema, document) -> str | None:
+        # returns validation error message instead of terminating the process (used in worker processes)
+        started = time.process_time()
+        try:
+            return self.validation_func(xsd_schema, document)
+        finally:
+            spent = time.process_time() - started
+            if self._shared_spent is None:
+                self._spent += spent
+            else:
+                with self._shared_spent.get_lock():
+                    self._shared_spent.value += spent
+
+    def _spent_time(self) -> float:
+        return self._spent if self._shared_spent is None else self._shared_spent.value
+
+    def report(self, error: str):
+        print(error, file=sys.stderr)
+        if not self.ignore_errors:
+            sys.exit(1)
 
     def _skip_validation(self, *_):
         logger.debug("validation skipped (mode 'none')")
@@ -31,9 +88,57 @@ class XmlValidator:
         try:
             xsd_schema.validate(document)
         except XMLSchemaValidationError as err:
-            print(err, file=sys.stderr)
-            if not self.ignore_errors:
-                sys.exit(1)
+            # frames of the traceback keep suspended iterators of a lazy resource, which must be released
+            # before its file is closed
+            message = str(err)
+            traceback.clear_frames(err.__traceback__)
+            return message
+        return None
+
+    def _validate_with_libxml2(self, xsd_schema, document):
+        libxml2_schema = self._get_libxml2_schema(xsd_schema)
+        if libxml2_schema is None:
+            return self._validate_with_schema(xsd_schema, document)
+
+        logger.debug("validate generated xml with libxml2")
+        if isinstance(document, XMLResource):
+            # document written to file: validate while parsing, without building the whole tree
+            source = document.filepath or document.source
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            try:
+                for _, element in etree.iterparse(source, events=('end',), schema=libxml2_schema):
+                    # processed siblings are deleted too, otherwise the emptied elements stay in the tree
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+            except etree.XMLSyntaxError as err:
+                return str(err)
+            return None
+
+        if not libxml2_schema.validate(document):
+            return str(libxml2_schema.error_log)
+        return None
+
+    def _get_libxml2_schema(self, xsd_schema):
+        cached_schema, libxml2_schema = self._libxml2_schema
+        if cached_schema is xsd_schema:
+            return libxml2_schema
+
+        libxml2_schema = None
+        if xsd_schema.XSD_VERSION != '1.0':
+            logger.warning('libxml2 does not support XSD %s, fallback to xmlschema', xsd_schema.XSD_VERSION)
+        elif not xsd_schema.url:
+            logger.warning('schema source is not a file, fallback to xmlschema')
+        else:
+            try:
+                logger.debug('compile schema %s with libxml2', xsd_schema.url)
+                libxml2_schema = etree.XMLSchema(etree.parse(xsd_schema.url))
+            except (etree.XMLSchemaParseError, etree.XMLSyntaxError) as err:
+                logger.warning('libxml2 failed to compile schema %s, fallback to xmlschema: %s', xsd_schema.url, err)
+
+        self._libxml2_schema = xsd_schema, libxml2_schema
+        return libxml2_schema
 
     def _validate_with_schematron(self, xsd_schema, document):
         logger.debug("validate generated xml with xsd schematron")